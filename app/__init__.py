@@ -83,6 +83,9 @@ def create_app(config_name=None):
     # Register user loader
     register_user_loader(login_manager, db_manager)
     
+    # Register CLI commands
+    register_cli_commands(app, db_manager)
+    
     # Initialize default data
     initialize_default_data(db_manager)
     
@@ -246,6 +249,78 @@ def register_context_processors(app):
     logger.info("Context processors registered")
 
 
+def register_cli_commands(app, db_manager):
+    """Register ``flask`` CLI commands."""
+    import click
+    
+    @app.cli.command("migrate-uploads")
+    @click.option(
+        "--batch-size", default=50, show_default=True, help="Records per batch"
+    )
+    @click.option(
+        "--pause",
+        default=0.0,
+        show_default=True,
+        help="Seconds to wait between batches",
+    )
+    @click.option("--dry-run", is_flag=True, help="Only report what would be moved")
+    def migrate_uploads(batch_size, pause, dry_run):
+        """Move flat upload folders into the sharded blob store (online)."""
+        from app.core.blob_store import get_blob_store
+        from app.core.upload_migration import migrate_collection, upload_collections
+        from app.modules.documents.repositories.document_repository import (
+            DocumentRepository,
+        )
+        
+        collections = upload_collections(
+            db_manager, DocumentRepository(db_manager).upload_folder
+        )
+        blob_store = get_blob_store(db_manager)
+        for collection in collections:
+            stats = migrate_collection(
+                blob_store, collection, batch_size, pause, dry_run
+            )
+            click.echo(
+                f"{collection.filename}: {stats['migrated']} migrados, "
+                f"{stats['missing']} sem arquivo, {stats['bytes']} bytes"
+            )
+
+    @app.cli.command("extract-text")
+    def extract_text():
+        """Extract searchable text from uploads that have none yet (resumable)."""
+        from app.modules.documents.services.text_extraction_service import (
+            get_text_extraction_service,
+        )
+        
+        service = get_text_extraction_service(db_manager)
+        try:
+            stats = service.extract_missing()
+        finally:
+            service.shutdown()
+        click.echo(
+            f"{stats['extracted']} com texto, {stats['empty']} sem texto, "
+            f"{stats['failed']} com falha, {stats['skipped']} ignorados"
+        )
+
+    @app.cli.command("check-uploads")
+    @click.option(
+        "--full", is_flag=True, help="Relist every folder, ignoring cached listings"
+    )
+    def check_uploads(full):
+        """Reconcile upload records with the files on disk and report gaps."""
+        from app.modules.documents.services.integrity_service import (
+            get_integrity_service,
+        )
+        
+        report = get_integrity_service(db_manager).run(full)
+        for name, counts in report['collections'].items():
+            click.echo(
+                f"{name}: {counts['records']} registros, "
+                f"{counts['missing']} sem arquivo, {counts['updated']} atualizados"
+            )
+        click.echo(f"{report['orphan_count']} órfãos ({report['orphan_bytes']} bytes)")
+
+
 def initialize_default_data(db_manager):
     """Initialize default data for the application."""
     try:
@@ -0,0 +1,229 @@
+"""
+Content-addressed blob store for Wiki Veloz
+CDD v2.0 - Uploaded files stored once per SHA-256, shared by reference
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from app.core.database import DatabaseManager
+from app.shared.uploads import commit_temp, stream_to_temp
+
+# Unreferenced blobs younger than this are kept: an upload stores its blob
+# before the record that references it is saved.
+GC_GRACE_SECONDS = 3600
+
+_DIGEST_CHARS = frozenset("0123456789abcdef")
+
+
+def is_digest(value: Optional[str]) -> bool:
+    """Whether value looks like a hex SHA-256 digest"""
+    return bool(value) and len(value) == 64 and set(value) <= _DIGEST_CHARS
+
+
+class BlobStore:
+    """Files keyed by the SHA-256 of their content.
+
+    Blobs live at ``root/ab/cd/<digest>`` (two levels of 256 buckets), so
+    identical uploads share one file no matter how they were named. Every
+    owner of a blob registers a reference such as ``document:doc-1`` in the
+    ``blobs.json`` index; a blob with no references left is removed by
+    ``collect_garbage``.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, root: str):
+        self.db_manager = db_manager
+        self.root = root
+        self.index_filename = "blobs.json"
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, digest: str) -> str:
+        """Sharded path of a blob; raises ValueError for anything but a digest"""
+        if not is_digest(digest):
+            raise ValueError(f"Digest inválido: {digest}")
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def derivative_path(self, digest: str, name: str) -> str:
+        """Path of a file derived from a blob (thumbnail, resized copy) beside it"""
+        return f"{self.path_for(digest)}.{name}"
+
+    def _remove_derivatives(self, path: str) -> int:
+        """Delete the derived files of a removed blob; returns bytes freed"""
+        prefix = os.path.basename(path) + "."
+        freed = 0
+        for entry in os.scandir(os.path.dirname(path)):
+            if entry.name.startswith(prefix):
+                try:
+                    freed += entry.stat().st_size
+                    os.remove(entry.path)
+                except OSError:
+                    continue
+        return freed
+
+    def exists(self, digest: str) -> bool:
+        """Whether a blob is stored"""
+        return is_digest(digest) and os.path.exists(self.path_for(digest))
+
+    def _commit(self, temp_path: str, digest: str) -> None:
+        """Move a finished temp file into place, or drop it if the blob exists"""
+        target = self.path_for(digest)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Under the index lock so garbage collection cannot delete the
+        # existing blob between the check and the mtime refresh
+        with self.db_manager.lock(self.index_filename):
+            if os.path.exists(target):
+                os.remove(temp_path)
+                os.utime(target)
+            else:
+                commit_temp(temp_path, target)
+
+    def put_stream(
+        self, stream: BinaryIO, max_size: Optional[int] = None
+    ) -> Tuple[str, int]:
+        """Store a stream; returns (digest, size). FileUploadError past max_size"""
+        temp_path, size, hasher = stream_to_temp(stream, self.root, max_size)
+        digest = hasher.hexdigest()
+        self._commit(temp_path, digest)
+        return digest, size
+
+    def put_file(self, path: str) -> Tuple[str, int]:
+        """Store a copy of an existing file; returns (digest, size)"""
+        with open(path, "rb") as f:
+            return self.put_stream(f)
+
+    def add_ref(self, digest: str, ref: str, size: Optional[int] = None) -> None:
+        """Register ``ref`` as an owner of a blob"""
+        with self.db_manager.lock(self.index_filename):
+            entries = self.db_manager.load_data(self.index_filename)
+            entry = next((e for e in entries if e.get("id") == digest), None)
+            if entry is None:
+                if size is None:
+                    size = os.path.getsize(self.path_for(digest))
+                entry = {
+                    "id": digest,
+                    "size": size,
+                    "refs": [],
+                    "created_at": datetime.now().isoformat(),
+                }
+                entries.append(entry)
+            if ref in entry["refs"]:
+                return
+            entry["refs"].append(ref)
+            self.db_manager.save_data(self.index_filename, entries)
+
+    def release(self, digest: str, ref: str) -> int:
+        """Drop ``ref`` from a blob's owners; returns the references left"""
+        with self.db_manager.lock(self.index_filename):
+            entries = self.db_manager.load_data(self.index_filename)
+            entry = next((e for e in entries if e.get("id") == digest), None)
+            if entry is None:
+                return 0
+            if ref in entry["refs"]:
+                entry["refs"].remove(ref)
+                self.db_manager.save_data(self.index_filename, entries)
+            return len(entry["refs"])
+
+    def refs(self, digest: str) -> List[str]:
+        """Current owners of a blob"""
+        entry = self.db_manager.get_by_id(self.index_filename, digest)
+        return list(entry["refs"]) if entry else []
+
+    def iter_blobs(self) -> Iterator[Tuple[str, str]]:
+        """Yield (digest, path) for every stored blob"""
+        if not os.path.isdir(self.root):
+            return
+        for first in os.scandir(self.root):
+            if not first.is_dir() or len(first.name) != 2:
+                continue
+            for second in os.scandir(first.path):
+                if not second.is_dir() or len(second.name) != 2:
+                    continue
+                for entry in os.scandir(second.path):
+                    if entry.is_file() and is_digest(entry.name):
+                        yield entry.name, entry.path
+
+    def collect_garbage(self, grace_seconds: int = GC_GRACE_SECONDS) -> Dict[str, int]:
+        """Delete blobs nobody references any more; returns counts removed"""
+        cutoff = time.time() - grace_seconds
+        removed = freed = 0
+        with self.db_manager.lock(self.index_filename):
+            entries = self.db_manager.load_data(self.index_filename)
+            referenced = {e["id"] for e in entries if e.get("refs")}
+
+            for digest, path in list(self.iter_blobs()):
+                if digest in referenced:
+                    continue
+                try:
+                    stat = os.stat(path)
+                    if stat.st_mtime > cutoff:
+                        continue
+                    os.remove(path)
+                except OSError:
+                    continue
+                removed += 1
+                freed += stat.st_size + self._remove_derivatives(path)
+
+            kept = [e for e in entries if e["id"] in referenced or self.exists(e["id"])]
+            if len(kept) != len(entries):
+                self.db_manager.save_data(self.index_filename, kept)
+
+            # Temp files of uploads that died half way
+            for entry in os.scandir(self.root):
+                if (
+                    entry.is_file()
+                    and entry.name.endswith(".upload")
+                    and entry.stat().st_mtime < cutoff
+                ):
+                    os.remove(entry.path)
+
+        return {"removed": removed, "bytes_freed": freed}
+
+    def stats(self) -> Dict[str, int]:
+        """Stored blob count and bytes, plus how many are referenced"""
+        entries = {e["id"]: e for e in self.db_manager.load_data(self.index_filename)}
+        blobs = total = referenced = 0
+        for digest, path in self.iter_blobs():
+            blobs += 1
+            total += os.path.getsize(path)
+            if entries.get(digest, {}).get("refs"):
+                referenced += 1
+        return {"blobs": blobs, "bytes": total, "referenced": referenced}
+
+
+def resolve_upload_path(
+    blob_store: BlobStore,
+    record: dict,
+    legacy_folder: str,
+    filename_field: str = "filename",
+) -> Optional[str]:
+    """Path on disk of the file behind an upload record.
+
+    Records with a ``sha256`` live in the sharded blob tree; records from
+    before the blob store (not migrated yet) in the flat ``legacy_folder``.
+    Every reader of uploaded files goes through here, so migrating a record
+    is just adding its digest.
+    """
+    if is_digest(record.get("sha256")):
+        return blob_store.path_for(record["sha256"])
+    filename = record.get(filename_field)
+    if not filename:
+        return None
+    return os.path.join(legacy_folder, os.path.basename(filename))
+
+
+_stores: Dict[str, BlobStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_blob_store(db_manager: DatabaseManager) -> BlobStore:
+    """Return the process-wide blob store for the configured BLOB_FOLDER"""
+    root = os.path.abspath(db_manager.config.BLOB_FOLDER)
+    with _stores_lock:
+        store = _stores.get(root)
+        if store is None:
+            store = BlobStore(db_manager, root)
+            _stores[root] = store
+        return store
@@ -0,0 +1,124 @@
+"""
+Change log for Wiki Veloz collections
+CDD v2.0 - Per-collection change sequence and tombstones for delta sync
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+def record_fingerprint(record: Dict[str, Any], ignored: Iterable[str] = ()) -> str:
+    """Short stable digest of a record's JSON form, leaving out ``ignored`` fields"""
+    ignored = set(ignored)
+    if ignored:
+        record = {key: value for key, value in record.items() if key not in ignored}
+    raw = json.dumps(record, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class ChangeLog:
+    """Sequence numbers for the records of one JSON collection.
+
+    Every save that changes the collection gets the next sequence number;
+    records created or updated by it are stamped with that number and
+    records that disappeared leave a tombstone. At most ``tombstone_limit``
+    tombstones are kept; once older ones are dropped, clients syncing from
+    before ``floor`` must reload everything. Fields in ``ignored_fields``
+    (view and download counters) do not count as a change.
+    """
+
+    def __init__(
+        self,
+        data_folder: str,
+        filename: str,
+        tombstone_limit: int = 1000,
+        ignored_fields: Iterable[str] = (),
+    ):
+        self.path = os.path.join(
+            data_folder, filename.replace(".json", "") + ".changes.json"
+        )
+        self.tombstone_limit = tombstone_limit
+        self.ignored_fields = frozenset(ignored_fields)
+
+    def load(self) -> Dict[str, Any]:
+        """Load the log state (empty state when missing or unreadable)"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"seq": 0, "floor": 0, "records": {}, "tombstones": {}}
+
+    def record(self, data: List[Dict[str, Any]]) -> int:
+        """Diff a collection about to be saved against the log; returns the seq"""
+        state = self.load()
+        seq = state["seq"] + 1
+        previous = state["records"]
+        records = {}
+        changed = False
+
+        for item in data:
+            item_id = item.get("id")
+            if item_id is None:
+                continue
+            fingerprint = record_fingerprint(item, self.ignored_fields)
+            known = previous.get(item_id)
+            if known is not None and known[0] == fingerprint:
+                records[item_id] = known
+            else:
+                records[item_id] = [fingerprint, seq]
+                state["tombstones"].pop(item_id, None)
+                changed = True
+
+        for item_id in previous:
+            if item_id not in records:
+                state["tombstones"][item_id] = seq
+                changed = True
+
+        if not changed:
+            return state["seq"]
+
+        tombstones = state["tombstones"]
+        if len(tombstones) > self.tombstone_limit:
+            oldest = sorted(tombstones.items(), key=lambda t: t[1])
+            for item_id, dropped_seq in oldest[
+                : len(tombstones) - self.tombstone_limit
+            ]:
+                del tombstones[item_id]
+                state["floor"] = max(state["floor"], dropped_seq)
+
+        state["seq"] = seq
+        state["records"] = records
+        self._save(state)
+        return seq
+
+    def changes_since(self, since: int) -> Tuple[List[str], List[str], int, bool]:
+        """Return (changed ids, deleted ids, current seq, reset) after ``since``.
+
+        ``reset`` means the log cannot answer for ``since`` and the caller
+        should send the whole collection instead.
+        """
+        state = self.load()
+        if since <= 0 or since < state["floor"] or since > state["seq"]:
+            return [], [], state["seq"], True
+        changed = [
+            item_id for item_id, (_, seq) in state["records"].items() if seq > since
+        ]
+        deleted = [
+            item_id for item_id, seq in state["tombstones"].items() if seq > since
+        ]
+        return changed, deleted, state["seq"], False
+
+    def _save(self, state: Dict[str, Any]) -> None:
+        folder = os.path.dirname(self.path)
+        fd, temp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
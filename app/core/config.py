@@ -6,6 +6,11 @@ CDD v2.0 - Centralized configuration
 import os
 from datetime import timedelta
 
+# Repository root, where the legacy app (app_old.py) keeps its data and uploads
+PROJECT_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
 
 class Config:
     """Base configuration class"""
@@ -19,9 +24,16 @@ class Config:
     UPLOAD_FOLDER = "app/static/uploads"
     MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB max
     ALLOWED_EXTENSIONS = {"pdf", "doc", "docx", "txt", "jpg", "jpeg", "png", "gif"}
+    # Content-addressed upload storage; outside app/static so every download
+    # goes through the routes' permission checks
+    BLOB_FOLDER = "app/data/blobs"
     
     # Database Configuration
     DATA_FOLDER = "app/data"
+    # JSON and flat upload folder of the legacy app (pdfs.json, attachments.json);
+    # absolute, so they resolve the same whatever directory the app starts in
+    LEGACY_DATA_FOLDER = os.path.join(PROJECT_ROOT, "data")
+    LEGACY_UPLOAD_FOLDER = os.path.join(PROJECT_ROOT, "static", "uploads")
     
     # Google Drive Configuration
     GOOGLE_DRIVE_CREDENTIALS_FILE = os.environ.get(
@@ -39,6 +51,59 @@ class Config:
     # Analytics Configuration
     ANALYTICS_ENABLED = True
     ACTIVITY_LOG_RETENTION = 1000
+    
+    # Trending Configuration
+    TRENDING_HALF_LIFE_HOURS = 72
+    TRENDING_TOP_K = 100
+    
+    # Markdown Rendering Configuration
+    RENDER_CACHE_SIZE = 256
+    RENDER_WORKERS = 2
+    
+    # Delta Sync Configuration
+    CHANGE_TRACKED_FILES = ("pages.json", "documents.json")
+    CHANGE_TOMBSTONE_LIMIT = 1000
+    # Counters bumped on every view/download; changing them alone is not a change
+    CHANGE_IGNORED_FIELDS = ("views", "downloads", "trending_score")
+    
+    # Resumable Upload Configuration
+    UPLOAD_SESSION_FOLDER = "upload_sessions"  # inside DATA_FOLDER
+    UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024
+    UPLOAD_SESSION_TTL_HOURS = 24
+    
+    # Thumbnail Configuration
+    THUMBNAIL_WORKERS = 2
+    THUMBNAIL_SIZES = {"thumb": 256, "preview": 1024}  # longest side, in pixels
+    THUMBNAIL_TIMEOUT_SECONDS = 30  # per PDF page render
+    
+    # Image Derivative Configuration
+    IMAGE_WORKERS = 2
+    IMAGE_WIDTHS = (320, 640, 1024, 1600)  # never wider than the original
+    IMAGE_FORMATS = ("webp", "jpeg")
+    IMAGE_QUALITY = 80
+    
+    # Text Extraction Configuration
+    TEXT_EXTRACTION_WORKERS = 2  # processes
+    TEXT_EXTRACTION_TIMEOUT_SECONDS = 30  # per file
+    TEXT_EXTRACTION_MAX_FILE_SIZE = 25 * 1024 * 1024  # larger files are not parsed
+    TEXT_EXTRACTION_MAX_CHARS = 1000000  # text kept per file
+    
+    # Upload Integrity Configuration
+    INTEGRITY_SCAN_WORKERS = 4  # threads listing directories
+    INTEGRITY_SCAN_INTERVAL_SECONDS = (
+        6 * 3600
+    )  # storage analytics older than this trigger a scan
+    
+    # File Delivery Configuration
+    # "" serves files from the app; "x-accel-redirect" (nginx) or "x-sendfile"
+    # (Apache/lighttpd) hands them to the front proxy after the auth checks
+    FILE_DELIVERY = os.environ.get("FILE_DELIVERY", "")
+    FILE_DELIVERY_ROOT = os.environ.get(
+        "FILE_DELIVERY_ROOT", "."
+    )  # disk folder behind the prefix
+    FILE_DELIVERY_PREFIX = os.environ.get(
+        "FILE_DELIVERY_PREFIX", "/protected/"
+    )  # internal nginx location
 
 
 class DevelopmentConfig(Config):
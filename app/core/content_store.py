@@ -0,0 +1,69 @@
+"""
+Content store for Wiki Veloz
+CDD v2.0 - Compressed text bodies stored out of line from JSON metadata
+"""
+
+import gzip
+import hashlib
+import os
+import re
+import tempfile
+from typing import Optional
+
+_SAFE_KEY = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 hex digest of a text body"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ContentStore:
+    """One gzip-compressed UTF-8 file per key under a root folder"""
+
+    def __init__(self, root: str, suffix: str = ".md.gz"):
+        self.root = root
+        self.suffix = suffix
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, key: str) -> str:
+        """Filesystem path for a key (keys that are not filename-safe are hashed)"""
+        if not _SAFE_KEY.match(key) or key.startswith("."):
+            key = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, key + self.suffix)
+
+    def exists(self, key: str) -> bool:
+        """Check if a body is stored for key"""
+        return os.path.exists(self.path_for(key))
+
+    def get(self, key: str) -> Optional[str]:
+        """Read a body, or None if it was never stored"""
+        try:
+            with gzip.open(self.path_for(key), "rt", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, text: str) -> str:
+        """Store a body atomically and return its content hash"""
+        path = self.path_for(key)
+        fd, temp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(
+                fileobj=raw, mode="wb", mtime=0
+            ) as f:
+                f.write(text.encode("utf-8"))
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return content_hash(text)
+
+    def delete(self, key: str) -> bool:
+        """Remove a body; returns False if there was nothing to remove"""
+        try:
+            os.remove(self.path_for(key))
+            return True
+        except FileNotFoundError:
+            return False
@@ -5,11 +5,62 @@ CDD v2.0 - Centralized data management
 
 import json
 import os
+import tempfile
+import threading
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+from app.core.changelog import ChangeLog
 from app.core.config import Config
 
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+
+class FileLock:
+    """Re-entrant lock on a data file, shared by threads and processes.
+
+    Threads of one process serialize on an RLock; processes serialize on
+    an exclusive flock of a sidecar ``.lock`` file where fcntl exists.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path + ".lock"
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._handle = None
+    
+    def __enter__(self) -> "FileLock":
+        self._lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            try:
+                self._handle = open(self.path, "a")
+                fcntl.flock(self._handle, fcntl.LOCK_EX)
+            except Exception:
+                self._close()
+                self._lock.release()
+                raise
+        self._depth += 1
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            self._close()
+        self._lock.release()
+    
+    def _close(self) -> None:
+        if self._handle is not None:
+            fcntl.flock(self._handle, fcntl.LOCK_UN)
+            self._handle.close()
+            self._handle = None
+
+
+_file_locks: Dict[str, FileLock] = {}
+_file_locks_guard = threading.Lock()
+
 
 class DatabaseManager:
     """Centralized database management for JSON files"""
@@ -23,6 +74,25 @@ class DatabaseManager:
         """Ensure data folder exists"""
         os.makedirs(self.data_folder, exist_ok=True)
     
+    def lock(self, filename: str) -> FileLock:
+        """Lock guarding a load-modify-save cycle on a data file"""
+        path = os.path.abspath(os.path.join(self.data_folder, filename))
+        with _file_locks_guard:
+            file_lock = _file_locks.get(path)
+            if file_lock is None:
+                file_lock = FileLock(path)
+                _file_locks[path] = file_lock
+            return file_lock
+    
+    def file_signature(self, filename: str) -> Optional[Tuple[int, int, int]]:
+        """Return (inode, mtime_ns, size) of a data file, or None if missing"""
+        filepath = os.path.join(self.data_folder, filename)
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+    
     def load_data(self, filename: str) -> List[Dict[str, Any]]:
         """Load data from JSON file"""
         filepath = os.path.join(self.data_folder, filename)
@@ -36,41 +106,91 @@ class DatabaseManager:
             return []
     
     def save_data(self, filename: str, data: List[Dict[str, Any]]) -> bool:
-        """Save data to JSON file"""
+        """Save data to JSON file (atomically, readers never see a partial file)"""
         filepath = os.path.join(self.data_folder, filename)
-        try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+        temp_path = None
+        with self.lock(filename):
+            try:
+                fd, temp_path = tempfile.mkstemp(dir=self.data_folder, suffix='.tmp')
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                os.replace(temp_path, filepath)
+            except Exception as e:
+                print(f"Error saving {filename}: {e}")
+                if temp_path and os.path.exists(temp_path):
+                    os.remove(temp_path)
+                return False
+            
+            if filename in self.config.CHANGE_TRACKED_FILES:
+                try:
+                    self.change_log(filename).record(data)
+                except Exception as e:
+                    print(f"Error recording changes for {filename}: {e}")
             return True
-        except Exception as e:
-            print(f"Error saving {filename}: {e}")
-            return False
+    
+    def change_log(self, filename: str) -> ChangeLog:
+        """Change sequence of a tracked collection"""
+        return ChangeLog(
+            self.data_folder,
+            filename,
+            self.config.CHANGE_TOMBSTONE_LIMIT,
+            self.config.CHANGE_IGNORED_FIELDS
+        )
+    
+    def get_changes(
+        self, filename: str, since: int
+    ) -> Tuple[List[Dict[str, Any]], List[str], int, bool]:
+        """Records changed and ids deleted after ``since``.
+        
+        Returns (records, deleted_ids, seq, reset); with ``reset`` the
+        records are the whole collection and the client should replace its copy.
+        """
+        with self.lock(filename):
+            changed, deleted, seq, reset = self.change_log(filename).changes_since(
+                since
+            )
+            data = self.load_data(filename)
+        if reset:
+            return data, [], seq, True
+        changed = set(changed)
+        return [item for item in data if item.get('id') in changed], deleted, seq, False
     
     def get_by_id(self, filename: str, item_id: str) -> Optional[Dict[str, Any]]:
         """Get item by ID from file"""
         data = self.load_data(filename)
         return next((item for item in data if item.get('id') == item_id), None)
     
+    def get_by_ids(
+        self, filename: str, item_ids: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Get the items matching several IDs with a single load of the file"""
+        wanted = set(item_ids)
+        data = self.load_data(filename)
+        return {item['id']: item for item in data if item.get('id') in wanted}
+    
     def create_item(self, filename: str, item: Dict[str, Any]) -> bool:
         """Create new item in file"""
-        data = self.load_data(filename)
-        data.append(item)
-        return self.save_data(filename, data)
+        with self.lock(filename):
+            data = self.load_data(filename)
+            data.append(item)
+            return self.save_data(filename, data)
     
     def update_item(self, filename: str, item_id: str, updates: Dict[str, Any]) -> bool:
         """Update item in file"""
-        data = self.load_data(filename)
-        for item in data:
-            if item.get('id') == item_id:
-                item.update(updates)
-                return self.save_data(filename, data)
-        return False
+        with self.lock(filename):
+            data = self.load_data(filename)
+            for item in data:
+                if item.get('id') == item_id:
+                    item.update(updates)
+                    return self.save_data(filename, data)
+            return False
     
     def delete_item(self, filename: str, item_id: str) -> bool:
         """Delete item from file"""
-        data = self.load_data(filename)
-        data = [item for item in data if item.get('id') != item_id]
-        return self.save_data(filename, data)
+        with self.lock(filename):
+            data = self.load_data(filename)
+            data = [item for item in data if item.get('id') != item_id]
+            return self.save_data(filename, data)
     
     def backup_data(self, filename: str) -> str:
         """Create backup of data file"""
@@ -100,6 +220,14 @@ class DatabaseManager:
             return False
 
 
+def legacy_data_manager(config: Config) -> DatabaseManager:
+    """Manager over LEGACY_DATA_FOLDER, so legacy writers share the same file locks"""
+    base = config if isinstance(config, type) else type(config)
+    return DatabaseManager(
+        type("LegacyDataConfig", (base,), {"DATA_FOLDER": config.LEGACY_DATA_FOLDER})
+    )
+
+
 class ActivityLogger:
     """Activity logging system"""
     
@@ -0,0 +1,410 @@
+"""
+In-memory secondary indexes for Wiki Veloz
+CDD v2.0 - Incrementally maintained indexes over JSON collections
+"""
+
+import base64
+import bisect
+import copy
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.database import DatabaseManager
+
+# Fixed reference point for forward-decayed scores. Scores are stored as
+# log(sum(exp(rate * (t_i - epoch)))) so they never need to be re-decayed:
+# every item decays at the same rate, so ordering by the stored value is the
+# same as ordering by the decayed value at any instant.
+TRENDING_EPOCH = datetime(2024, 1, 1).timestamp()
+
+
+def trending_rate(half_life_hours: float) -> float:
+    """Decay rate (per second) for a given half-life"""
+    return math.log(2) / (half_life_hours * 3600)
+
+
+def trending_bump(
+    log_score: Optional[float],
+    half_life_hours: float,
+    weight: float = 1.0,
+    now: Optional[float] = None,
+) -> float:
+    """Add one weighted event at ``now`` to a forward-decayed log score"""
+    now = time.time() if now is None else now
+    event = math.log(weight) + trending_rate(half_life_hours) * (now - TRENDING_EPOCH)
+    if log_score is None:
+        return event
+    high, low = max(log_score, event), min(log_score, event)
+    return high + math.log1p(math.exp(low - high))
+
+
+def trending_value(
+    log_score: Optional[float],
+    half_life_hours: float,
+    now: Optional[float] = None,
+) -> float:
+    """Current decayed score (events weighted by age) for a stored log score"""
+    if log_score is None:
+        return 0.0
+    now = time.time() if now is None else now
+    return math.exp(log_score - trending_rate(half_life_hours) * (now - TRENDING_EPOCH))
+
+
+class CollectionIndex:
+    """Base class for an index rebuilt from, and kept in sync with, a collection"""
+
+    def rebuild(self, records: Iterable[dict]) -> None:
+        """Rebuild the index from every record in the collection"""
+        raise NotImplementedError
+
+    def upsert(self, record: dict) -> None:
+        """Insert or refresh a single record"""
+        raise NotImplementedError
+
+    def discard(self, item_id: str) -> bool:
+        """Drop a record; return False if the index can no longer be trusted"""
+        raise NotImplementedError
+
+
+class TopKIndex(CollectionIndex):
+    """Bounded min-heap holding the K records with the highest score.
+
+    Scores are expected to only grow between rebuilds (counters, forward
+    decayed trending scores), so a record outside the top K can only enter by
+    beating the current minimum. Superseded heap entries are skipped lazily.
+    """
+
+    def __init__(self, k: int, score: Callable[[dict], Optional[float]]):
+        self.k = k
+        self.score = score
+        self._heap: List[Tuple[float, str]] = []
+        self._members: Dict[str, Tuple[float, dict]] = {}
+
+    def rebuild(self, records: Iterable[dict]) -> None:
+        self._heap = []
+        self._members = {}
+        for record in records:
+            self.upsert(record)
+
+    def upsert(self, record: dict) -> None:
+        item_id = record.get("id")
+        score = self.score(record)
+        if item_id is None or score is None:
+            return
+
+        if item_id in self._members:
+            self._members[item_id] = (score, record)
+            heapq.heappush(self._heap, (score, item_id))
+        elif len(self._members) < self.k:
+            self._members[item_id] = (score, record)
+            heapq.heappush(self._heap, (score, item_id))
+        else:
+            self._drop_stale()
+            if score <= self._heap[0][0]:
+                return
+            _, evicted = heapq.heapreplace(self._heap, (score, item_id))
+            del self._members[evicted]
+            self._members[item_id] = (score, record)
+
+        if len(self._heap) > 2 * self.k:
+            self._heap = [(s, i) for i, (s, _) in self._members.items()]
+            heapq.heapify(self._heap)
+
+    def discard(self, item_id: str) -> bool:
+        # A removed member may leave room for a record we no longer track
+        return item_id not in self._members
+
+    def top(self, limit: int) -> List[dict]:
+        """Return up to ``limit`` records, highest score first"""
+        ranked = sorted(self._members.values(), key=lambda m: m[0], reverse=True)
+        return [copy.deepcopy(record) for _, record in ranked[:limit]]
+
+    def _drop_stale(self) -> None:
+        while self._heap:
+            score, item_id = self._heap[0]
+            member = self._members.get(item_id)
+            if member is not None and member[0] == score:
+                return
+            heapq.heappop(self._heap)
+
+
+class SortedIndex(CollectionIndex):
+    """Records kept ordered by ``(key, id)`` with bisect.
+
+    Reads are O(log n + limit) slices, writes are a bisect plus a list
+    insert. Ties on the key are broken by id so cursors are stable.
+    """
+
+    def __init__(self, key: Callable[[dict], Any]):
+        self.key = key
+        self._entries: List[Tuple[Any, str]] = []
+        self._keys: List[Any] = []
+        self._records: Dict[str, Tuple[Any, dict]] = {}
+
+    def rebuild(self, records: Iterable[dict]) -> None:
+        self._records = {
+            record["id"]: (self.key(record), record)
+            for record in records
+            if record.get("id") is not None
+        }
+        self._entries = sorted(
+            (key, item_id) for item_id, (key, _) in self._records.items()
+        )
+        self._keys = [key for key, _ in self._entries]
+
+    def upsert(self, record: dict) -> None:
+        item_id = record.get("id")
+        if item_id is None:
+            return
+        self._remove_entry(item_id)
+        key = self.key(record)
+        entry = (key, item_id)
+        position = bisect.bisect_right(self._entries, entry)
+        self._entries.insert(position, entry)
+        self._keys.insert(position, key)
+        self._records[item_id] = (key, record)
+
+    def discard(self, item_id: str) -> bool:
+        self._remove_entry(item_id)
+        self._records.pop(item_id, None)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def page(
+        self,
+        limit: int,
+        cursor: Optional[Tuple[Any, str]] = None,
+        descending: bool = True,
+        start: Any = None,
+        end: Any = None,
+    ) -> Tuple[List[dict], Optional[Tuple[Any, str]]]:
+        """Return one page of records and the cursor for the next page.
+
+        ``start``/``end`` bound the key (both inclusive); ``cursor`` is the
+        ``(key, id)`` of the last record of the previous page. Records are
+        copies, so callers may modify them. A cursor or bound whose key
+        cannot be compared with the index keys raises ValueError.
+        """
+        try:
+            low = 0 if start is None else bisect.bisect_left(self._keys, start)
+            high = (
+                len(self._entries)
+                if end is None
+                else bisect.bisect_right(self._keys, end)
+            )
+
+            if descending:
+                if cursor is not None:
+                    high = min(high, bisect.bisect_left(self._entries, tuple(cursor)))
+                first = max(low, high - limit)
+                entries = self._entries[first:high][::-1]
+                has_more = first > low
+            else:
+                if cursor is not None:
+                    low = max(low, bisect.bisect_right(self._entries, tuple(cursor)))
+                last = min(high, low + max(limit, 0))
+                entries = self._entries[low:last]
+                has_more = last < high
+        except TypeError as e:
+            raise ValueError("Cursor não corresponde a esta ordenação") from e
+
+        records = [copy.deepcopy(self._records[item_id][1]) for _, item_id in entries]
+        next_cursor = entries[-1] if entries and has_more else None
+        return records, next_cursor
+
+    def _remove_entry(self, item_id: str) -> None:
+        current = self._records.get(item_id)
+        if current is None:
+            return
+        entry = (current[0], item_id)
+        position = bisect.bisect_left(self._entries, entry)
+        if position < len(self._entries) and self._entries[position] == entry:
+            del self._entries[position]
+            del self._keys[position]
+
+
+def encode_cursor(
+    entry: Optional[Tuple[Any, str]], sort: Optional[str] = None
+) -> Optional[str]:
+    """Encode an index position as an opaque URL-safe cursor.
+
+    ``sort`` names the ordering the position belongs to (e.g. ``-updated_at``)
+    and is checked by ``decode_cursor``.
+    """
+    if entry is None:
+        return None
+    raw = json.dumps([sort, *entry], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(
+    cursor: Optional[str], sort: Optional[str] = None
+) -> Optional[Tuple[Any, str]]:
+    """Decode a cursor produced by ``encode_cursor`` for the same ``sort``.
+
+    Raises ValueError for a malformed cursor or one made for another sort.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, key, item_id = json.loads(
+            base64.urlsafe_b64decode(padded.encode("ascii"))
+        )
+    except Exception as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
+    if cursor_sort != sort:
+        raise ValueError(f"Cursor de outra ordenação: {cursor_sort or 'padrão'}")
+    return key, item_id
+
+
+class CollectionIndexes:
+    """Secondary indexes attached to one JSON collection file.
+
+    Indexes are shared by every repository instance in the process and are
+    validated against the file's (inode, mtime, size) signature, so writes
+    made by other workers trigger a lazy rebuild instead of serving stale data.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, filename: str):
+        self.db_manager = db_manager
+        self.filename = filename
+        self._factories: Dict[str, Callable[[], CollectionIndex]] = {}
+        self._indexes: Dict[str, CollectionIndex] = {}
+        self._signatures: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Callable[[], CollectionIndex]) -> None:
+        """Declare an index; registering the same name twice is a no-op"""
+        with self._lock:
+            self._factories.setdefault(name, factory)
+
+    def signature(self) -> Optional[Tuple[int, int, int]]:
+        """Current signature of the backing file"""
+        return self.db_manager.file_signature(self.filename)
+
+    def get(self, name: str) -> CollectionIndex:
+        """Return an up-to-date index, rebuilding it if the file changed"""
+        with self._lock:
+            signature = self.signature()
+            index = self._indexes.get(name)
+            if index is None or self._signatures.get(name) != signature:
+                index = self._factories[name]()
+                index.rebuild(self.db_manager.load_data(self.filename))
+                self._indexes[name] = index
+                self._signatures[name] = signature
+            return index
+
+    def apply(
+        self,
+        before: Optional[Tuple[int, int, int]],
+        upserts: Iterable[dict] = (),
+        removals: Iterable[str] = (),
+    ) -> None:
+        """Fold a successful write into every index built from ``before``.
+
+        ``before`` is the file signature taken before the collection was
+        loaded for the write. Indexes built from another state are left
+        alone and will rebuild on their next read.
+        """
+        upserts = list(upserts)
+        removals = list(removals)
+        with self._lock:
+            after = self.signature()
+            for name, index in list(self._indexes.items()):
+                if self._signatures.get(name) != before:
+                    continue
+                trusted = all(index.discard(item_id) for item_id in removals)
+                for record in upserts:
+                    index.upsert(record)
+                self._signatures[name] = after if trusted else None
+
+
+_registry: Dict[str, CollectionIndexes] = {}
+_registry_lock = threading.Lock()
+
+
+def get_collection_indexes(
+    db_manager: DatabaseManager, filename: str
+) -> CollectionIndexes:
+    """Return the process-wide index set for a collection file"""
+    path = os.path.abspath(os.path.join(db_manager.data_folder, filename))
+    with _registry_lock:
+        indexes = _registry.get(path)
+        if indexes is None:
+            indexes = CollectionIndexes(db_manager, filename)
+            _registry[path] = indexes
+        return indexes
+
+
+_WORD = re.compile(r"\w+")
+
+
+class TokenIndex:
+    """Inverted index from lowercased words to the keys of the texts holding them.
+
+    Used to narrow substring searches over large texts: if ``query`` occurs
+    in a text, every word of the query is part of some word of that text,
+    so ``candidates`` returns a superset of the matching keys. Callers then
+    check the few candidates instead of reading every text.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Set[str]] = {}
+        self._keys: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def add(self, key: str, text: str) -> None:
+        """Index a text under key (a text is never re-indexed)"""
+        words = set(_WORD.findall(text.lower()))
+        with self._lock:
+            if key in self._keys:
+                return
+            for word in words:
+                self._postings.setdefault(word, set()).add(key)
+            self._keys.add(key)
+
+    def candidates(self, query: str) -> Set[str]:
+        """Keys whose text may contain query; empty when query has no word"""
+        words = set(_WORD.findall(query.lower()))
+        if not words:
+            return set()
+        with self._lock:
+            result: Optional[Set[str]] = None
+            for word in words:
+                keys: Set[str] = set()
+                # Words at the edges of the query may be pieces of longer words
+                for token, postings in self._postings.items():
+                    if word in token:
+                        keys |= postings
+                result = keys if result is None else result & keys
+                if not result:
+                    break
+            return result or set()
+
+
+_token_indexes: Dict[str, TokenIndex] = {}
+_token_indexes_lock = threading.Lock()
+
+
+def get_token_index(root: str) -> TokenIndex:
+    """Return the process-wide token index for a text store folder"""
+    path = os.path.abspath(root)
+    with _token_indexes_lock:
+        index = _token_indexes.get(path)
+        if index is None:
+            index = TokenIndex()
+            _token_indexes[path] = index
+        return index
@@ -0,0 +1,217 @@
+"""
+Upload integrity for Wiki Veloz
+CDD v2.0 - Reconcile upload records with the files actually on disk
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.blob_store import (
+    GC_GRACE_SECONDS,
+    BlobStore,
+    is_digest,
+    resolve_upload_path,
+)
+from app.core.indexes import CollectionIndexes
+from app.core.upload_migration import UploadCollection
+
+
+def list_directory(
+    path: str, cached: Optional[dict] = None
+) -> Tuple[Optional[dict], bool]:
+    """Files (name -> [size, mtime]) and subdirectories of one directory.
+
+    Returns (listing, rescanned). A cached listing taken at the directory's
+    current mtime is returned as is: creating, removing or renaming an
+    entry always bumps the mtime of the directory holding it. The mtime is
+    read before listing, so an entry added meanwhile forces the next rescan.
+    None when the directory does not exist.
+    """
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return None, True
+    if cached is not None and cached.get("mtime_ns") == mtime_ns:
+        return cached, False
+
+    files: Dict[str, List[float]] = {}
+    dirs: List[str] = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        dirs.append(entry.name)
+                    elif entry.is_file():
+                        stat = entry.stat()
+                        files[entry.name] = [stat.st_size, stat.st_mtime]
+                except OSError:
+                    continue  # removed while listing
+    except OSError:
+        return None, True
+    return {"mtime_ns": mtime_ns, "files": files, "dirs": dirs}, True
+
+
+def scan_tree(
+    roots: Dict[str, int], previous: Optional[Dict[str, dict]] = None, workers: int = 4
+) -> Tuple[Dict[str, dict], Dict[str, int]]:
+    """List directory trees breadth first, one level at a time in parallel.
+
+    ``roots`` maps each root to how many levels to descend (the blob store
+    needs 2, flat upload folders 0). Listings of directories whose mtime did
+    not change are taken from ``previous``. Returns ({abspath: listing},
+    {'scanned', 'reused'}).
+    """
+    previous = previous or {}
+    listings: Dict[str, dict] = {}
+    stats = {"scanned": 0, "reused": 0}
+    frontier = {os.path.abspath(root): depth for root, depth in roots.items()}
+
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="upload-scan"
+    ) as executor:
+        while frontier:
+            paths = [path for path in frontier if path not in listings]
+            results = executor.map(
+                lambda path: list_directory(path, previous.get(path)), paths
+            )
+            next_frontier: Dict[str, int] = {}
+            for path, (listing, rescanned) in zip(paths, results):
+                if listing is None:
+                    continue
+                listings[path] = listing
+                stats["scanned" if rescanned else "reused"] += 1
+                if frontier[path] > 0:
+                    for name in listing["dirs"]:
+                        next_frontier[os.path.join(path, name)] = frontier[path] - 1
+            frontier = next_frontier
+
+    return listings, stats
+
+
+def scanned_size(listings: Dict[str, dict], path: str) -> Optional[int]:
+    """Size of a file as seen by the scan, None if it was not there"""
+    listing = listings.get(os.path.dirname(path))
+    entry = listing["files"].get(os.path.basename(path)) if listing else None
+    return entry[0] if entry else None
+
+
+def record_path(
+    blob_store: BlobStore, collection: UploadCollection, record: dict
+) -> Optional[str]:
+    """Absolute path of the file a record points at"""
+    path = resolve_upload_path(blob_store, record, collection.legacy_folder)
+    return os.path.abspath(path) if path else None
+
+
+def check_collection(
+    blob_store: BlobStore, collection: UploadCollection, listings: Dict[str, dict]
+) -> Dict[str, Tuple[str, Optional[int]]]:
+    """{record id: (path, scanned size or None)} for every record with a file"""
+    observed = {}
+    for record in collection.db_manager.load_data(collection.filename):
+        path = record_path(blob_store, collection, record)
+        if path and record.get("id"):
+            observed[record["id"]] = (path, scanned_size(listings, path))
+    return observed
+
+
+def _current_size(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return None
+
+
+def apply_file_flags(
+    blob_store: BlobStore,
+    collection: UploadCollection,
+    observed: Dict[str, Tuple[str, Optional[int]]],
+    indexes: Optional[CollectionIndexes] = None,
+) -> int:
+    """Write ``file_exists``/``file_size`` where they disagree with the scan.
+
+    One load and one save under the collection lock, whatever the number of
+    records. A disagreement may come from an upload or deletion that landed
+    after the walk, so each one is confirmed with a fresh stat before it is
+    written; records whose file changed since the walk are left alone.
+    Returns the records updated.
+    """
+    changed = []
+    with collection.db_manager.lock(collection.filename):
+        before = indexes.signature() if indexes else None
+        records = collection.db_manager.load_data(collection.filename)
+        for record in records:
+            entry = observed.get(record.get("id"))
+            if entry is None:
+                continue
+            path, size = entry
+            if record_path(blob_store, collection, record) != path:
+                continue
+            if (size is not None) != record.get("file_exists") or (
+                size is not None and size != record.get("file_size")
+            ):
+                size = _current_size(path)
+
+            updates = {"file_exists": size is not None}
+            if size is not None:
+                updates["file_size"] = size
+            if any(record.get(field) != value for field, value in updates.items()):
+                record.update(updates)
+                changed.append(record)
+
+        if not changed or not collection.db_manager.save_data(
+            collection.filename, records
+        ):
+            return 0
+        if indexes is not None:
+            indexes.apply(before, upserts=changed)
+    return len(changed)
+
+
+def find_orphans(
+    blob_store: BlobStore,
+    listings: Dict[str, dict],
+    used: Set[str],
+    folders: Iterable[str],
+    referenced: Iterable[str] = (),
+    grace_seconds: int = GC_GRACE_SECONDS,
+) -> List[dict]:
+    """Scanned files no record points at.
+
+    In the blob tree these are blobs without a record and without an owner
+    in the blob index (``referenced`` digests are never reported), and
+    derived files (thumbnails, indexes) whose blob is gone; in ``folders``
+    any file no record uses. Files younger than the grace period are skipped: an upload
+    writes its file before the record that references it.
+    """
+    cutoff = time.time() - grace_seconds
+    folders = {os.path.abspath(folder) for folder in folders}
+    referenced = set(referenced)
+    blob_root = os.path.abspath(blob_store.root)
+    orphans = []
+
+    for directory, listing in listings.items():
+        in_blobs = directory.startswith(blob_root + os.sep)
+        if not in_blobs and directory not in folders:
+            continue
+        for name, (size, mtime) in listing["files"].items():
+            if mtime > cutoff:
+                continue
+            path = os.path.join(directory, name)
+            if not in_blobs:
+                if path not in used:
+                    orphans.append({"path": path, "size": size, "kind": "file"})
+                continue
+            digest = name.split(".", 1)[0]
+            if not is_digest(digest):
+                continue
+            if name == digest:
+                if path not in used and digest not in referenced:
+                    orphans.append({"path": path, "size": size, "kind": "blob"})
+            elif digest not in listing["files"] and not name.endswith(".tmp"):
+                orphans.append({"path": path, "size": size, "kind": "derivative"})
+
+    return orphans
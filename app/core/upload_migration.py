@@ -0,0 +1,142 @@
+"""
+Upload migration for Wiki Veloz
+CDD v2.0 - Move files from flat upload folders into the sharded blob store
+"""
+
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from app.core.blob_store import BlobStore, is_digest, resolve_upload_path
+from app.core.database import DatabaseManager, legacy_data_manager
+
+
+@dataclass
+class UploadCollection:
+    """A JSON collection whose records point at files in a flat folder"""
+
+    ref_prefix: str
+    db_manager: DatabaseManager
+    filename: str
+    legacy_folder: str
+    # Fields that store the old file path and must follow the move
+    path_fields: Tuple[str, ...] = ()
+
+
+def upload_collections(
+    db_manager: DatabaseManager, document_folder: str
+) -> List[UploadCollection]:
+    """Every collection whose records own uploaded files"""
+    collections = [
+        UploadCollection("document", db_manager, "documents.json", document_folder)
+    ]
+
+    # Attachments and legacy PDFs keep their JSON in the legacy data folder
+    if os.path.isdir(db_manager.config.LEGACY_DATA_FOLDER):
+        legacy_db = legacy_data_manager(db_manager.config)
+        legacy_uploads = db_manager.config.LEGACY_UPLOAD_FOLDER
+        collections.append(
+            UploadCollection(
+                "attachment",
+                legacy_db,
+                "attachments.json",
+                os.path.join(legacy_uploads, "attachments"),
+                path_fields=("file_path",),
+            )
+        )
+        collections.append(
+            UploadCollection("pdf", legacy_db, "pdfs.json", legacy_uploads)
+        )
+    return collections
+
+
+def migrate_collection(
+    blob_store: BlobStore,
+    collection: UploadCollection,
+    batch_size: int = 50,
+    pause: float = 0.0,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    """Move a collection's flat files into the blob store, one batch at a time.
+
+    The app keeps serving while this runs. Files are copied into the blob
+    store without holding any lock. The collection is then reloaded under
+    its lock and each record that still points at the copied file gets its
+    ``sha256``; from that save on, readers resolve the blob. The flat file
+    is removed last, and only when no unmigrated record still uses it.
+    Records added meanwhile are picked up by the next run.
+    """
+    stats = {"migrated": 0, "missing": 0, "bytes": 0}
+    seen = set()
+
+    while True:
+        records = collection.db_manager.load_data(collection.filename)
+        batch = [
+            record
+            for record in records
+            if record.get("id") not in seen
+            and not is_digest(record.get("sha256"))
+            and record.get("filename")
+        ][:batch_size]
+        if not batch:
+            return stats
+
+        copied = {}
+        for record in batch:
+            seen.add(record.get("id"))
+            path = resolve_upload_path(blob_store, record, collection.legacy_folder)
+            if not os.path.isfile(path):
+                stats["missing"] += 1
+                continue
+            if dry_run:
+                stats["migrated"] += 1
+                stats["bytes"] += os.path.getsize(path)
+                continue
+            digest, size = blob_store.put_file(path)
+            copied[record["id"]] = (path, digest, size)
+
+        if not copied:
+            continue
+
+        migrated = []
+        with collection.db_manager.lock(collection.filename):
+            records = collection.db_manager.load_data(collection.filename)
+            for record in records:
+                entry = copied.get(record.get("id"))
+                if entry is None or is_digest(record.get("sha256")):
+                    continue
+                path, digest, size = entry
+                if (
+                    resolve_upload_path(blob_store, record, collection.legacy_folder)
+                    != path
+                ):
+                    continue
+                record["sha256"] = digest
+                record["file_size"] = record.get("file_size") or size
+                for field in collection.path_fields:
+                    record[field] = blob_store.path_for(digest)
+                migrated.append((record["id"], path, digest, size))
+
+            if not migrated or not collection.db_manager.save_data(
+                collection.filename, records
+            ):
+                continue
+            still_used = {
+                resolve_upload_path(blob_store, record, collection.legacy_folder)
+                for record in records
+                if not is_digest(record.get("sha256"))
+            }
+
+        for record_id, path, digest, size in migrated:
+            blob_store.add_ref(digest, f"{collection.ref_prefix}:{record_id}", size)
+            stats["migrated"] += 1
+            stats["bytes"] += size
+            if path not in still_used:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+        if pause:
+            time.sleep(pause)
@@ -155,7 +155,7 @@ def get_page_analytics():
         # Páginas por tamanho (aproximado)
         pages_by_size = []
         for page in pages:
-            content_length = len(page["content"])
+            content_length = page.get("content_length", len(page.get("content", "")))
             size_category = (
                 "Pequena"
                 if content_length < 1000
@@ -5,7 +5,7 @@ CDD v2.0 - User data management
 
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from werkzeug.security import generate_password_hash
 
@@ -31,6 +31,10 @@ class UserRepository:
         """Get user by ID"""
         return self.db_manager.get_by_id(self.filename, user_id)
     
+    def get_users_by_ids(self, user_ids: List[str]) -> Dict[str, dict]:
+        """Get users for several IDs with a single load of users.json"""
+        return self.db_manager.get_by_ids(self.filename, user_ids)
+    
     def get_user_by_username(self, username: str) -> Optional[dict]:
         """Get user by username"""
         users = self.load_users()
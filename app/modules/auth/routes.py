@@ -11,6 +11,7 @@ from app.core.database import DatabaseManager
 from app.modules.activity.decorators import log_user_action, log_user_management_action
 from app.modules.auth.models.user import User
 from app.modules.auth.services.auth_service import AuthService
+from app.shared.listing import parse_id_list
 
 # Initialize services
 db_manager = DatabaseManager(config['default'])
@@ -207,6 +208,25 @@ def search_users():
     return jsonify({"success": True, "data": users})
 
 
+@auth_bp.route("/api/users/batch")
+@login_required
+def get_users_batch():
+    """Get several users by id (API)"""
+    if current_user.role != "admin":
+        return jsonify({"error": "Acesso negado"}), 403
+    
+    try:
+        ids = parse_id_list(request.args.get("ids"))
+    except ValueError as e:
+        return (
+            jsonify({"success": False, "message": f"Parâmetro inválido: {str(e)}"}),
+            400,
+        )
+    
+    result = auth_service.get_users_batch(ids)
+    return jsonify({"success": True, **result, "count": len(result["data"])})
+
+
 @auth_bp.route("/api/users/activities")
 @login_required
 def get_user_activities():
@@ -110,6 +110,27 @@ class AuthService:
         """Get user by ID"""
         return self.user_repository.get_user_by_id(user_id)
     
+    def can_modify(self, user_id: str, author_id: Optional[str]) -> bool:
+        """Whether a user may edit, delete or restore content: its author or an admin"""
+        if author_id is not None and author_id == user_id:
+            return True
+        user_data = self.user_repository.get_user_by_id(user_id)
+        return bool(user_data) and user_data.get('role') == 'admin'
+    
+    def get_users_batch(self, user_ids: list) -> dict:
+        """Resolve several users at once, without password hashes"""
+        found = self.user_repository.get_users_by_ids(user_ids)
+        return {
+            'data': {
+                user_id: {
+                    k: v for k, v in found[user_id].items() if k != 'password_hash'
+                }
+                for user_id in user_ids
+                if user_id in found
+            },
+            'missing': [user_id for user_id in user_ids if user_id not in found],
+        }
+    
     def validate_user_data(self, user_data: dict) -> tuple[bool, str]:
         """Validate user data"""
         required_fields = ['username', 'name', 'email', 'role']
@@ -3,9 +3,7 @@ Backup Routes for Wiki Veloz
 CDD v2.0 - Complete backup API endpoints
 """
 
-from io import BytesIO
-
-from flask import Blueprint, jsonify, render_template, request, send_file
+from flask import Blueprint, jsonify, render_template, request
 from flask_login import current_user, login_required
 
 from app.core.config import Config
@@ -13,6 +11,7 @@ from app.modules.backup.repositories.backup_repository import BackupRepository
 from app.modules.backup.services.backup_service import BackupService
 from app.modules.backup.validators.backup_validator import BackupValidator
 from app.shared.exceptions import BackupError
+from app.shared.file_serving import send_stored_file
 
 backup_bp = Blueprint("backup", __name__)
 
@@ -149,10 +148,10 @@ def download_backup(backup_id):
         if not backup:
             return jsonify({"error": "Backup não encontrado"}), 404
         
-        file_data = backup_service.download_backup(backup_id)
+        file_path = backup_service.get_backup_file_path(backup_id)
         
-        return send_file(
-            BytesIO(file_data),
+        return send_stored_file(
+            str(file_path),
             mimetype='application/octet-stream',
             as_attachment=True,
             download_name=backup.filename
@@ -20,6 +20,7 @@ from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload
 
 from app.shared.exceptions import BackupError
+from app.core.blob_store import is_digest
 from app.core.config import Config
 
 
@@ -92,6 +93,20 @@ class BackupService:
                         dirs_exist_ok=True
                     )
                 
+                # Backup uploaded blobs; thumbnails and other derivatives
+                # are rebuilt on demand, so only the originals are kept
+                blobs_backup_path = temp_path / "blobs"
+                blobs_backup_path.mkdir()
+                
+                blob_folder = Path(self.config.BLOB_FOLDER)
+                if blob_folder.exists():
+                    for blob_file in blob_folder.rglob("*"):
+                        if blob_file.is_file() and is_digest(blob_file.name):
+                            relative = blob_file.relative_to(blob_folder)
+                            target = blobs_backup_path / relative
+                            target.parent.mkdir(parents=True, exist_ok=True)
+                            shutil.copy2(blob_file, target)
+                
                 # Create backup manifest
                 manifest = {
                     "backup_id": backup_id,
@@ -102,10 +117,15 @@ class BackupService:
                     "files": {
                         "data": [f.name for f in data_backup_path.glob("*.json")],
                         "static": [
-                        str(f.relative_to(static_backup_path))
-                        for f in static_backup_path.rglob("*")
-                        if f.is_file()
-                    ]
+                            str(f.relative_to(static_backup_path))
+                            for f in static_backup_path.rglob("*")
+                            if f.is_file()
+                        ],
+                        "blobs": [
+                            str(f.relative_to(blobs_backup_path))
+                            for f in blobs_backup_path.rglob("*")
+                            if f.is_file()
+                        ],
                     }
                 }
                 
@@ -235,6 +255,15 @@ class BackupService:
                         if uploads_backup.exists():
                             shutil.rmtree(static_folder, ignore_errors=True)
                             shutil.copytree(uploads_backup, static_folder)
+                    
+                    # Restore uploaded blobs
+                    blobs_backup_path = temp_path / "blobs"
+                    if blobs_backup_path.exists():
+                        shutil.copytree(
+                            blobs_backup_path,
+                            Path(self.config.BLOB_FOLDER),
+                            dirs_exist_ok=True
+                        )
                 
                 return {
                     "success": True,
@@ -355,8 +384,8 @@ class BackupService:
         
         return file.get('id')
     
-    def download_backup(self, backup_id: str) -> bytes:
-        """Download backup file"""
+    def get_backup_file_path(self, backup_id: str) -> Path:
+        """Path of a backup archive on disk"""
         backup_info = self.get_backup_by_id(backup_id)
         if not backup_info:
             raise BackupError(f"Backup {backup_id} not found")
@@ -365,7 +394,11 @@ class BackupService:
         if not file_path.exists():
             raise BackupError(f"Backup file not found: {backup_info['filename']}")
         
-        with open(file_path, 'rb') as f:
+        return file_path
+    
+    def download_backup(self, backup_id: str) -> bytes:
+        """Download backup file"""
+        with open(self.get_backup_file_path(backup_id), 'rb') as f:
             return f.read()
     
     def cleanup_old_backups(self, max_backups: int = 10) -> int:
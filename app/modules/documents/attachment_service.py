@@ -8,12 +8,25 @@ from datetime import datetime
 
 from werkzeug.utils import secure_filename
 
+from app.core.blob_store import get_blob_store, resolve_upload_path
+from app.core.config import config
+from app.core.database import DatabaseManager, legacy_data_manager
+from app.shared.exceptions import FileUploadError
+
 
 class AttachmentService:
     """Serviço para gerenciar anexos de documentos"""
 
-    def __init__(self):
-        self.upload_folder = "static/uploads/attachments"
+    def __init__(self, blob_store=None, db_manager=None):
+        self.blob_store = blob_store or get_blob_store(
+            DatabaseManager(config["default"]())
+        )
+        # attachments.json é gravado sob o mesmo lock usado pela migração de uploads
+        self.db_manager = db_manager or legacy_data_manager(config["default"]())
+        self.filename = "attachments.json"
+        self.upload_folder = os.path.join(
+            config["default"].LEGACY_UPLOAD_FOLDER, "attachments"
+        )
         self.allowed_extensions = {
             "pdf",
             "png",
@@ -51,22 +64,18 @@ class AttachmentService:
             ):
                 return None
 
-            # Verificar tamanho
-            file.seek(0, os.SEEK_END)
-            file_size = file.tell()
-            file.seek(0)
-
-            if file_size > self.max_file_size:
+            # Salvar no blob store (conteúdo idêntico é guardado uma vez só)
+            try:
+                digest, file_size = self.blob_store.put_stream(
+                    file.stream, self.max_file_size
+                )
+            except FileUploadError:
                 return None
 
-            # Gerar nome único
             original_filename = secure_filename(file.filename)
             extension = original_filename.rsplit(".", 1)[1].lower()
             filename = f"{str(uuid.uuid4())}.{extension}"
-            file_path = os.path.join(self.upload_folder, filename)
-
-            # Salvar arquivo
-            file.save(file_path)
+            file_path = self.blob_store.path_for(digest)
 
             # Determinar MIME type
             mime_type, _ = mimetypes.guess_type(original_filename)
@@ -81,6 +90,7 @@ class AttachmentService:
                 "filename": filename,
                 "file_path": file_path,
                 "file_size": file_size,
+                "sha256": digest,
                 "mime_type": mime_type,
                 "description": description,
                 "uploaded_by": uploaded_by,
@@ -89,6 +99,7 @@ class AttachmentService:
 
             # Salvar no JSON
             self._save_attachment(attachment)
+            self.blob_store.add_ref(digest, f"attachment:{attachment['id']}", file_size)
 
             return attachment
 
@@ -117,6 +128,10 @@ class AttachmentService:
             print(f"Error ao buscar anexo: {e}")
             return None
 
+    def get_attachment_path(self, attachment):
+        """Caminho do arquivo de um anexo (blob particionado ou pasta antiga)"""
+        return resolve_upload_path(self.blob_store, attachment, self.upload_folder)
+
     def delete_attachment(self, attachment_id):
         """Deleta um anexo"""
         try:
@@ -124,14 +139,21 @@ class AttachmentService:
             if not attachment:
                 return False
 
-            # Deletar arquivo físico
-            if os.path.exists(attachment["file_path"]):
-                os.remove(attachment["file_path"])
+            # Liberar o blob compartilhado ou deletar o arquivo físico antigo
+            if attachment.get("sha256"):
+                self.blob_store.release(
+                    attachment["sha256"], f"attachment:{attachment_id}"
+                )
+            else:
+                file_path = self.get_attachment_path(attachment)
+                if file_path and os.path.exists(file_path):
+                    os.remove(file_path)
 
             # Remover do JSON
-            attachments = self._load_attachments()
-            attachments = [att for att in attachments if att["id"] != attachment_id]
-            self._save_attachments(attachments)
+            with self.db_manager.lock(self.filename):
+                attachments = self._load_attachments()
+                attachments = [att for att in attachments if att["id"] != attachment_id]
+                self._save_attachments(attachments)
 
             return True
 
@@ -141,64 +163,31 @@ class AttachmentService:
 
     def _load_attachments(self):
         """Carrega anexos do arquivo JSON"""
-        try:
-            import json
-
-            file_path = "data/attachments.json"
-
-            if not os.path.exists(file_path):
-                return []
-
-            with open(file_path, encoding="utf-8") as f:
-                return json.load(f)
-
-        except Exception as e:
-            print(f"Error ao carregar anexos: {e}")
-            return []
+        return self.db_manager.load_data(self.filename)
 
     def _save_attachment(self, attachment):
         """Salva um anexo no arquivo JSON"""
-        try:
-            import json
-            import os
-
-            file_path = "data/attachments.json"
-            os.makedirs("data", exist_ok=True)
-
+        with self.db_manager.lock(self.filename):
             attachments = self._load_attachments()
             attachments.append(attachment)
-
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(attachments, f, ensure_ascii=False, indent=2)
-
-        except Exception as e:
-            print(f"Error ao salvar anexo: {e}")
+            if not self._save_attachments(attachments):
+                print("Error ao salvar anexo")
 
     def _save_attachments(self, attachments):
         """Salva lista de anexos no arquivo JSON"""
-        try:
-            import json
-            import os
-
-            file_path = "data/attachments.json"
-            os.makedirs("data", exist_ok=True)
-
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(attachments, f, ensure_ascii=False, indent=2)
-
-        except Exception as e:
-            print(f"Error ao salvar anexos: {e}")
+        return self.db_manager.save_data(self.filename, attachments)
 
     def update_attachment_description(self, attachment_id, description):
         """Atualiza a descrição de um anexo"""
         try:
-            attachments = self._load_attachments()
-
-            for att in attachments:
-                if att["id"] == attachment_id:
-                    att["description"] = description
-                    self._save_attachments(attachments)
-                    return att
+            with self.db_manager.lock(self.filename):
+                attachments = self._load_attachments()
+
+                for att in attachments:
+                    if att["id"] == attachment_id:
+                        att["description"] = description
+                        self._save_attachments(attachments)
+                        return att
 
             return None
         except Exception as e:
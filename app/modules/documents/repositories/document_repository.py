@@ -5,24 +5,92 @@ CDD v2.0 - Document data management
 
 import os
 import re
+import time
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from werkzeug.utils import secure_filename
 
+from app.core.blob_store import get_blob_store, is_digest, resolve_upload_path
+from app.core.content_store import ContentStore
 from app.core.database import DatabaseManager
+from app.core.indexes import (
+    SortedIndex,
+    TopKIndex,
+    decode_cursor,
+    encode_cursor,
+    get_collection_indexes,
+    get_token_index,
+    trending_bump,
+    trending_value,
+)
+from app.shared.exceptions import FileUploadError, VersionConflictError
+from app.shared.listing import ListingQuery, build_sorted_index, paginate_index
+from app.shared.text_extraction import EXTRACTOR_VERSION
+from app.shared.uploads import StoredUpload, check_upload_extension
 
 
 class DocumentRepository:
     """Repository for document operations"""
     
+    # Fields listings may be sorted by, with the key used for missing values
+    SORTABLE_FIELDS = {
+        'title': '',
+        'category': '',
+        'created_at': '',
+        'updated_at': '',
+        'downloads': 0
+    }
+    
+    # Sorts answered straight from a maintained index
+    INDEXED_SORTS = {'updated_at': 'recent', 'downloads': 'popular'}
+    
+    # Fields managed by the repository, never written by partial updates
+    READONLY_FIELDS = {
+        'id', 'version', 'created_at', 'updated_at', 'author_id', 'downloads',
+        'trending_score', 'filename', 'original_filename', 'file_size', 'file_exists',
+        'sha256'
+    }
+    
+    # Upload limits
+    ALLOWED_EXTENSIONS = {
+        'pdf', 'doc', 'docx', 'txt', 'rtf', 'odt',
+        'xls', 'xlsx', 'csv', 'ppt', 'pptx',
+        'jpg', 'jpeg', 'png', 'gif', 'bmp', 'tif', 'tiff'
+    }
+    MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+    
     def __init__(self, db_manager: DatabaseManager):
         self.db_manager = db_manager
         self.filename = "documents.json"
         # Use relative path from project root
         self.upload_folder = "app/static/uploads/documents"
         self._ensure_upload_folder()
+        self.blob_store = get_blob_store(db_manager)
+        # Text pulled out of uploaded files, one gzip body per blob digest
+        self.text_store = ContentStore(
+            os.path.join(db_manager.data_folder, "document_text"), suffix=".txt.gz"
+        )
+        # Words of that text, so searches only read the texts that may match
+        self.text_index = get_token_index(self.text_store.root)
+        self.indexes = get_collection_indexes(db_manager, self.filename)
+        self.indexes.register('trending', self._build_trending_index)
+        self.indexes.register(
+            'recent',
+            lambda: SortedIndex(lambda document: document.get('updated_at') or ''),
+        )
+        self.indexes.register(
+            'popular',
+            lambda: SortedIndex(lambda document: document.get('downloads') or 0),
+        )
+    
+    def _build_trending_index(self) -> TopKIndex:
+        """Top-K heap over the time-decayed download score"""
+        return TopKIndex(
+            self.db_manager.config.TRENDING_TOP_K,
+            lambda document: document.get('trending_score')
+        )
     
     def _ensure_upload_folder(self):
         """Ensure upload folder exists"""
@@ -74,6 +142,10 @@ class DocumentRepository:
         """Get document by ID"""
         return self.db_manager.get_by_id(self.filename, document_id)
     
+    def get_documents_by_ids(self, document_ids: List[str]) -> Dict[str, dict]:
+        """Get documents for several IDs with a single load of documents.json"""
+        return self.db_manager.get_by_ids(self.filename, document_ids)
+    
     def get_document_by_filename(self, filename: str) -> Optional[dict]:
         """Get document by filename"""
         documents = self.load_documents()
@@ -81,60 +153,135 @@ class DocumentRepository:
     
     def create_document(self, document_data: dict, file_path: str = None) -> bool:
         """Create new document"""
-        documents = self.load_documents()
-        
-        # Generate ID if not provided
-        if 'id' not in document_data:
-            document_data['id'] = f"doc-{uuid.uuid4().hex[:8]}"
-        
-        # Add timestamps
-        document_data['created_at'] = datetime.now().isoformat()
-        document_data['updated_at'] = datetime.now().isoformat()
-        document_data['version'] = 1
-        document_data['downloads'] = 0
-        
-        # Add file information
-        if file_path and os.path.exists(file_path):
-            document_data['file_size'] = os.path.getsize(file_path)
-            document_data['file_exists'] = True
-        else:
-            document_data['file_size'] = 0
-            document_data['file_exists'] = False
-        
-        documents.append(document_data)
-        return self.save_documents(documents)
+        with self.db_manager.lock(self.filename):
+            before = self.indexes.signature()
+            documents = self.load_documents()
+            
+            # Generate ID if not provided
+            if 'id' not in document_data:
+                document_data['id'] = f"doc-{uuid.uuid4().hex[:8]}"
+            
+            # Add timestamps
+            document_data['created_at'] = datetime.now().isoformat()
+            document_data['updated_at'] = datetime.now().isoformat()
+            document_data['version'] = 1
+            document_data['downloads'] = 0
+            
+            # Add file information
+            if file_path and os.path.exists(file_path):
+                document_data['file_size'] = os.path.getsize(file_path)
+                document_data['file_exists'] = True
+            else:
+                document_data['file_size'] = 0
+                document_data['file_exists'] = False
+            
+            documents.append(document_data)
+            if self.save_documents(documents):
+                self.indexes.apply(before, upserts=[document_data])
+                if document_data.get('sha256'):
+                    self.blob_store.add_ref(
+                        document_data['sha256'],
+                        self._blob_ref(document_data['id']),
+                        document_data['file_size']
+                    )
+                return True
+            return False
     
-    def update_document(self, document_id: str, updates: dict) -> bool:
-        """Update document"""
-        documents = self.load_documents()
-        
-        for document in documents:
-            if document.get('id') == document_id:
-                # Update version
-                current_version = document.get('version', 1)
-                updates['version'] = current_version + 1
-                updates['updated_at'] = datetime.now().isoformat()
-                
-                document.update(updates)
-                return self.save_documents(documents)
-        
-        return False
+    def update_document(
+        self,
+        document_id: str,
+        updates: dict,
+        expected_version: Optional[int] = None,
+        removals: Iterable[str] = ()
+    ) -> bool:
+        """Update document, compare-and-swap on version if expected_version is set"""
+        with self.db_manager.lock(self.filename):
+            before = self.indexes.signature()
+            documents = self.load_documents()
+            
+            for document in documents:
+                if document.get('id') == document_id:
+                    # Compare and swap on the version
+                    current_version = document.get('version', 1)
+                    if (
+                        expected_version is not None
+                        and expected_version != current_version
+                    ):
+                        raise VersionConflictError(current_version)
+                    
+                    # Update version
+                    updates['version'] = current_version + 1
+                    updates['updated_at'] = datetime.now().isoformat()
+                    
+                    previous_blob = document.get('sha256')
+                    document.update(updates)
+                    for field in removals:
+                        document.pop(field, None)
+                    if self.save_documents(documents):
+                        self.indexes.apply(before, upserts=[document])
+                        if document.get('sha256') != previous_blob:
+                            self._swap_blob_ref(
+                                document_id, previous_blob, document.get('sha256')
+                            )
+                        return True
+                    return False
+            
+            return False
     
     def delete_document(self, document_id: str) -> bool:
         """Delete document and its file"""
-        document = self.get_document_by_id(document_id)
-        if document:
-            # Delete physical file
-            filename = document.get('filename')
-            if filename:  # Only try to delete if filename exists
-                file_path = os.path.join(self.upload_folder, filename)
-                if os.path.exists(file_path):
+        with self.db_manager.lock(self.filename):
+            before = self.indexes.signature()
+            document = self.get_document_by_id(document_id)
+            if document and document.get('sha256'):
+                # Shared blob, removed by garbage collection once unreferenced
+                self.blob_store.release(document['sha256'], self._blob_ref(document_id))
+            elif document:
+                # Delete physical file
+                file_path = resolve_upload_path(
+                    self.blob_store, document, self.upload_folder
+                )
+                if file_path and os.path.exists(file_path):
                     try:
                         os.remove(file_path)
                     except Exception as e:
                         print(f"Error deleting file: {e}")
+            
+            if self.db_manager.delete_item(self.filename, document_id):
+                self.indexes.apply(before, removals=[document_id])
+                return True
+            return False
+    
+    def query_documents(
+        self,
+        query: ListingQuery,
+        **filters
+    ) -> Tuple[List[dict], Optional[str], int]:
+        """Filter, sort and paginate; returns (documents, next_cursor, total)"""
+        if query.sort is not None and query.sort not in self.SORTABLE_FIELDS:
+            raise ValueError(f"Campo de ordenação inválido: {query.sort}")
+        
+        filters = {k: v for k, v in filters.items() if v is not None}
+        if not filters and query.sort in self.INDEXED_SORTS:
+            return paginate_index(
+                self.indexes.get(self.INDEXED_SORTS[query.sort]), query
+            )
+        
+        documents = [
+            document for document in self.load_documents()
+            if all(document.get(field) == value for field, value in filters.items())
+        ]
+        if query.sort is None:
+            return documents, None, len(documents)
         
-        return self.db_manager.delete_item(self.filename, document_id)
+        index = build_sorted_index(
+            documents, query.sort, self.SORTABLE_FIELDS[query.sort]
+        )
+        return paginate_index(index, query)
+    
+    def get_changes(self, since: int) -> Tuple[List[dict], List[str], int, bool]:
+        """Documents changed and ids deleted after a change sequence number"""
+        return self.db_manager.get_changes(self.filename, since)
     
     def get_documents_by_category(self, category: str) -> List[dict]:
         """Get documents by category"""
@@ -151,62 +298,143 @@ class DocumentRepository:
         documents = self.load_documents()
         return [d for d in documents if d.get('page_id') == page_id]
     
+    def _text_key(self, digest: str) -> str:
+        """Text store key for a blob under the current extractor"""
+        return f"{digest}.x{EXTRACTOR_VERSION}"
+    
+    def has_extracted_text(self, digest: Optional[str]) -> bool:
+        """Whether extraction already ran for a blob (possibly finding no text)"""
+        return is_digest(digest) and self.text_store.exists(self._text_key(digest))
+    
+    def load_extracted_text(self, digest: Optional[str]) -> str:
+        """Text extracted from a blob, or '' if none was stored"""
+        if not is_digest(digest):
+            return ''
+        return self.text_store.get(self._text_key(digest)) or ''
+    
+    def save_extracted_text(self, digest: str, text: str) -> None:
+        """Store the text extracted from a blob"""
+        self.text_store.put(self._text_key(digest), text)
+        self.text_index.add(self._text_key(digest), text)
+    
+    def _indexed_text_key(self, digest: Optional[str]) -> Optional[str]:
+        """Text key of a blob with stored text, indexing it on first sight"""
+        if not is_digest(digest):
+            return None
+        key = self._text_key(digest)
+        if key not in self.text_index:
+            # Extracted by another process, or before this one started
+            text = self.text_store.get(key)
+            if text is None:
+                return None
+            self.text_index.add(key, text)
+        return key
+    
     def search_documents(self, query: str) -> List[dict]:
-        """Search documents by title, description, or tags"""
+        """Search documents by title, description, tags or file text"""
         documents = self.load_documents()
         query_lower = query.lower()
         
-        results = []
+        matched = set()
+        text_keys = {}
         for document in documents:
             # Search in title
             if query_lower in document.get('title', '').lower():
-                results.append(document)
+                matched.add(document.get('id'))
                 continue
             
             # Search in description
             if query_lower in document.get('description', '').lower():
-                results.append(document)
+                matched.add(document.get('id'))
                 continue
             
             # Search in tags
             tags = document.get('tags', [])
             if any(query_lower in tag.lower() for tag in tags):
-                results.append(document)
+                matched.add(document.get('id'))
                 continue
+            
+            key = self._indexed_text_key(document.get('sha256'))
+            if key:
+                text_keys[document.get('id')] = key
         
-        return results
+        # Search in the uploaded files' text: only candidates are read from disk
+        candidates = self.text_index.candidates(query_lower) if text_keys else set()
+        for document_id, key in text_keys.items():
+            if (
+                key in candidates
+                and query_lower in (self.text_store.get(key) or '').lower()
+            ):
+                matched.add(document_id)
+        
+        return [d for d in documents if d.get('id') in matched]
+    
+    def list_recent_documents(
+        self,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """List documents by last update, newest first, with cursor and date range"""
+        documents, next_entry = self.indexes.get('recent').page(
+            limit, decode_cursor(cursor, 'recent'), start=since, end=until
+        )
+        return documents, encode_cursor(next_entry, 'recent')
     
     def get_recent_documents(self, limit: int = 10) -> List[dict]:
         """Get recent documents"""
-        documents = self.load_documents()
-        sorted_documents = sorted(
-            documents, 
-            key=lambda x: x.get('updated_at', ''), 
-            reverse=True
+        return self.list_recent_documents(limit)[0]
+    
+    def list_popular_documents(
+        self,
+        limit: int = 10,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """List documents by downloads, most popular first, with cursor"""
+        documents, next_entry = self.indexes.get('popular').page(
+            limit, decode_cursor(cursor, 'popular')
         )
-        return sorted_documents[:limit]
+        return documents, encode_cursor(next_entry, 'popular')
     
     def get_popular_documents(self, limit: int = 10) -> List[dict]:
         """Get popular documents by downloads"""
-        documents = self.load_documents()
-        sorted_documents = sorted(
-            documents, 
-            key=lambda x: x.get('downloads', 0), 
-            reverse=True
-        )
-        return sorted_documents[:limit]
+        return self.list_popular_documents(limit)[0]
+    
+    def get_trending_documents(self, limit: int = 10) -> List[dict]:
+        """Get trending documents by time-decayed downloads"""
+        half_life = self.db_manager.config.TRENDING_HALF_LIFE_HOURS
+        now = time.time()
+        return [
+            {
+                **document,
+                'trending': round(
+                    trending_value(document.get('trending_score'), half_life, now), 4
+                )
+            }
+            for document in self.indexes.get('trending').top(limit)
+        ]
     
     def increment_downloads(self, document_id: str) -> bool:
-        """Increment document downloads"""
-        documents = self.load_documents()
-        
-        for document in documents:
-            if document.get('id') == document_id:
-                current_downloads = document.get('downloads', 0)
-                document['downloads'] = current_downloads + 1
-                return self.save_documents(documents)
-        
-        return False
+        """Increment document downloads and its trending score"""
+        with self.db_manager.lock(self.filename):
+            before = self.indexes.signature()
+            documents = self.load_documents()
+            
+            for document in documents:
+                if document.get('id') == document_id:
+                    current_downloads = document.get('downloads', 0)
+                    document['downloads'] = current_downloads + 1
+                    document['trending_score'] = trending_bump(
+                        document.get('trending_score'),
+                        self.db_manager.config.TRENDING_HALF_LIFE_HOURS
+                    )
+                    if self.save_documents(documents):
+                        self.indexes.apply(before, upserts=[document])
+                        return True
+                    return False
+            
+            return False
     
     def get_document_file_path(self, document_id: str) -> Optional[str]:
         """Get document file path with error handling"""
@@ -214,19 +442,19 @@ class DocumentRepository:
         if not document:
             print(f"Document not found: {document_id}")
             return None
-            
+        
+        return self.resolve_file_path(document)
+    
+    def resolve_file_path(self, document: dict) -> Optional[str]:
+        """Absolute path of a document record's file, None if it has none on disk"""
         filename = document.get('filename')
         if not filename:
-            print(f"Document has no filename: {document_id}")
+            print(f"Document has no filename: {document.get('id')}")
             return None
-            
-        # Ensure upload folder exists
-        self._ensure_upload_folder()
         
-        # Get absolute path
-        import os
-        current_dir = os.getcwd()
-        file_path = os.path.join(current_dir, self.upload_folder, filename)
+        file_path = os.path.abspath(
+            resolve_upload_path(self.blob_store, document, self.upload_folder)
+        )
         
         if not os.path.exists(file_path):
             print(f"File not found: {file_path}")
@@ -237,19 +465,12 @@ class DocumentRepository:
     def validate_file_upload(self, filename: str, file_size: int) -> tuple[bool, str]:
         """Validate file upload"""
         # Check file extension
-        allowed_extensions = {
-            'pdf', 'doc', 'docx', 'txt', 'rtf', 'odt', 
-            'xls', 'xlsx', 'csv', 'ppt', 'pptx',
-            'jpg', 'jpeg', 'png', 'gif', 'bmp'
-        }
-        
         file_ext = filename.lower().split('.')[-1] if '.' in filename else ''
-        if file_ext not in allowed_extensions:
+        if file_ext not in self.ALLOWED_EXTENSIONS:
             return False, f'Extensão não permitida: {file_ext}'
         
         # Check file size (50MB max)
-        max_size = 50 * 1024 * 1024  # 50MB
-        if file_size > max_size:
+        if file_size > self.MAX_FILE_SIZE:
             return False, 'Arquivo muito grande (máximo 50MB)'
         
         # Check if filename already exists
@@ -259,24 +480,37 @@ class DocumentRepository:
         
         return True, 'Arquivo válido'
     
-    def save_uploaded_file(self, file, original_filename: str) -> str:
-        """Save uploaded file with sanitized filename"""
-        # Sanitize the filename
-        sanitized_filename = self.sanitize_filename(original_filename)
-        
-        # Ensure upload folder exists
-        self._ensure_upload_folder()
+    def store_uploaded_file(self, file, original_filename: str) -> StoredUpload:
+        """Stream an upload into the blob store; raises FileUploadError.
         
-        # Create full file path
-        file_path = os.path.join(self.upload_folder, sanitized_filename)
+        Extension and size are enforced while copying, so the upload never
+        has to be read into memory to be measured. Identical content is
+        stored once; the document references it through its ``sha256``.
+        """
+        sanitized_filename = self.sanitize_filename(original_filename)
+        check_upload_extension(sanitized_filename, self.ALLOWED_EXTENSIONS)
+        if self.get_document_by_filename(sanitized_filename):
+            raise FileUploadError('Arquivo com este nome já existe')
         
-        try:
-            file.save(file_path)
-            print(f"File saved: {original_filename} -> {sanitized_filename}")
-            return sanitized_filename  # Return sanitized filename for storage
-        except Exception as e:
-            print(f"Error saving file: {e}")
-            return ""
+        digest, size = self.blob_store.put_stream(file.stream, self.MAX_FILE_SIZE)
+        return StoredUpload(
+            filename=sanitized_filename,
+            path=self.blob_store.path_for(digest),
+            size=size,
+            sha256=digest
+        )
+    
+    def _blob_ref(self, document_id: str) -> str:
+        return f"document:{document_id}"
+    
+    def _swap_blob_ref(
+        self, document_id: str, old: Optional[str], new: Optional[str]
+    ) -> None:
+        """Move a document's blob reference after its file was replaced"""
+        if new:
+            self.blob_store.add_ref(new, self._blob_ref(document_id))
+        if old:
+            self.blob_store.release(old, self._blob_ref(document_id))
     
     def get_document_analytics(self, document_id: str) -> dict:
         """Get document analytics"""
@@ -319,7 +553,8 @@ class DocumentRepository:
             'total_size_mb': round(total_size / (1024 * 1024), 2),
             'existing_files': existing_files,
             'missing_files': total_files - existing_files,
-            'size_by_category': size_by_category
+            'size_by_category': size_by_category,
+            'blobs': self.blob_store.stats()
         }
 
     def generate_confirmation_id(self) -> str:
@@ -6,17 +6,42 @@ CDD v2.0 - Document endpoints
 import mimetypes
 import os
 from datetime import datetime
-
-from flask import Blueprint, jsonify, render_template, request, send_file
+from urllib.parse import quote
+
+from flask import (
+    Blueprint,
+    Response,
+    jsonify,
+    render_template,
+    request,
+    stream_with_context,
+)
 from flask_login import current_user, login_required
+from werkzeug.utils import secure_filename
 
 from app.core.config import config
 from app.core.database import DatabaseManager
 from app.modules.documents.services.document_service import DocumentService
+from app.modules.documents.services.thumbnail_service import (
+    PENDING,
+    READY,
+    placeholder_svg,
+)
+from app.modules.documents.services.upload_session_service import UploadSessionService
+from app.shared.decorators import conditional_get
+from app.shared.exceptions import (
+    FileUploadError,
+    UnsupportedPreviewError,
+    VersionConflictError,
+)
+from app.shared.file_serving import send_stored_file, stream_zip
+from app.shared.listing import MAX_LISTING_LIMIT, ListingQuery, parse_id_list
+from app.shared.utils import parse_expected_version, parse_iso_bound
 
 # Initialize services
 db_manager = DatabaseManager(config['default']())
 document_service = DocumentService(db_manager)
+upload_session_service = UploadSessionService(db_manager, document_service)
 
 documents_bp = Blueprint("documents", __name__)
 
@@ -29,15 +54,24 @@ def get_documents():
 
 @documents_bp.route("/api/", methods=["GET"])
 @login_required
+@conditional_get(db_manager, "documents.json")
 def get_documents_api():
-    """Get all documents API"""
+    """Get all documents API (supports fields, sort, limit and cursor)"""
     try:
-        documents = document_service.get_all_documents()
+        query = ListingQuery.from_args(request.args)
+        documents, next_cursor, total = document_service.list_documents(query)
         return jsonify({
             "success": True,
             "data": documents,
-            "count": len(documents)
+            "count": len(documents),
+            "total": total,
+            "next_cursor": next_cursor
         })
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Parâmetro inválido: {str(e)}"
+        }), 400
     except Exception as e:
         return jsonify({
             "success": False,
@@ -194,6 +228,141 @@ def create_document():
         }), 500
 
 
+@documents_bp.route("/uploads", methods=["POST"])
+@login_required
+def create_upload_session():
+    """Start a resumable chunked upload"""
+    try:
+        payload = request.get_json(silent=True) or {}
+        metadata = {
+            'title': payload.get('title', ''),
+            'description': payload.get('description', ''),
+            'category': payload.get('category', ''),
+            'tags': payload.get('tags', []),
+            'page_id': payload.get('page_id', '')
+        }
+
+        session = upload_session_service.create_session(
+            payload.get('filename', ''),
+            payload.get('size'),
+            current_user.id,
+            metadata,
+            sha256=payload.get('sha256'),
+            chunk_size=payload.get('chunk_size')
+        )
+
+        return jsonify({
+            "success": True,
+            "data": session
+        }), 201
+
+    except FileUploadError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
+@documents_bp.route("/uploads/<session_id>", methods=["GET"])
+@login_required
+def get_upload_session(session_id):
+    """Get the chunks received so far by an upload session"""
+    session = upload_session_service.get_session(session_id, current_user.id)
+    if not session:
+        return jsonify({
+            "success": False,
+            "message": "Sessão de upload não encontrada"
+        }), 404
+
+    return jsonify({
+        "success": True,
+        "data": session
+    })
+
+
+@documents_bp.route("/uploads/<session_id>/chunks/<int:index>", methods=["PUT"])
+@login_required
+def upload_chunk(session_id, index):
+    """Receive one chunk of a resumable upload (raw request body)"""
+    try:
+        offset = request.headers.get("X-Chunk-Offset")
+        session = upload_session_service.write_chunk(
+            session_id,
+            current_user.id,
+            index,
+            request.stream,
+            offset=int(offset) if offset is not None else None,
+            checksum=request.headers.get("X-Chunk-SHA256")
+        )
+        if not session:
+            return jsonify({
+                "success": False,
+                "message": "Sessão de upload não encontrada"
+            }), 404
+
+        return jsonify({
+            "success": True,
+            "data": session
+        })
+
+    except (FileUploadError, ValueError) as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
+@documents_bp.route("/uploads/<session_id>/complete", methods=["POST"])
+@login_required
+def complete_upload_session(session_id):
+    """Assemble a fully received upload into a document"""
+    try:
+        success, message = upload_session_service.complete(session_id, current_user.id)
+
+        if success:
+            return jsonify({
+                "success": True,
+                "message": message
+            }), 201
+        else:
+            return jsonify({
+                "success": False,
+                "message": message
+            }), 400
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
+@documents_bp.route("/uploads/<session_id>", methods=["DELETE"])
+@login_required
+def abort_upload_session(session_id):
+    """Discard a resumable upload"""
+    if not upload_session_service.abort(session_id, current_user.id):
+        return jsonify({
+            "success": False,
+            "message": "Sessão de upload não encontrada"
+        }), 404
+
+    return jsonify({
+        "success": True,
+        "message": "Upload cancelado"
+    })
+
+
 @documents_bp.route("/<document_id>", methods=["PUT"])
 @login_required
 def update_document(document_id):
@@ -207,10 +376,14 @@ def update_document(document_id):
                 "message": "Dados de atualização são obrigatórios"
             }), 400
 
+        expected_version = parse_expected_version(
+            request.headers.get("If-Match"), updates
+        )
         success, message = document_service.update_document(
             document_id,
             updates,
-            current_user.id
+            current_user.id,
+            expected_version
         )
 
         if success:
@@ -224,6 +397,74 @@ def update_document(document_id):
                 "message": message
             }), 400 if "não encontrado" in message else 403
 
+    except VersionConflictError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e),
+            "current_version": e.current_version
+        }), 409
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Parâmetro inválido: {str(e)}"
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
+@documents_bp.route("/<document_id>", methods=["PATCH"])
+@login_required
+def patch_document(document_id):
+    """Partially update document (JSON Patch and/or content delta)"""
+    try:
+        patch = request.get_json(force=True, silent=True)
+
+        if not patch:
+            return jsonify({
+                "success": False,
+                "message": "Dados de atualização são obrigatórios"
+            }), 400
+
+        expected_version = parse_expected_version(
+            request.headers.get("If-Match"), patch
+        )
+        success, message = document_service.patch_document(
+            document_id,
+            patch,
+            current_user.id,
+            expected_version
+        )
+
+        if success:
+            return jsonify({
+                "success": True,
+                "message": message
+            })
+        elif "não encontrado" in message:
+            status = 404
+        elif "Sem permissão" in message:
+            status = 403
+        else:
+            status = 400
+        return jsonify({
+            "success": False,
+            "message": message
+        }), status
+
+    except VersionConflictError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e),
+            "current_version": e.current_version
+        }), 409
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Parâmetro inválido: {str(e)}"
+        }), 400
     except Exception as e:
         return jsonify({
             "success": False,
@@ -291,17 +532,47 @@ def search_documents():
 @documents_bp.route("/category/<category>", methods=["GET"])
 @login_required
 def get_documents_by_category(category):
-    """Get documents by category"""
+    """Get documents by category (supports fields, sort, limit and cursor)"""
     try:
-        documents = document_service.get_documents_by_category(category)
+        query = ListingQuery.from_args(request.args)
+        documents, next_cursor, total = document_service.list_documents(
+            query,
+            category=category
+        )
 
         return jsonify({
             "success": True,
             "data": documents,
             "count": len(documents),
+            "total": total,
+            "next_cursor": next_cursor,
             "category": category
         })
 
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Parâmetro inválido: {str(e)}"
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
+@documents_bp.route("/category/<category>/bundle", methods=["GET"])
+@login_required
+def download_category_bundle(category):
+    """Download every file of a category as one streamed ZIP"""
+    try:
+        entries, missing = document_service.get_bundle_entries(
+            current_user.id, category=category
+        )
+        return bundle_response(
+            entries, missing, f"{secure_filename(category) or 'documentos'}.zip"
+        )
+
     except Exception as e:
         return jsonify({
             "success": False,
@@ -312,17 +583,28 @@ def get_documents_by_category(category):
 @documents_bp.route("/author/<author_id>", methods=["GET"])
 @login_required
 def get_documents_by_author(author_id):
-    """Get documents by author"""
+    """Get documents by author (supports fields, sort, limit and cursor)"""
     try:
-        documents = document_service.get_documents_by_author(author_id)
+        query = ListingQuery.from_args(request.args)
+        documents, next_cursor, total = document_service.list_documents(
+            query,
+            author_id=author_id
+        )
 
         return jsonify({
             "success": True,
             "data": documents,
             "count": len(documents),
+            "total": total,
+            "next_cursor": next_cursor,
             "author_id": author_id
         })
 
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Parâmetro inválido: {str(e)}"
+        }), 400
     except Exception as e:
         return jsonify({
             "success": False,
@@ -333,17 +615,84 @@ def get_documents_by_author(author_id):
 @documents_bp.route("/page/<page_id>", methods=["GET"])
 @login_required
 def get_documents_by_page(page_id):
-    """Get documents by associated page"""
+    """Get documents by associated page (supports fields, sort, limit and cursor)"""
     try:
-        documents = document_service.get_documents_by_page(page_id)
+        query = ListingQuery.from_args(request.args)
+        documents, next_cursor, total = document_service.list_documents(
+            query,
+            page_id=page_id
+        )
 
         return jsonify({
             "success": True,
             "data": documents,
             "count": len(documents),
+            "total": total,
+            "next_cursor": next_cursor,
             "page_id": page_id
         })
 
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Parâmetro inválido: {str(e)}"
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
+@documents_bp.route("/changes", methods=["GET"])
+@login_required
+@conditional_get(db_manager, "documents.json")
+def get_documents_changes():
+    """Documents created, updated or deleted since a change sequence (delta sync)"""
+    try:
+        since = int(request.args.get("since", 0))
+        fields = ListingQuery.from_args(request.args).fields
+        changes = document_service.get_changes(since, fields)
+
+        return jsonify({
+            "success": True,
+            **changes,
+            "count": len(changes["data"])
+        })
+
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Parâmetro inválido: {str(e)}"
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
+@documents_bp.route("/batch", methods=["GET"])
+@login_required
+@conditional_get(db_manager, "documents.json")
+def get_documents_batch():
+    """Get several documents by id in one request"""
+    try:
+        ids = parse_id_list(request.args.get("ids"))
+        fields = ListingQuery.from_args(request.args).fields
+        result = document_service.get_documents_batch(ids, fields)
+
+        return jsonify({
+            "success": True,
+            **result,
+            "count": len(result["data"])
+        })
+
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Parâmetro inválido: {str(e)}"
+        }), 400
     except Exception as e:
         return jsonify({
             "success": False,
@@ -351,20 +700,76 @@ def get_documents_by_page(page_id):
         }), 500
 
 
+@documents_bp.route("/bundle", methods=["GET"])
+@login_required
+def download_documents_bundle():
+    """Download several document files (?ids=a,b,c) as one streamed ZIP"""
+    try:
+        ids = parse_id_list(request.args.get("ids"))
+        entries, missing = document_service.get_bundle_entries(
+            current_user.id, document_ids=ids
+        )
+        return bundle_response(entries, missing, "documentos.zip")
+
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Parâmetro inválido: {str(e)}"
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
+def bundle_response(entries, missing, download_name):
+    """ZIP built while it is sent; ids without a file are listed in a header"""
+    if not entries:
+        return jsonify({
+            "success": False,
+            "message": "Nenhum arquivo encontrado",
+            "missing": missing
+        }), 404
+
+    response = Response(
+        stream_with_context(stream_zip(entries)),
+        mimetype="application/zip",
+        direct_passthrough=True
+    )
+    response.headers["Content-Disposition"] = f'attachment; filename="{download_name}"'
+    if missing:
+        response.headers["X-Missing-Documents"] = quote(",".join(missing), safe=",")
+    return response
+
+
 @documents_bp.route("/recent", methods=["GET"])
 @login_required
 def get_recent_documents():
     """Get recent documents"""
     try:
         limit = int(request.args.get("limit", 10))
-        documents = document_service.get_recent_documents(limit)
+        since = parse_iso_bound(request.args.get("since"))
+        until = parse_iso_bound(request.args.get("until"), end=True)
+        documents, next_cursor = document_service.list_recent_documents(
+            limit,
+            request.args.get("cursor"),
+            since,
+            until
+        )
 
         return jsonify({
             "success": True,
             "data": documents,
-            "count": len(documents)
+            "count": len(documents),
+            "next_cursor": next_cursor
         })
 
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Parâmetro inválido: {str(e)}"
+        }), 400
     except Exception as e:
         return jsonify({
             "success": False,
@@ -378,7 +783,37 @@ def get_popular_documents():
     """Get popular documents"""
     try:
         limit = int(request.args.get("limit", 10))
-        documents = document_service.get_popular_documents(limit)
+        documents, next_cursor = document_service.list_popular_documents(
+            limit,
+            request.args.get("cursor")
+        )
+
+        return jsonify({
+            "success": True,
+            "data": documents,
+            "count": len(documents),
+            "next_cursor": next_cursor
+        })
+
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Parâmetro inválido: {str(e)}"
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
+@documents_bp.route("/trending", methods=["GET"])
+@login_required
+def get_trending_documents():
+    """Get trending documents"""
+    try:
+        limit = int(request.args.get("limit", 10))
+        documents = document_service.get_trending_documents(limit)
 
         return jsonify({
             "success": True,
@@ -398,13 +833,17 @@ def get_popular_documents():
 def download_document(document_id):
     """Download document file"""
     try:
+        # Resumed downloads and cache revalidations are not new downloads
         success, message, file_path = document_service.download_document(
             document_id,
-            current_user.id
+            current_user.id,
+            record_download=not (
+                request.range or request.if_none_match or request.if_modified_since
+            )
         )
 
         if success and file_path:
-            return send_file(
+            return send_stored_file(
                 file_path,
                 as_attachment=True,
                 download_name=message
@@ -450,14 +889,14 @@ def view_document_file(document_id):
                 "message": "Arquivo não encontrado. Verifique se o upload foi concluído corretamente."
             }), 404
 
-        # Detect MIME type based on file extension
-        mime_type, _ = mimetypes.guess_type(file_path)
+        # Detect MIME type based on file extension (stored blobs have none)
+        mime_type, _ = mimetypes.guess_type(document['filename'])
         
         if not mime_type:
             mime_type = 'application/octet-stream'
         
-        # Return file for inline viewing
-        return send_file(
+        # Return file for inline viewing (seekable, cacheable)
+        return send_stored_file(
             file_path,
             as_attachment=False,
             mimetype=mime_type
@@ -499,7 +938,8 @@ def preview_document(document_id):
                 document.get('filename', '').lower().endswith('.pdf') or
                 any(ext in document.get('filename', '').lower() 
                     for ext in ['.png', '.jpg', '.jpeg', '.gif', '.webp'])
-            )
+            ),
+            "thumbnail_url": f"/documents/{document_id}/thumbnail" if has_file else None
         }
 
         return jsonify({
@@ -514,6 +954,176 @@ def preview_document(document_id):
         }), 500
 
 
+@documents_bp.route("/<document_id>/preview/rows", methods=["GET"])
+@login_required
+def preview_document_rows(document_id):
+    """Get a page of rows of a TXT, CSV or XLSX file (?offset=&limit=&sheet=)"""
+    try:
+        offset = int(request.args.get("offset", 0))
+        limit = min(int(request.args.get("limit", 100)), MAX_LISTING_LIMIT)
+        sheet = int(request.args.get("sheet", 0))
+        page = document_service.get_document_rows(document_id, offset, limit, sheet)
+
+        if page is None:
+            return jsonify({
+                "success": False,
+                "message": "Documento ou arquivo não encontrado"
+            }), 404
+
+        return jsonify({
+            "success": True,
+            "data": page
+        })
+
+    except UnsupportedPreviewError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 415
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Parâmetro inválido: {str(e)}"
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
+@documents_bp.route("/<document_id>/image", methods=["GET"])
+@login_required
+def get_document_image(document_id):
+    """Get an image document resized for ?w=<pixels>, as WebP when the browser takes it.
+
+    Answers 202 with a placeholder while the metadata-free copies render.
+    """
+    try:
+        width = int(request.args["w"]) if request.args.get("w") else None
+        accept_webp = "image/webp" in request.headers.get("Accept", "")
+        result = document_service.get_document_image(document_id, width, accept_webp)
+
+        if result is None:
+            return jsonify({
+                "success": False,
+                "message": "Documento ou arquivo não encontrado"
+            }), 404
+
+        status, path, mimetype, extension = result
+        if status == READY:
+            response = send_stored_file(path, mimetype=mimetype)
+            response.vary.add("Accept")
+            return response
+
+        # Never the original: it still carries its EXIF/GPS metadata
+        largest = max(document_service.image_service.widths)
+        size = min(width or largest, largest)
+        response = Response(placeholder_svg(extension, size), mimetype="image/svg+xml")
+        response.headers["X-Image-Status"] = status
+        if status == PENDING:
+            response.status_code = 202
+            response.headers["Retry-After"] = "2"
+            response.cache_control.no_store = True
+        else:
+            response.cache_control.private = True
+            response.cache_control.max_age = 3600
+        return response
+
+    except UnsupportedPreviewError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 415
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Parâmetro inválido: {str(e)}"
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
+@documents_bp.route("/<document_id>/image/srcset", methods=["GET"])
+@login_required
+def get_document_image_srcset(document_id):
+    """Get src/srcset attributes for an image document"""
+    try:
+        data = document_service.get_document_srcset(document_id)
+        if data is None:
+            return jsonify({
+                "success": False,
+                "message": "Documento não encontrado"
+            }), 404
+
+        # Versioned by content hash, so every candidate can be cached for good
+        base = f"/documents/{document_id}/image"
+        version = f"v={data['sha256']}" if data['sha256'] else ""
+        srcset = ", ".join(f"{base}?w={w}&{version} {w}w" for w in data['widths'])
+
+        return jsonify({
+            "success": True,
+            "data": {
+                "src": f"{base}?{version}" if version else base,
+                "srcset": srcset,
+                "width": data['width'],
+                "height": data['height'],
+                "ready": bool(data['widths'])
+            }
+        })
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
+@documents_bp.route("/<document_id>/thumbnail", methods=["GET"])
+@login_required
+def get_document_thumbnail(document_id):
+    """Get a cached thumbnail (?size=thumb|preview); placeholder until it is rendered"""
+    try:
+        variant = request.args.get("size", "thumb")
+        result = document_service.get_document_thumbnail(document_id, variant)
+        if result is None:
+            return jsonify({
+                "success": False,
+                "message": "Documento não encontrado"
+            }), 404
+
+        status, path, extension = result
+        if status == READY:
+            return send_stored_file(path, mimetype="image/png")
+
+        size = document_service.thumbnail_service.sizes[variant]
+        response = Response(placeholder_svg(extension, size), mimetype="image/svg+xml")
+        response.headers["X-Thumbnail-Status"] = status
+        if status == PENDING:
+            # Accepted and being rendered: ask the client to come back shortly
+            response.status_code = 202
+            response.headers["Retry-After"] = "2"
+            response.cache_control.no_store = True
+        else:
+            response.cache_control.private = True
+            response.cache_control.max_age = 3600
+        return response
+
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Parâmetro inválido: {str(e)}"
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
 @documents_bp.route("/<document_id>/analytics", methods=["GET"])
 @login_required
 def get_document_analytics(document_id):
@@ -558,6 +1168,79 @@ def get_storage_analytics():
         }), 500
 
 
+@documents_bp.route("/storage/gc", methods=["POST"])
+@login_required
+def collect_blob_garbage():
+    """Delete stored files that are no longer referenced (admin only)"""
+    try:
+        if current_user.role != "admin":
+            return jsonify({
+                "success": False,
+                "message": "Acesso negado"
+            }), 403
+
+        result = document_service.collect_blob_garbage()
+
+        return jsonify({
+            "success": True,
+            "data": result
+        })
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
+@documents_bp.route("/storage/integrity", methods=["GET"])
+@login_required
+def get_storage_integrity():
+    """Get the last upload integrity report (admin only)"""
+    try:
+        if current_user.role != "admin":
+            return jsonify({
+                "success": False,
+                "message": "Acesso negado"
+            }), 403
+
+        return jsonify({
+            "success": True,
+            "data": document_service.get_integrity_report()
+        })
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
+@documents_bp.route("/storage/integrity", methods=["POST"])
+@login_required
+def start_storage_integrity_scan():
+    """Start a background upload integrity scan; ?full=1 relists every folder"""
+    try:
+        if current_user.role != "admin":
+            return jsonify({
+                "success": False,
+                "message": "Acesso negado"
+            }), 403
+
+        document_service.start_integrity_scan(request.args.get("full") == "1")
+
+        return jsonify({
+            "success": True,
+            "message": "Verificação de integridade iniciada"
+        }), 202
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
 @documents_bp.route("/sample/create", methods=["POST"])
 @login_required
 def create_sample_documents():
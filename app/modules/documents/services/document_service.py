@@ -8,6 +8,25 @@ from typing import List, Optional, Tuple
 
 from app.core.database import ActivityLogger, DatabaseManager
 from app.modules.documents.repositories.document_repository import DocumentRepository
+from app.modules.documents.services.image_service import (
+    SERVABLE_EXTENSIONS,
+    get_image_service,
+)
+from app.modules.documents.services.integrity_service import get_integrity_service
+from app.modules.documents.services.row_preview_service import get_row_preview_service
+from app.modules.documents.services.text_extraction_service import (
+    get_text_extraction_service,
+)
+from app.modules.documents.services.thumbnail_service import get_thumbnail_service
+from app.shared.exceptions import (
+    FileUploadError,
+    UnsupportedPreviewError,
+    ValidationError,
+    VersionConflictError,
+)
+from app.shared.file_serving import bundle_names
+from app.shared.listing import ListingQuery, project
+from app.shared.patching import build_patch_updates
 
 
 class DocumentService:
@@ -17,6 +36,13 @@ class DocumentService:
         self.db_manager = db_manager
         self.document_repository = DocumentRepository(db_manager)
         self.activity_logger = ActivityLogger(db_manager)
+        self.thumbnail_service = get_thumbnail_service(db_manager)
+        self.image_service = get_image_service(db_manager)
+        self.integrity_service = get_integrity_service(db_manager)
+        self.text_extraction_service = get_text_extraction_service(db_manager)
+        self.row_preview_service = get_row_preview_service(
+            self.document_repository.blob_store
+        )
     
     def get_all_documents(self) -> List[dict]:
         """Get all documents"""
@@ -37,34 +63,41 @@ class DocumentService:
         if not is_valid:
             return False, message
         
-        # Validate file upload
-        if file:
-            is_valid, message = self.document_repository.validate_file_upload(
-                file.filename, 
-                len(file.read())
-            )
-            file.seek(0)  # Reset file pointer
-            if not is_valid:
-                return False, message
-        
         # Add author information
         document_data['author_id'] = author_id
         document_data['original_filename'] = file.filename if file else None
         
-        # Save file if provided
-        sanitized_filename = ""
+        # Stream file to disk if provided (validated while copying)
+        file_path = ""
         if file:
-            sanitized_filename = self.document_repository.save_uploaded_file(file, file.filename)
-            if not sanitized_filename:
+            try:
+                upload = self.document_repository.store_uploaded_file(
+                    file, file.filename
+                )
+            except FileUploadError as e:
+                return False, str(e)
+            except OSError:
                 return False, "Erro ao salvar arquivo"
-            document_data['filename'] = sanitized_filename
+            document_data['filename'] = upload.filename
+            document_data['sha256'] = upload.sha256
+            file_path = upload.path
         else:
             document_data['filename'] = None
         
         # Create document
-        success = self.document_repository.create_document(document_data, "")
+        success = self.document_repository.create_document(document_data, file_path)
         
         if success:
+            self.thumbnail_service.schedule(
+                document_data.get('sha256'), document_data.get('filename')
+            )
+            self.text_extraction_service.schedule(
+                document_data.get('sha256'), document_data.get('filename')
+            )
+            self.image_service.schedule(
+                document_data.get('sha256'), document_data.get('filename')
+            )
+            
             # Log activity
             self.activity_logger.log_activity(
                 author_id,
@@ -100,16 +133,21 @@ class DocumentService:
         else:
             return False, "Erro ao criar documento"
     
-    def update_document(self, document_id: str, updates: dict, user_id: str) -> Tuple[bool, str]:
-        """Update document"""
+    def update_document(
+        self,
+        document_id: str,
+        updates: dict,
+        user_id: str,
+        expected_version: Optional[int] = None
+    ) -> Tuple[bool, str]:
+        """Update document (raises VersionConflictError if expected_version is stale)"""
         # Check if document exists
         document = self.document_repository.get_document_by_id(document_id)
         if not document:
             return False, "Documento não encontrado"
         
         # Check permissions (only author or admin can edit)
-        if document.get('author_id') != user_id:
-            # TODO: Check if user is admin
+        if not self._can_modify(document, user_id):
             return False, "Sem permissão para editar este documento"
         
         # Validate updates
@@ -118,7 +156,9 @@ class DocumentService:
             return False, message
         
         # Update document
-        success = self.document_repository.update_document(document_id, updates)
+        success = self.document_repository.update_document(
+            document_id, updates, expected_version=expected_version
+        )
         
         if success:
             # Log activity
@@ -131,6 +171,64 @@ class DocumentService:
         else:
             return False, "Erro ao atualizar documento"
 
+    def patch_document(
+        self,
+        document_id: str,
+        patch: object,
+        user_id: str,
+        expected_version: Optional[int] = None
+    ) -> Tuple[bool, str]:
+        """Apply a JSON Patch and/or content delta, writing only changed fields"""
+        document = self.document_repository.get_document_by_id(document_id)
+        if not document:
+            return False, "Documento não encontrado"
+        
+        # Check permissions (only author or admin can edit)
+        if not self._can_modify(document, user_id):
+            return False, "Sem permissão para editar este documento"
+        
+        if expected_version is None and isinstance(patch, dict):
+            expected_version = patch.get('base_version')
+        if expected_version is not None and expected_version != document.get(
+            'version', 1
+        ):
+            raise VersionConflictError(document.get('version', 1))
+        # The patch is applied to the version read above; without a client
+        # precondition, the write must still fail if another one landed since
+        if expected_version is None:
+            expected_version = document.get('version', 1)
+        
+        try:
+            updates, removals = build_patch_updates(
+                document, patch, self.document_repository.READONLY_FIELDS
+            )
+        except ValidationError as e:
+            return False, str(e)
+        
+        if not updates and not removals:
+            return True, "Nenhuma alteração"
+        
+        is_valid, message = self.validate_document_updates(
+            {**dict.fromkeys(removals), **updates}
+        )
+        if not is_valid:
+            return False, message
+        
+        success = self.document_repository.update_document(
+            document_id, updates, expected_version=expected_version, removals=removals
+        )
+        
+        if success:
+            self.activity_logger.log_activity(
+                user_id,
+                'document_updated',
+                f'Documento atualizado: '
+                f'{updates.get("title", document.get("title", "Unknown"))}',
+            )
+            return True, "Documento atualizado com sucesso"
+        else:
+            return False, "Erro ao atualizar documento"
+
     def update_document_with_file(self, document_id: str, updates: dict, file, user_id: str) -> Tuple[bool, str]:
         """Update document with optional file upload - Admin only"""
         # Check if document exists
@@ -145,23 +243,22 @@ class DocumentService:
         
         # Handle file upload if provided
         if file:
-            # Validate file upload
-            is_valid, message = self.document_repository.validate_file_upload(
-                file.filename, 
-                len(file.read())
-            )
-            file.seek(0)  # Reset file pointer
-            if not is_valid:
-                return False, message
-            
-            # Save new file
-            sanitized_filename = self.document_repository.save_uploaded_file(file, file.filename)
-            if not sanitized_filename:
+            # Stream new file to disk (validated while copying)
+            try:
+                upload = self.document_repository.store_uploaded_file(
+                    file, file.filename
+                )
+            except FileUploadError as e:
+                return False, str(e)
+            except OSError:
                 return False, "Erro ao salvar arquivo"
             
             # Add file info to updates
-            updates['filename'] = sanitized_filename
+            updates['filename'] = upload.filename
             updates['original_filename'] = file.filename
+            updates['file_size'] = upload.size
+            updates['file_exists'] = True
+            updates['sha256'] = upload.sha256
         
         # Add version tracking
         current_version = document.get('version', 1)
@@ -171,6 +268,13 @@ class DocumentService:
         success = self.document_repository.update_document(document_id, updates)
         
         if success:
+            if file:
+                self.thumbnail_service.schedule(updates['sha256'], updates['filename'])
+                self.text_extraction_service.schedule(
+                    updates['sha256'], updates['filename']
+                )
+                self.image_service.schedule(updates['sha256'], updates['filename'])
+            
             # Log activity
             self.activity_logger.log_activity(
                 user_id,
@@ -189,14 +293,8 @@ class DocumentService:
             return False, "Documento não encontrado"
         
         # Check permissions (author or admin can delete)
-        if document.get('author_id') != user_id:
-            # Check if user is admin
-            from app.modules.auth.services.auth_service import AuthService
-            auth_service = AuthService(self.db_manager)
-            user_data = auth_service.get_user_by_id(user_id)
-            
-            if not user_data or user_data.get('role') != 'admin':
-                return False, "Sem permissão para deletar este documento"
+        if not self._can_modify(document, user_id):
+            return False, "Sem permissão para deletar este documento"
         
         # Delete document
         success = self.document_repository.delete_document(document_id)
@@ -216,6 +314,87 @@ class DocumentService:
         """Search documents"""
         return self.document_repository.search_documents(query)
     
+    def list_documents(
+        self,
+        query: ListingQuery,
+        **filters
+    ) -> Tuple[List[dict], Optional[str], int]:
+        """List documents with sparse fieldsets, sorting and cursor pagination"""
+        documents, next_cursor, total = self.document_repository.query_documents(
+            query, **filters
+        )
+        return (
+            [project(document, query.fields) for document in documents],
+            next_cursor,
+            total,
+        )
+    
+    def get_changes(self, since: int, fields: Optional[List[str]] = None) -> dict:
+        """Documents created, updated or deleted after a change sequence number"""
+        documents, deleted, seq, reset = self.document_repository.get_changes(since)
+        return {
+            'data': [project(document, fields) for document in documents],
+            'deleted': deleted,
+            'seq': seq,
+            'reset': reset
+        }
+    
+    def get_documents_batch(
+        self, document_ids: List[str], fields: Optional[List[str]] = None
+    ) -> dict:
+        """Resolve several documents at once; unknown ids are listed as missing"""
+        found = self.document_repository.get_documents_by_ids(document_ids)
+        return {
+            'data': {
+                document_id: project(found[document_id], fields)
+                for document_id in document_ids
+                if document_id in found
+            },
+            'missing': [
+                document_id for document_id in document_ids if document_id not in found
+            ],
+        }
+    
+    def get_bundle_entries(
+        self,
+        user_id: str,
+        document_ids: Optional[List[str]] = None,
+        category: Optional[str] = None
+    ) -> Tuple[List[Tuple[str, str]], List[str]]:
+        """(archive name, path) of each requested document file, plus ids without one"""
+        if document_ids is not None:
+            found = self.document_repository.get_documents_by_ids(document_ids)
+            documents = [
+                found[document_id]
+                for document_id in document_ids
+                if document_id in found
+            ]
+            missing = [
+                document_id for document_id in document_ids if document_id not in found
+            ]
+        else:
+            documents = self.document_repository.get_documents_by_category(category)
+            missing = []
+        
+        files = []
+        for document in documents:
+            path = self.document_repository.resolve_file_path(document)
+            if path:
+                files.append(
+                    (document.get('original_filename') or document['filename'], path)
+                )
+            else:
+                missing.append(document.get('id'))
+        
+        if files:
+            self.activity_logger.log_activity(
+                user_id,
+                'documents_bundled',
+                f'Pacote com {len(files)} documentos baixado'
+            )
+        names = bundle_names(name for name, _ in files)
+        return list(zip(names, (path for _, path in files))), missing
+    
     def get_documents_by_category(self, category: str) -> List[dict]:
         """Get documents by category"""
         return self.document_repository.get_documents_by_category(category)
@@ -228,6 +407,26 @@ class DocumentService:
         """Get documents by associated page"""
         return self.document_repository.get_documents_by_page(page_id)
     
+    def list_recent_documents(
+        self,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """List recent documents with cursor pagination and date range"""
+        return self.document_repository.list_recent_documents(
+            limit, cursor, since, until
+        )
+    
+    def list_popular_documents(
+        self,
+        limit: int = 10,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """List popular documents with cursor pagination"""
+        return self.document_repository.list_popular_documents(limit, cursor)
+    
     def get_recent_documents(self, limit: int = 10) -> List[dict]:
         """Get recent documents"""
         return self.document_repository.get_recent_documents(limit)
@@ -236,8 +435,14 @@ class DocumentService:
         """Get popular documents"""
         return self.document_repository.get_popular_documents(limit)
     
-    def download_document(self, document_id: str, user_id: str) -> Tuple[bool, str, Optional[str]]:
-        """Download document"""
+    def get_trending_documents(self, limit: int = 10) -> List[dict]:
+        """Get trending documents"""
+        return self.document_repository.get_trending_documents(limit)
+    
+    def download_document(
+        self, document_id: str, user_id: str, record_download: bool = True
+    ) -> Tuple[bool, str, Optional[str]]:
+        """Download document; record_download is off for range and revalidation"""
         document = self.document_repository.get_document_by_id(document_id)
         if not document:
             return False, "Documento não encontrado", None
@@ -246,18 +451,93 @@ class DocumentService:
         if not file_path:
             return False, "Arquivo não encontrado", None
         
-        # Increment downloads
-        self.document_repository.increment_downloads(document_id)
-        
-        # Log activity
-        self.activity_logger.log_activity(
-            user_id,
-            'document_downloaded',
-            f'Documento baixado: {document.get("title", "Unknown")}'
-        )
+        if record_download:
+            # Increment downloads
+            self.document_repository.increment_downloads(document_id)
+            
+            # Log activity
+            self.activity_logger.log_activity(
+                user_id,
+                'document_downloaded',
+                f'Documento baixado: {document.get("title", "Unknown")}'
+            )
         
         return True, document.get('filename', ''), file_path
     
+    def get_document_thumbnail(
+        self, document_id: str, variant: str
+    ) -> Optional[Tuple[str, Optional[str], str]]:
+        """(status, path, extension) of a document thumbnail, None if no document"""
+        document = self.document_repository.get_document_by_id(document_id)
+        if not document:
+            return None
+        status, path = self.thumbnail_service.get(
+            document.get('sha256'), document.get('filename'), variant
+        )
+        return (
+            status,
+            path,
+            os.path.splitext(document.get('filename') or '')[1].lstrip('.'),
+        )
+    
+    def get_document_image(
+        self, document_id: str, width: Optional[int], accept_webp: bool
+    ) -> Optional[Tuple[str, Optional[str], Optional[str], str]]:
+        """(status, path, mimetype, extension) of the image for a width, or None.
+        
+        Images are served as metadata-free derivatives only, reported as
+        pending while they render; GIFs are served as uploaded.
+        """
+        document = self.document_repository.get_document_by_id(document_id)
+        if not document:
+            return None
+        extension = (
+            os.path.splitext(document.get('filename') or '')[1].lstrip('.').lower()
+        )
+        if extension not in SERVABLE_EXTENSIONS:
+            raise UnsupportedPreviewError("Documento não é uma imagem")
+        status, path, mimetype = self.image_service.get(
+            document.get('sha256'), document.get('filename'), width, accept_webp
+        )
+        return status, path, mimetype, extension
+    
+    def get_document_srcset(self, document_id: str) -> Optional[dict]:
+        """Original size and available widths of a document image, or None"""
+        document = self.document_repository.get_document_by_id(document_id)
+        if not document:
+            return None
+        manifest = self.image_service.get_manifest(document.get('sha256'))
+        if manifest is None:
+            self.image_service.schedule(
+                document.get('sha256'), document.get('filename')
+            )
+            return {
+                'sha256': document.get('sha256'),
+                'widths': [],
+                'width': None,
+                'height': None,
+            }
+        return {
+            'sha256': document['sha256'],
+            'widths': manifest['widths'],
+            'width': manifest['width'],
+            'height': manifest['height']
+        }
+    
+    def get_document_rows(
+        self, document_id: str, offset: int, limit: int, sheet: int = 0
+    ) -> Optional[dict]:
+        """A page of rows from a text, CSV or XLSX document; None if it has no file"""
+        document = self.document_repository.get_document_by_id(document_id)
+        if not document:
+            return None
+        path = self.document_repository.resolve_file_path(document)
+        if not path:
+            return None
+        return self.row_preview_service.get_rows(
+            path, document['filename'], offset, limit, sheet
+        )
+    
     def get_document_analytics(self, document_id: str) -> dict:
         """Get document analytics"""
         return self.document_repository.get_document_analytics(document_id)
@@ -268,7 +548,26 @@ class DocumentService:
     
     def get_storage_analytics(self) -> dict:
         """Get storage analytics"""
-        return self.document_repository.get_storage_analytics()
+        # The file flags are only as fresh as the last integrity scan
+        self.integrity_service.schedule_if_stale()
+        analytics = self.document_repository.get_storage_analytics()
+        analytics['integrity'] = self.integrity_service.summary()
+        return analytics
+    
+    def get_integrity_report(self) -> dict:
+        """Last upload integrity report and whether a scan is running"""
+        return {
+            'running': self.integrity_service.is_running(),
+            'report': self.integrity_service.get_report()
+        }
+    
+    def start_integrity_scan(self, full: bool = False) -> None:
+        """Reconcile upload records with the files on disk in the background"""
+        self.integrity_service.schedule(full)
+    
+    def collect_blob_garbage(self) -> dict:
+        """Delete stored files no document, attachment or PDF references"""
+        return self.document_repository.blob_store.collect_garbage()
     
     def validate_document_data(self, document_data: dict) -> Tuple[bool, str]:
         """Validate document data"""
@@ -297,12 +596,19 @@ class DocumentService:
         
         return True, 'Dados válidos'
     
+    def _can_modify(self, document: dict, user_id: str) -> bool:
+        """Author-or-admin check shared by every write path"""
+        from app.modules.auth.services.auth_service import AuthService
+        return AuthService(self.db_manager).can_modify(
+            user_id, document.get('author_id')
+        )
+    
     def validate_document_updates(self, updates: dict) -> Tuple[bool, str]:
         """Validate document updates"""
-        if 'title' in updates and len(updates['title']) < 3:
+        if 'title' in updates and len(updates['title'] or '') < 3:
             return False, 'Título deve ter pelo menos 3 caracteres'
         
-        if 'description' in updates and len(updates['description']) < 10:
+        if 'description' in updates and len(updates['description'] or '') < 10:
             return False, 'Descrição deve ter pelo menos 10 caracteres'
         
         if 'category' in updates:
@@ -0,0 +1,248 @@
+"""
+Image derivative service for Wiki Veloz
+CDD v2.0 - Resized, metadata-free WebP/JPEG copies of uploaded images
+"""
+
+import json
+import logging
+import mimetypes
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.core.blob_store import BlobStore, get_blob_store
+from app.core.database import DatabaseManager
+from app.modules.documents.services.thumbnail_service import PENDING, READY, UNAVAILABLE
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # without Pillow no derivatives are made
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Bump when the encoding settings change, so derivatives are redone
+IMAGE_DERIVATIVE_VERSION = "1"
+# GIFs are left alone: resizing would drop their animation
+IMAGE_EXTENSIONS = frozenset({"jpg", "jpeg", "png", "bmp", "tif", "tiff", "webp"})
+SERVABLE_EXTENSIONS = IMAGE_EXTENSIONS | {"gif"}
+FORMAT_EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+FORMAT_MIMETYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+
+def _prepare(image, image_format: str):
+    """Mode the encoder accepts; JPEG transparency is flattened on white"""
+    has_alpha = image.mode in ("RGBA", "LA") or (
+        image.mode == "P" and "transparency" in image.info
+    )
+    if image_format == "webp":
+        return image.convert("RGBA" if has_alpha else "RGB")
+    if has_alpha:
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+class ImageDerivativeService:
+    """Responsive copies of image blobs, rendered in the background.
+
+    For each configured width below the original (plus the original width
+    itself) a WebP and a JPEG are written beside the blob. They are
+    re-encoded from pixels only, so EXIF (GPS, camera), XMP and ICC data
+    are dropped; orientation is applied first. A small JSON manifest records
+    what exists, which is what the srcset endpoint reads. The original blob
+    is never rewritten: its digest is its identity.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, blob_store: BlobStore):
+        self.blob_store = blob_store
+        self.widths: List[int] = sorted(db_manager.config.IMAGE_WIDTHS)
+        self.formats: Tuple[str, ...] = tuple(db_manager.config.IMAGE_FORMATS)
+        self.quality = db_manager.config.IMAGE_QUALITY
+        self.available = Image is not None
+        self._pending: Dict[str, Future] = {}
+        self._failed: Set[str] = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=db_manager.config.IMAGE_WORKERS,
+            thread_name_prefix="image-derivative",
+        )
+
+    def can_render(self, filename: Optional[str]) -> bool:
+        """Whether derivatives can be made for this file type here"""
+        extension = os.path.splitext(filename or "")[1].lstrip(".").lower()
+        return self.available and extension in IMAGE_EXTENSIONS
+
+    def path_for(self, digest: str, width: int, image_format: str) -> str:
+        """Derivative of a blob at one width and format"""
+        extension = FORMAT_EXTENSIONS[image_format]
+        return self.blob_store.derivative_path(
+            digest, f"w{width}.r{IMAGE_DERIVATIVE_VERSION}.{extension}"
+        )
+
+    def manifest_path(self, digest: str) -> str:
+        """Manifest listing a blob's derivatives"""
+        return self.blob_store.derivative_path(
+            digest, f"images.r{IMAGE_DERIVATIVE_VERSION}.json"
+        )
+
+    def get_manifest(self, digest: Optional[str]) -> Optional[dict]:
+        """Original size and generated widths/formats, None until rendered"""
+        if not self.blob_store.exists(digest):
+            return None
+        try:
+            with open(self.manifest_path(digest), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def best_fit(
+        self, digest: Optional[str], width: Optional[int], accept_webp: bool
+    ) -> Optional[Tuple[str, str]]:
+        """(path, mimetype) of the smallest derivative at least ``width`` wide"""
+        manifest = self.get_manifest(digest)
+        if not manifest or not manifest["widths"]:
+            return None
+        widths = manifest["widths"]
+        chosen = next((w for w in widths if width and w >= width), widths[-1])
+        if accept_webp and "webp" in manifest["formats"]:
+            image_format = "webp"
+        elif "jpeg" in manifest["formats"]:
+            image_format = "jpeg"
+        else:
+            return None
+        return (
+            self.path_for(digest, chosen, image_format),
+            FORMAT_MIMETYPES[image_format],
+        )
+
+    def get(
+        self,
+        digest: Optional[str],
+        filename: Optional[str],
+        width: Optional[int],
+        accept_webp: bool,
+    ) -> Tuple[str, Optional[str], Optional[str]]:
+        """(status, path, mimetype) of the copy to serve; queues the job on a miss.
+
+        GIFs are served as uploaded. Other images are only ever served as a
+        derivative, so the original's metadata never leaves the server:
+        PENDING while they render, UNAVAILABLE when they cannot be made.
+        """
+        if not self.blob_store.exists(digest):
+            return UNAVAILABLE, None, None
+        extension = os.path.splitext(filename or "")[1].lstrip(".").lower()
+        if extension in SERVABLE_EXTENSIONS - IMAGE_EXTENSIONS:
+            return (
+                READY,
+                self.blob_store.path_for(digest),
+                mimetypes.guess_type(filename)[0],
+            )
+
+        best = self.best_fit(digest, width, accept_webp)
+        if best:
+            return READY, best[0], best[1]
+        if self.schedule(digest, filename) is None:
+            # Rendered between the two checks, or it cannot be rendered here
+            best = self.best_fit(digest, width, accept_webp)
+            if best:
+                return READY, best[0], best[1]
+            return UNAVAILABLE, None, None
+        return PENDING, None, None
+
+    def schedule(
+        self, digest: Optional[str], filename: Optional[str]
+    ) -> Optional[Future]:
+        """Render a blob's derivatives in the background; one job per blob"""
+        if not self.blob_store.exists(digest) or not self.can_render(filename):
+            return None
+        if os.path.exists(self.manifest_path(digest)):
+            return None
+        with self._lock:
+            future = self._pending.get(digest)
+            if future is not None or digest in self._failed:
+                return future
+            future = self._executor.submit(self._generate, digest)
+            self._pending[digest] = future
+        future.add_done_callback(lambda _: self._forget_pending(digest))
+        return future
+
+    def _generate(self, digest: str) -> None:
+        written = []
+        try:
+            with Image.open(self.blob_store.path_for(digest)) as original:
+                image = ImageOps.exif_transpose(original)
+                width, height = image.size
+                widths = [w for w in self.widths if w < width] + [width]
+                for target_width in widths:
+                    resized = image
+                    if target_width != width:
+                        resized = image.resize(
+                            (
+                                target_width,
+                                max(1, round(height * target_width / width)),
+                            ),
+                            Image.LANCZOS,
+                        )
+                    for image_format in self.formats:
+                        target = self.path_for(digest, target_width, image_format)
+                        temp = f"{target}.{uuid.uuid4().hex}.tmp"
+                        written.append(temp)
+                        # No exif/icc_profile arguments: the copy carries pixels only
+                        _prepare(resized, image_format).save(
+                            temp,
+                            image_format.upper(),
+                            quality=self.quality,
+                            optimize=True,
+                        )
+                        os.replace(temp, target)
+                        written[-1] = target
+        except Exception as e:
+            logger.warning("Image derivatives failed for %s: %s", digest, e)
+            with self._lock:
+                self._failed.add(digest)
+            for path in written:
+                if os.path.exists(path):
+                    os.remove(path)
+            return
+
+        manifest = {
+            "version": IMAGE_DERIVATIVE_VERSION,
+            "width": width,
+            "height": height,
+            "widths": widths,
+            "formats": list(self.formats),
+        }
+        # Written last: its presence means every derivative is in place
+        fd, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(self.manifest_path(digest)),
+            prefix=f"{digest}.",
+            suffix=".tmp",
+        )
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(temp_path, self.manifest_path(digest))
+
+    def _forget_pending(self, digest: str) -> None:
+        with self._lock:
+            self._pending.pop(digest, None)
+
+
+_services: Dict[str, ImageDerivativeService] = {}
+_services_lock = threading.Lock()
+
+
+def get_image_service(db_manager: DatabaseManager) -> ImageDerivativeService:
+    """Return the process-wide image derivative service for BLOB_FOLDER"""
+    blob_store = get_blob_store(db_manager)
+    with _services_lock:
+        service = _services.get(blob_store.root)
+        if service is None:
+            service = ImageDerivativeService(db_manager, blob_store)
+            _services[blob_store.root] = service
+        return service
@@ -0,0 +1,223 @@
+"""
+Upload integrity service for Wiki Veloz
+CDD v2.0 - Background reconciliation of upload records and files on disk
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.core.database import DatabaseManager
+from app.core.upload_integrity import (
+    apply_file_flags,
+    check_collection,
+    find_orphans,
+    scan_tree,
+)
+from app.core.upload_migration import UploadCollection, upload_collections
+from app.modules.documents.repositories.document_repository import DocumentRepository
+
+logger = logging.getLogger(__name__)
+
+# Bump when the saved state layout changes, so the next scan starts over
+INTEGRITY_STATE_VERSION = "1"
+# Missing records and orphans listed in a report; the counts cover all of them
+REPORT_LIMIT = 500
+
+
+class UploadIntegrityService:
+    """Checks documents, attachments and PDFs against the files on disk.
+
+    A scan lists the blob tree and the flat upload folders in parallel,
+    reusing the listing of every directory whose mtime did not change since
+    the previous scan (kept in ``upload_integrity.json`` with the last
+    report). It then refreshes each collection's ``file_exists`` and
+    ``file_size`` in one write and reports missing files and orphans. Scans
+    run one at a time on a background thread.
+    """
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        collections: Optional[List[UploadCollection]] = None,
+    ):
+        self.document_repository = DocumentRepository(db_manager)
+        self.blob_store = self.document_repository.blob_store
+        self.collections = (
+            collections
+            if collections is not None
+            else upload_collections(db_manager, self.document_repository.upload_folder)
+        )
+        self.workers = db_manager.config.INTEGRITY_SCAN_WORKERS
+        self.interval = db_manager.config.INTEGRITY_SCAN_INTERVAL_SECONDS
+        self.state_path = os.path.join(db_manager.data_folder, "upload_integrity.json")
+        self._state: Optional[dict] = None
+        self._running: Optional[Future] = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="upload-integrity"
+        )
+
+    def get_report(self) -> Optional[dict]:
+        """Findings of the last finished scan, None before the first one"""
+        with self._lock:
+            return self._load_state().get("report")
+
+    def is_running(self) -> bool:
+        with self._lock:
+            return self._running is not None and not self._running.done()
+
+    def schedule(self, full: bool = False) -> Future:
+        """Start a scan in the background; returns the running one if any"""
+        with self._lock:
+            if self._running is None or self._running.done():
+                self._running = self._executor.submit(self._run_logged, full)
+            return self._running
+
+    def schedule_if_stale(self) -> Optional[Future]:
+        """Start a scan when the last report is older than the configured interval"""
+        report = self.get_report()
+        if report and time.time() - report["finished_ts"] < self.interval:
+            return None
+        return self.schedule()
+
+    def summary(self) -> dict:
+        """Counts of the last report, for storage analytics"""
+        report = self.get_report() or {}
+        return {
+            "checked_at": report.get("finished_at"),
+            "missing_files": report.get("missing_count"),
+            "orphan_files": report.get("orphan_count"),
+            "orphan_bytes": report.get("orphan_bytes"),
+            "running": self.is_running(),
+        }
+
+    def _run_logged(self, full: bool) -> dict:
+        try:
+            return self.run(full)
+        except Exception:
+            logger.exception("Upload integrity scan failed")
+            raise
+
+    def run(self, full: bool = False) -> dict:
+        """Scan now and return the report; ``full`` ignores cached listings"""
+        started = time.time()
+        with self._lock:
+            previous = {} if full else self._load_state().get("listings", {})
+
+        roots = {self.blob_store.root: 2}
+        for collection in self.collections:
+            roots.setdefault(collection.legacy_folder, 0)
+        listings, directories = scan_tree(roots, previous, self.workers)
+
+        used = set()
+        missing = []
+        collections = {}
+        for collection in self.collections:
+            observed = check_collection(self.blob_store, collection, listings)
+            indexes = (
+                self.document_repository.indexes
+                if collection.filename == "documents.json"
+                else None
+            )
+            updated = apply_file_flags(self.blob_store, collection, observed, indexes)
+            absent = [
+                {
+                    "collection": collection.ref_prefix,
+                    "id": record_id,
+                    "path": os.path.relpath(path),
+                }
+                for record_id, (path, size) in observed.items()
+                if size is None
+            ]
+            used.update(path for path, _ in observed.values())
+            missing.extend(absent)
+            collections[collection.ref_prefix] = {
+                "records": len(observed),
+                "missing": len(absent),
+                "updated": updated,
+            }
+
+        # static/uploads also holds the page editor's uploads, which only
+        # page content refers to: files there are never reported as orphans
+        folders = [c.legacy_folder for c in self.collections if c.ref_prefix != "pdf"]
+        referenced = {
+            entry["id"]
+            for entry in self.blob_store.db_manager.load_data(
+                self.blob_store.index_filename
+            )
+            if entry.get("refs")
+        }
+        orphans = find_orphans(self.blob_store, listings, used, folders, referenced)
+        for orphan in orphans:
+            orphan["path"] = os.path.relpath(orphan["path"])
+
+        finished = time.time()
+        report = {
+            "started_at": datetime.fromtimestamp(started).isoformat(),
+            "finished_at": datetime.fromtimestamp(finished).isoformat(),
+            "finished_ts": finished,
+            "duration_seconds": round(finished - started, 3),
+            "full": full,
+            "directories": directories,
+            "collections": collections,
+            "missing_count": len(missing),
+            "missing": missing[:REPORT_LIMIT],
+            "orphan_count": len(orphans),
+            "orphan_bytes": sum(orphan["size"] for orphan in orphans),
+            "orphans": orphans[:REPORT_LIMIT],
+        }
+        with self._lock:
+            self._state = {
+                "version": INTEGRITY_STATE_VERSION,
+                "listings": listings,
+                "report": report,
+            }
+            self._save_state(self._state)
+        return report
+
+    def _load_state(self) -> dict:
+        if self._state is None:
+            try:
+                with open(self.state_path, encoding="utf-8") as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = {}
+            self._state = (
+                state if state.get("version") == INTEGRITY_STATE_VERSION else {}
+            )
+        return self._state
+
+    def _save_state(self, state: dict) -> None:
+        fd, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(self.state_path), suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(temp_path, self.state_path)
+        except OSError as e:
+            logger.warning("Could not save upload integrity state: %s", e)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+_services: Dict[str, UploadIntegrityService] = {}
+_services_lock = threading.Lock()
+
+
+def get_integrity_service(db_manager: DatabaseManager) -> UploadIntegrityService:
+    """Return the process-wide upload integrity service for a data folder"""
+    root = os.path.abspath(db_manager.data_folder)
+    with _services_lock:
+        service = _services.get(root)
+        if service is None:
+            service = UploadIntegrityService(db_manager)
+            _services[root] = service
+        return service
@@ -0,0 +1,247 @@
+"""
+Row preview service for Wiki Veloz
+CDD v2.0 - Pages of rows from large text, CSV and spreadsheet files
+"""
+
+import codecs
+import csv
+import json
+import os
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, Iterator, List, Optional
+
+from app.core.blob_store import BlobStore, is_digest
+from app.shared.exceptions import UnsupportedPreviewError
+from app.shared.text_extraction import (
+    iter_xlsx_rows,
+    xlsx_row_count,
+    xlsx_sheets,
+    xlsx_shared_strings,
+)
+
+# Bump when the index layout changes, so indexes cached on disk are rebuilt
+LINE_INDEX_VERSION = "1"
+# One byte offset is kept per this many records
+LINE_INDEX_STRIDE = 1000
+LINE_INDEX_CACHE_SIZE = 64
+SNIFF_BYTES = 64 * 1024
+
+TEXT_EXTENSIONS = frozenset({"txt", "csv"})
+SPREADSHEET_EXTENSIONS = frozenset({"xlsx"})
+
+
+def build_line_index(path: str, quoted: bool) -> dict:
+    """One pass over a text file recording where every STRIDE-th record starts.
+
+    With ``quoted`` (CSV) a record ends only on a line that leaves the
+    running count of double quotes even, so quoted fields spanning several
+    lines stay one record. Encoding and delimiter are detected on the way.
+    """
+    with open(path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+        start = len(codecs.BOM_UTF8) if head.startswith(codecs.BOM_UTF8) else 0
+        try:
+            head[start:].decode("utf-8")
+            encoding = "utf-8"
+        except UnicodeDecodeError as e:
+            # A multi-byte character cut at the end of the sample is fine
+            encoding = "utf-8" if e.start >= len(head) - 3 else "latin-1"
+
+        delimiter = None
+        if quoted:
+            try:
+                sample = head[start:].decode(encoding, errors="ignore")
+                delimiter = csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+            except csv.Error:
+                delimiter = ","
+
+        offsets: List[int] = []
+        records = 0
+        position = start
+        in_quotes = False
+        f.seek(start)
+        for line in f:
+            if not in_quotes and records % LINE_INDEX_STRIDE == 0:
+                offsets.append(position)
+            position += len(line)
+            if quoted and line.count(b'"') % 2:
+                in_quotes = not in_quotes
+            if not in_quotes:
+                records += 1
+        if in_quotes:
+            records += 1
+
+    return {
+        "version": LINE_INDEX_VERSION,
+        "stride": LINE_INDEX_STRIDE,
+        "offsets": offsets,
+        "total": records,
+        "encoding": encoding,
+        "delimiter": delimiter,
+    }
+
+
+def _iter_records(path: str, index: dict, first: int) -> Iterator[List[str]]:
+    """Records of an indexed text file from record number ``first`` on"""
+    checkpoint = first // index["stride"]
+    if checkpoint >= len(index["offsets"]):
+        return
+    with open(path, "rb") as f:
+        f.seek(index["offsets"][checkpoint])
+        lines = (line.decode(index["encoding"], errors="replace") for line in f)
+        if index["delimiter"]:
+            records = csv.reader(lines, delimiter=index["delimiter"])
+        else:
+            records = ([line.rstrip("\r\n")] for line in lines)
+        yield from islice(records, first - checkpoint * index["stride"], None)
+
+
+class RowPreviewService:
+    """Serves a page of rows without reading the file up to it.
+
+    CSV and TXT files get a sparse record index, built in one pass the
+    first time the file is previewed: one byte offset every
+    LINE_INDEX_STRIDE records. A page then seeks to the nearest checkpoint
+    and skips fewer than STRIDE records. Indexes of blobs (which never
+    change) are also written beside the blob; others are kept only in an
+    LRU keyed by path, size and mtime. XLSX sheets are streamed row by row.
+    """
+
+    def __init__(self, blob_store: BlobStore):
+        self.blob_store = blob_store
+        self._indexes: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_rows(
+        self,
+        path: str,
+        filename: str,
+        offset: int = 0,
+        limit: int = 100,
+        sheet: int = 0,
+    ) -> dict:
+        """Rows [offset, offset + limit) plus the header row and the total"""
+        if offset < 0:
+            raise ValueError("offset deve ser maior ou igual a zero")
+        if limit < 1:
+            raise ValueError("limit deve ser maior que zero")
+
+        extension = os.path.splitext(filename or "")[1].lstrip(".").lower()
+        if extension in TEXT_EXTENSIONS:
+            page = self._text_rows(path, extension == "csv", offset, limit)
+        elif extension in SPREADSHEET_EXTENSIONS:
+            page = self._xlsx_rows(path, offset, limit, sheet)
+        elif extension == "xls":
+            # Legacy binary workbooks would need a full BIFF parser
+            raise UnsupportedPreviewError(
+                "Planilhas .xls não podem ser visualizadas; envie o arquivo em .xlsx"
+            )
+        else:
+            raise UnsupportedPreviewError(
+                f"Visualização em linhas não disponível para arquivos .{extension}"
+            )
+
+        total = page.get("total")
+        end = offset + len(page["rows"])
+        more = end < total if total is not None else len(page["rows"]) == limit
+        page.update(offset=offset, limit=limit, next_offset=end if more else None)
+        return page
+
+    def _text_rows(self, path: str, quoted: bool, offset: int, limit: int) -> dict:
+        index = self.get_line_index(path, quoted)
+        return {
+            "format": "csv" if quoted else "txt",
+            "header": next(_iter_records(path, index, 0), None) if quoted else None,
+            "rows": list(islice(_iter_records(path, index, offset), limit)),
+            "total": index["total"],
+        }
+
+    def _xlsx_rows(self, path: str, offset: int, limit: int, sheet: int) -> dict:
+        with zipfile.ZipFile(path) as archive:
+            sheets = xlsx_sheets(archive)
+            if not 0 <= sheet < len(sheets):
+                raise ValueError(f"Planilha inexistente: {sheet}")
+            shared = xlsx_shared_strings(archive)
+            part = sheets[sheet]
+            return {
+                "format": "xlsx",
+                "sheet": sheet,
+                "sheet_count": len(sheets),
+                "header": next(iter_xlsx_rows(archive, part, shared), None),
+                "rows": list(
+                    islice(
+                        iter_xlsx_rows(archive, part, shared), offset, offset + limit
+                    )
+                ),
+                "total": xlsx_row_count(archive, part),
+            }
+
+    def get_line_index(self, path: str, quoted: bool) -> dict:
+        """Sparse record index of a text file, built once and then cached"""
+        stat = os.stat(path)
+        digest = os.path.basename(path)
+        blob = is_digest(digest)
+        key = (
+            (digest, quoted) if blob else (path, quoted, stat.st_size, stat.st_mtime_ns)
+        )
+
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                return index
+
+        cached = None
+        if blob:
+            cached = self.blob_store.derivative_path(
+                digest, f"lines{int(quoted)}.r{LINE_INDEX_VERSION}.json"
+            )
+        index = self._load_index(cached) if cached else None
+        if index is None:
+            index = build_line_index(path, quoted)
+            if cached:
+                self._save_index(cached, index)
+
+        with self._lock:
+            self._indexes[key] = index
+            while len(self._indexes) > LINE_INDEX_CACHE_SIZE:
+                self._indexes.popitem(last=False)
+        return index
+
+    def _load_index(self, path: str) -> Optional[dict]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return index if index.get("version") == LINE_INDEX_VERSION else None
+
+    def _save_index(self, path: str, index: dict) -> None:
+        fd, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), prefix=os.path.basename(path), suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+_services: Dict[str, RowPreviewService] = {}
+_services_lock = threading.Lock()
+
+
+def get_row_preview_service(blob_store: BlobStore) -> RowPreviewService:
+    """Return the process-wide row preview service for a blob store"""
+    with _services_lock:
+        service = _services.get(blob_store.root)
+        if service is None:
+            service = RowPreviewService(blob_store)
+            _services[blob_store.root] = service
+        return service
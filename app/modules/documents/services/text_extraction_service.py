@@ -0,0 +1,153 @@
+"""
+Text extraction service for Wiki Veloz
+CDD v2.0 - Searchable text of uploaded files, extracted in worker processes
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, Optional
+
+from app.core.blob_store import get_blob_store
+from app.core.database import DatabaseManager
+from app.modules.documents.repositories.document_repository import DocumentRepository
+from app.shared.text_extraction import ExtractionTimeout, can_extract, extract_text
+
+logger = logging.getLogger(__name__)
+
+
+class TextExtractionService:
+    """Feeds ``DocumentRepository.text_store`` from a process pool.
+
+    Parsing runs in separate processes so a slow or hostile file costs a
+    worker, never a request thread or the GIL. Results are stored per blob
+    digest as soon as each file finishes, which makes backfills restartable:
+    a new run only submits blobs that have no stored text yet. Files that
+    time out, exceed the caps or fail to parse are stored as empty text so
+    they are not retried until the extractor version changes.
+    """
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.document_repository = DocumentRepository(db_manager)
+        self.blob_store = get_blob_store(db_manager)
+        self.workers = db_manager.config.TEXT_EXTRACTION_WORKERS
+        self.limits = (
+            db_manager.config.TEXT_EXTRACTION_MAX_CHARS,
+            db_manager.config.TEXT_EXTRACTION_MAX_FILE_SIZE,
+            db_manager.config.TEXT_EXTRACTION_TIMEOUT_SECONDS,
+        )
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Started on first use: most processes importing this never extract
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _submit(self, digest: str, filename: str) -> Future:
+        args = (extract_text, self.blob_store.path_for(digest), filename, *self.limits)
+        try:
+            return self._pool().submit(*args)
+        except BrokenProcessPool:
+            # A worker died (out of memory, crash in a parser): start a new pool
+            self._executor = None
+            return self._pool().submit(*args)
+
+    def schedule(
+        self, digest: Optional[str], filename: Optional[str]
+    ) -> Optional[Future]:
+        """Extract a blob's text in the background unless it is already stored.
+
+        The returned future resolves once the text is saved: to the text,
+        or to None when the worker died and nothing was stored.
+        """
+        if not self.blob_store.exists(digest) or not can_extract(filename):
+            return None
+        if self.document_repository.has_extracted_text(digest):
+            return None
+        with self._lock:
+            stored = self._pending.get(digest)
+            if stored is not None:
+                return stored
+            stored = Future()
+            self._pending[digest] = stored
+            extraction = self._submit(digest, filename)
+        extraction.add_done_callback(lambda done: self._store(digest, done, stored))
+        return stored
+
+    def _store(self, digest: str, extraction: Future, stored: Future) -> None:
+        text = None
+        try:
+            text = extraction.result()
+        except BrokenProcessPool:
+            with self._lock:
+                self._executor = None
+            logger.warning("Text extraction worker died on %s", digest)
+        except (ExtractionTimeout, ValueError) as e:
+            logger.info("Text extraction skipped for %s: %s", digest, e)
+            text = ""
+        except Exception as e:
+            logger.warning("Text extraction failed for %s: %s", digest, e)
+            text = ""
+        try:
+            if text is not None:
+                self.document_repository.save_extracted_text(digest, text)
+        finally:
+            with self._lock:
+                self._pending.pop(digest, None)
+            stored.set_result(text)
+
+    def extract_missing(
+        self, documents: Optional[Iterable[dict]] = None
+    ) -> Dict[str, int]:
+        """Backfill every document whose file has no stored text; waits for the pool"""
+        if documents is None:
+            documents = self.document_repository.load_documents()
+        futures = {}
+        skipped = 0
+        for document in documents:
+            digest = document.get("sha256")
+            if digest in futures:
+                continue
+            future = self.schedule(digest, document.get("filename"))
+            if future is None:
+                skipped += 1
+            else:
+                futures[digest] = future
+
+        stats = {"extracted": 0, "empty": 0, "failed": 0, "skipped": skipped}
+        for future in futures.values():
+            text = future.result()
+            if text is None:
+                stats["failed"] += 1
+            elif text:
+                stats["extracted"] += 1
+            else:
+                stats["empty"] += 1
+        return stats
+
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+_services: Dict[str, TextExtractionService] = {}
+_services_lock = threading.Lock()
+
+
+def get_text_extraction_service(db_manager: DatabaseManager) -> TextExtractionService:
+    """Return the process-wide text extraction service for a data folder"""
+    root = os.path.abspath(db_manager.data_folder)
+    with _services_lock:
+        service = _services.get(root)
+        if service is None:
+            service = TextExtractionService(db_manager)
+            _services[root] = service
+        return service
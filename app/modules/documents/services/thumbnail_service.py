@@ -0,0 +1,200 @@
+"""
+Thumbnail service for Wiki Veloz
+CDD v2.0 - Thumbnails and first-page previews rendered in the background
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from html import escape
+from typing import Dict, Optional, Set, Tuple
+
+from app.core.blob_store import BlobStore, get_blob_store
+from app.core.database import DatabaseManager
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # image thumbnails need Pillow
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Bump when the output changes, so derivatives from the old pipeline are redone
+THUMBNAIL_VERSION = "1"
+IMAGE_EXTENSIONS = frozenset({"jpg", "jpeg", "png", "gif", "bmp", "tiff", "webp"})
+PDF_EXTENSIONS = frozenset({"pdf"})
+
+READY = "ready"
+PENDING = "pending"
+UNAVAILABLE = "unavailable"
+
+
+def file_extension(filename: Optional[str]) -> str:
+    """Lower-case extension without the dot"""
+    return os.path.splitext(filename or "")[1].lstrip(".").lower()
+
+
+def render_image(source: str, target: str, size: int, timeout: int) -> None:
+    """Downscale an image to fit size x size, written as PNG"""
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size))
+        if image.mode not in ("RGB", "RGBA", "L", "LA"):
+            image = image.convert("RGBA")
+        image.save(target, "PNG", optimize=True)
+
+
+def render_pdf(source: str, target: str, size: int, timeout: int) -> None:
+    """Render the first page of a PDF with poppler's pdftoppm, written as PNG"""
+    base = target[: -len(".png")]
+    subprocess.run(
+        [
+            "pdftoppm",
+            "-png",
+            "-singlefile",
+            "-f",
+            "1",
+            "-l",
+            "1",
+            "-scale-to",
+            str(size),
+            source,
+            base,
+        ],
+        check=True,
+        timeout=timeout,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def available_renderers() -> Dict[str, object]:
+    """Renderer per extension, for the optional tools installed here"""
+    renderers = {}
+    if Image is not None:
+        renderers.update(dict.fromkeys(IMAGE_EXTENSIONS, render_image))
+    if shutil.which("pdftoppm"):
+        renderers.update(dict.fromkeys(PDF_EXTENSIONS, render_pdf))
+    return renderers
+
+
+def placeholder_svg(label: str, size: int) -> str:
+    """Neutral placeholder shown while a thumbnail is pending or unavailable"""
+    label = escape((label or "arquivo").upper()[:6])
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+        f'viewBox="0 0 100 100"><rect width="100" height="100" rx="6" fill="#e5e7eb"/>'
+        f'<text x="50" y="56" font-family="sans-serif" font-size="16" '
+        f'text-anchor="middle" fill="#6b7280">{label}</text></svg>'
+    )
+
+
+class ThumbnailService:
+    """Derivatives of uploaded images and PDFs, cached beside their blob.
+
+    Uploads call ``schedule`` and move on; a small thread pool renders
+    every configured size (Pillow and pdftoppm do the heavy lifting outside
+    the GIL). Requests only ever look at the cache: a miss queues the job and
+    reports it as pending, so nothing is rendered on the request path.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, blob_store: BlobStore):
+        self.blob_store = blob_store
+        self.sizes: Dict[str, int] = dict(db_manager.config.THUMBNAIL_SIZES)
+        self.timeout = db_manager.config.THUMBNAIL_TIMEOUT_SECONDS
+        self.renderers = available_renderers()
+        self._pending: Dict[str, Future] = {}
+        self._failed: Set[str] = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=db_manager.config.THUMBNAIL_WORKERS,
+            thread_name_prefix="thumbnail",
+        )
+
+    def path_for(self, digest: str, variant: str) -> str:
+        """Cached derivative of a blob for one configured size"""
+        return self.blob_store.derivative_path(
+            digest, f"{variant}.r{THUMBNAIL_VERSION}.png"
+        )
+
+    def can_render(self, filename: Optional[str]) -> bool:
+        """Whether thumbnails can be made for this file type here"""
+        return file_extension(filename) in self.renderers
+
+    def get(
+        self, digest: Optional[str], filename: Optional[str], variant: str
+    ) -> Tuple[str, Optional[str]]:
+        """(status, path) of a derivative; queues the job on a cache miss"""
+        if variant not in self.sizes:
+            raise ValueError(f"Tamanho inválido: {variant}")
+        if not self.blob_store.exists(digest) or not self.can_render(filename):
+            return UNAVAILABLE, None
+
+        path = self.path_for(digest, variant)
+        if os.path.exists(path):
+            return READY, path
+        with self._lock:
+            if digest in self._failed:
+                return UNAVAILABLE, None
+        self.schedule(digest, filename)
+        return PENDING, None
+
+    def schedule(
+        self, digest: Optional[str], filename: Optional[str]
+    ) -> Optional[Future]:
+        """Render every size of a blob in the background; one job per blob"""
+        if not self.blob_store.exists(digest) or not self.can_render(filename):
+            return None
+        with self._lock:
+            future = self._pending.get(digest)
+            if future is not None or digest in self._failed:
+                return future
+            future = self._executor.submit(
+                self._generate, digest, file_extension(filename)
+            )
+            self._pending[digest] = future
+        future.add_done_callback(lambda _: self._forget_pending(digest))
+        return future
+
+    def _generate(self, digest: str, extension: str) -> None:
+        source = self.blob_store.path_for(digest)
+        render = self.renderers[extension]
+        for variant, size in self.sizes.items():
+            target = self.path_for(digest, variant)
+            if os.path.exists(target):
+                continue
+            # Rendered under a unique name and renamed, so readers never see half a file
+            temp = f"{target[:-len('.png')]}.{uuid.uuid4().hex}.tmp.png"
+            try:
+                render(source, temp, size, self.timeout)
+                os.replace(temp, target)
+            except Exception as e:
+                logger.warning("Thumbnail failed for %s (%s): %s", digest, variant, e)
+                with self._lock:
+                    self._failed.add(digest)
+                if os.path.exists(temp):
+                    os.remove(temp)
+                return
+
+    def _forget_pending(self, digest: str) -> None:
+        with self._lock:
+            self._pending.pop(digest, None)
+
+
+_services: Dict[str, ThumbnailService] = {}
+_services_lock = threading.Lock()
+
+
+def get_thumbnail_service(db_manager: DatabaseManager) -> ThumbnailService:
+    """Return the process-wide thumbnail service for the configured BLOB_FOLDER"""
+    blob_store = get_blob_store(db_manager)
+    with _services_lock:
+        service = _services.get(blob_store.root)
+        if service is None:
+            service = ThumbnailService(db_manager, blob_store)
+            _services[blob_store.root] = service
+        return service
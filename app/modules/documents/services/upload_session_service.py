@@ -0,0 +1,285 @@
+"""
+Resumable upload service for Wiki Veloz
+CDD v2.0 - Chunked upload sessions that survive dropped connections
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import uuid
+from datetime import datetime, timedelta
+from typing import BinaryIO, Optional, Tuple
+
+from werkzeug.datastructures import FileStorage
+
+from app.core.database import DatabaseManager
+from app.modules.documents.repositories.document_repository import DocumentRepository
+from app.modules.documents.services.document_service import DocumentService
+from app.shared.exceptions import FileUploadError
+from app.shared.uploads import check_upload_extension
+
+MIN_CHUNK_SIZE = 256 * 1024
+COPY_BUFFER_SIZE = 64 * 1024
+
+_SESSION_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadSessionService:
+    """Upload sessions that collect numbered chunks into a part file on disk.
+
+    Each session is a folder holding ``session.json`` and ``upload.part``.
+    The part file is allocated at its final size and chunk ``n`` is written
+    at offset ``n * chunk_size``, so chunks may arrive in any order, be
+    retried, or come from a reconnecting client. A chunk is checked in its
+    own temp file and only copied into the part file once it verifies.
+    Sessions not touched for ``UPLOAD_SESSION_TTL_HOURS`` are removed by
+    ``cleanup_expired``.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, document_service: DocumentService):
+        self.db_manager = db_manager
+        self.document_service = document_service
+        self.folder = db_manager.config.UPLOAD_SESSION_FOLDER
+        self.root = os.path.join(db_manager.data_folder, self.folder)
+        self.default_chunk_size = db_manager.config.UPLOAD_CHUNK_SIZE
+        self.ttl = timedelta(hours=db_manager.config.UPLOAD_SESSION_TTL_HOURS)
+
+    def _session_dir(self, session_id: str) -> str:
+        return os.path.join(self.root, session_id)
+
+    def _part_path(self, session_id: str) -> str:
+        return os.path.join(self._session_dir(session_id), "upload.part")
+
+    def _lock(self, session_id: str):
+        return self.db_manager.lock(
+            os.path.join(self.folder, session_id, "session.json")
+        )
+
+    def _load(self, session_id: str) -> Optional[dict]:
+        if not _SESSION_ID.match(session_id or ""):
+            return None
+        try:
+            with open(
+                os.path.join(self._session_dir(session_id), "session.json"),
+                encoding="utf-8",
+            ) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, session: dict) -> None:
+        session["expires_at"] = (datetime.now() + self.ttl).isoformat()
+        path = os.path.join(self._session_dir(session["id"]), "session.json")
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(session, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def _is_expired(self, session: dict) -> bool:
+        return session.get("expires_at", "") < datetime.now().isoformat()
+
+    def _status(self, session: dict) -> dict:
+        """Public view of a session"""
+        received = set(session["received"])
+        return {
+            "id": session["id"],
+            "filename": session["filename"],
+            "size": session["size"],
+            "chunk_size": session["chunk_size"],
+            "total_chunks": session["total_chunks"],
+            "received": sorted(received),
+            "missing": [i for i in range(session["total_chunks"]) if i not in received],
+            "expires_at": session["expires_at"],
+        }
+
+    def create_session(
+        self,
+        filename: str,
+        size: int,
+        owner_id: str,
+        metadata: dict,
+        sha256: Optional[str] = None,
+        chunk_size: Optional[int] = None,
+    ) -> dict:
+        """Open an upload session; raises FileUploadError on invalid input"""
+        self.cleanup_expired()
+
+        check_upload_extension(filename or "", DocumentRepository.ALLOWED_EXTENSIONS)
+        if not isinstance(size, int) or size <= 0:
+            raise FileUploadError("Tamanho do arquivo inválido")
+        if size > DocumentRepository.MAX_FILE_SIZE:
+            raise FileUploadError("Arquivo muito grande (máximo 50MB)")
+        chunk_size = chunk_size or self.default_chunk_size
+        if (
+            not isinstance(chunk_size, int)
+            or not MIN_CHUNK_SIZE <= chunk_size <= self.default_chunk_size
+        ):
+            raise FileUploadError(
+                f"chunk_size deve estar entre {MIN_CHUNK_SIZE} e "
+                f"{self.default_chunk_size} bytes"
+            )
+
+        # Fail before any byte is sent rather than after the last one
+        is_valid, message = self.document_service.validate_document_data(metadata)
+        if not is_valid:
+            raise FileUploadError(message)
+
+        session = {
+            "id": uuid.uuid4().hex,
+            "owner_id": owner_id,
+            "filename": filename,
+            "size": size,
+            "sha256": sha256.lower() if sha256 else None,
+            "chunk_size": chunk_size,
+            "total_chunks": -(-size // chunk_size),
+            "received": [],
+            "metadata": metadata,
+            "created_at": datetime.now().isoformat(),
+        }
+
+        os.makedirs(self._session_dir(session["id"]))
+        with open(self._part_path(session["id"]), "wb") as f:
+            f.truncate(size)
+        self._save(session)
+        return self._status(session)
+
+    def get_session(self, session_id: str, owner_id: str) -> Optional[dict]:
+        """Status of a live session owned by owner_id, or None"""
+        session = self._load(session_id)
+        if not session or session["owner_id"] != owner_id or self._is_expired(session):
+            return None
+        return self._status(session)
+
+    def write_chunk(
+        self,
+        session_id: str,
+        owner_id: str,
+        index: int,
+        stream: BinaryIO,
+        offset: Optional[int] = None,
+        checksum: Optional[str] = None,
+    ) -> Optional[dict]:
+        """Store chunk ``index`` of a session; None if the session does not exist.
+
+        ``offset``, when sent, must match the chunk position; ``checksum`` is
+        the SHA-256 of the chunk. Raises FileUploadError on any mismatch, in
+        which case the chunk is not marked as received.
+        """
+        session = self._load(session_id)
+        if not session or session["owner_id"] != owner_id or self._is_expired(session):
+            return None
+        if not 0 <= index < session["total_chunks"]:
+            raise FileUploadError(f"Chunk fora do intervalo: {index}")
+
+        start = index * session["chunk_size"]
+        if offset is not None and offset != start:
+            raise FileUploadError(
+                f"Offset inválido para o chunk {index}: esperado {start}"
+            )
+        expected = min(session["chunk_size"], session["size"] - start)
+
+        # Verified in a scratch file first: a bad retry of a chunk that was
+        # already received must not overwrite its good bytes
+        temp_path = os.path.join(
+            self._session_dir(session_id), f"chunk-{index}.{uuid.uuid4().hex}.tmp"
+        )
+        try:
+            hasher = hashlib.sha256()
+            written = 0
+            with open(temp_path, "wb") as f:
+                while written <= expected:
+                    piece = stream.read(min(COPY_BUFFER_SIZE, expected + 1 - written))
+                    if not piece:
+                        break
+                    written += len(piece)
+                    if written > expected:
+                        break
+                    hasher.update(piece)
+                    f.write(piece)
+
+            if written != expected:
+                raise FileUploadError(f"Chunk {index} deve ter {expected} bytes")
+            if checksum and checksum.lower() != hasher.hexdigest():
+                raise FileUploadError(f"Checksum do chunk {index} não confere")
+
+            with self._lock(session_id):
+                session = self._load(session_id)
+                if not session:
+                    return None
+                with open(temp_path, "rb") as source, open(
+                    self._part_path(session_id), "r+b"
+                ) as f:
+                    f.seek(start)
+                    shutil.copyfileobj(source, f, COPY_BUFFER_SIZE)
+                if index not in session["received"]:
+                    session["received"].append(index)
+                self._save(session)
+                return self._status(session)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def complete(self, session_id: str, owner_id: str) -> Tuple[bool, str]:
+        """Turn a fully received session into a document"""
+        with self._lock(session_id):
+            session = self._load(session_id)
+            if (
+                not session
+                or session["owner_id"] != owner_id
+                or self._is_expired(session)
+            ):
+                return False, "Sessão de upload não encontrada"
+            if len(set(session["received"])) != session["total_chunks"]:
+                return False, "Upload incompleto"
+
+            part_path = self._part_path(session_id)
+            if session["sha256"]:
+                hasher = hashlib.sha256()
+                with open(part_path, "rb") as f:
+                    for piece in iter(lambda: f.read(COPY_BUFFER_SIZE), b""):
+                        hasher.update(piece)
+                if hasher.hexdigest() != session["sha256"]:
+                    return False, "Checksum do arquivo não confere"
+
+            with open(part_path, "rb") as f:
+                success, message = self.document_service.create_document(
+                    dict(session["metadata"]),
+                    FileStorage(stream=f, filename=session["filename"]),
+                    owner_id,
+                )
+
+        if success:
+            self.abort(session_id, owner_id)
+        return success, message
+
+    def abort(self, session_id: str, owner_id: str) -> bool:
+        """Discard a session and its partial file"""
+        session = self._load(session_id)
+        if not session or session["owner_id"] != owner_id:
+            return False
+        shutil.rmtree(self._session_dir(session_id), ignore_errors=True)
+        return True
+
+    def cleanup_expired(self) -> int:
+        """Remove expired or unreadable sessions; returns how many were removed"""
+        if not os.path.isdir(self.root):
+            return 0
+
+        removed = 0
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if not entry.is_dir():
+                    continue
+                session = self._load(entry.name)
+                if session is None:
+                    # A session folder without state is only garbage once it is old
+                    age = datetime.now().timestamp() - entry.stat().st_mtime
+                    if age < self.ttl.total_seconds():
+                        continue
+                elif not self._is_expired(session):
+                    continue
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        return removed
@@ -4,10 +4,18 @@ CDD v2.0 - Main application routes
 """
 
 import json
+from datetime import datetime
 
 from flask import Blueprint, jsonify, render_template, request
 from flask_login import current_user, login_required
 
+from app.core.config import config
+from app.core.database import DatabaseManager
+from app.shared.decorators import conditional_get
+
+# Initialize services
+db_manager = DatabaseManager(config['default']())
+
 main_bp = Blueprint("main", __name__)
 
 
@@ -34,15 +42,13 @@ def documents():
 
 @main_bp.route("/api/categories")
 @login_required
+@conditional_get(db_manager, "pages.json")
 def get_categories():
     """Get all categories from pages"""
     try:
-        from app.core.config import config
-        from app.core.database import DatabaseManager
         from app.modules.pages.services.page_service import PageService
 
         # Initialize services
-        db_manager = DatabaseManager(config['default'])
         page_service = PageService(db_manager)
         
         # Get all pages
@@ -61,6 +67,33 @@ def get_categories():
         }), 500
 
 
+@main_bp.route("/api/notifications/unread-count")
+@login_required
+@conditional_get(db_manager, "notifications.json", per_user=True, ttl=60)
+def get_unread_notifications_count():
+    """Get the number of unread, unexpired notifications of the current user"""
+    try:
+        now = datetime.now()
+        count = sum(
+            1 for notification in db_manager.load_data("notifications.json")
+            if notification.get("user_id") == current_user.id
+            and not notification.get("is_read")
+            and not (
+                notification.get("expires_at")
+                and datetime.fromisoformat(notification["expires_at"]) < now
+            )
+        )
+        
+        return jsonify({
+            "unread_count": count
+        })
+        
+    except Exception as e:
+        return jsonify({
+            "error": str(e)
+        }), 500
+
+
 @main_bp.route("/api/search")
 @login_required
 def global_search():
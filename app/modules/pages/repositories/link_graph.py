@@ -0,0 +1,101 @@
+"""
+Page link graph for Wiki Veloz
+CDD v2.0 - Forward and reverse adjacency between wiki pages
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class LinkGraph:
+    """Links between pages, keyed by the raw target written in the content.
+
+    Targets are slugs or page ids. The reverse list is keyed by target, so a
+    link to a page that does not exist yet starts resolving as soon as a page
+    takes that slug, and renaming a page only records the old slug as an
+    alias instead of rewriting every page that links to it.
+    """
+
+    def __init__(self, data: Optional[dict] = None):
+        data = data or {}
+        self.forward: Dict[str, List[str]] = data.get("forward", {})
+        self.reverse: Dict[str, List[str]] = data.get("reverse", {})
+        self.slugs: Dict[str, str] = data.get("slugs", {})
+        self.page_slugs: Dict[str, str] = data.get("page_slugs", {})
+        self.aliases: Dict[str, str] = data.get("aliases", {})
+
+    @classmethod
+    def from_pages(cls, pages: Iterable[Tuple[dict, List[str]]]) -> "LinkGraph":
+        """Build the graph from (page, link targets) pairs"""
+        graph = cls()
+        for page, targets in pages:
+            graph.set_slug(page["id"], page.get("slug"))
+            graph.set_links(page["id"], targets)
+        return graph
+
+    def to_dict(self) -> dict:
+        """Serializable form of the graph"""
+        return {
+            "forward": self.forward,
+            "reverse": self.reverse,
+            "slugs": self.slugs,
+            "page_slugs": self.page_slugs,
+            "aliases": self.aliases,
+        }
+
+    def set_links(self, page_id: str, targets: Iterable[str]) -> None:
+        """Replace the outgoing links of a page"""
+        targets = list(dict.fromkeys(targets))
+        for target in self.forward.get(page_id, []):
+            sources = self.reverse.get(target, [])
+            if page_id in sources:
+                sources.remove(page_id)
+            if not sources:
+                self.reverse.pop(target, None)
+
+        if targets:
+            self.forward[page_id] = targets
+        else:
+            self.forward.pop(page_id, None)
+        for target in targets:
+            self.reverse.setdefault(target, []).append(page_id)
+
+    def set_slug(self, page_id: str, slug: Optional[str]) -> None:
+        """Record a page's slug; a previous slug becomes an alias of the page"""
+        previous = self.page_slugs.get(page_id)
+        if previous == slug:
+            return
+        if previous is not None:
+            self.slugs.pop(previous, None)
+            self.aliases[previous] = page_id
+        if slug:
+            self.slugs[slug] = page_id
+            self.page_slugs[page_id] = slug
+            # A page taking a slug wins over an old alias
+            self.aliases.pop(slug, None)
+        else:
+            self.page_slugs.pop(page_id, None)
+
+    def remove(self, page_id: str) -> None:
+        """Drop a page; links pointing at it become dangling"""
+        self.set_links(page_id, [])
+        slug = self.page_slugs.pop(page_id, None)
+        if slug is not None and self.slugs.get(slug) == page_id:
+            del self.slugs[slug]
+        for alias in [a for a, target in self.aliases.items() if target == page_id]:
+            del self.aliases[alias]
+
+    def backlinks(self, page_id: str) -> List[str]:
+        """Ids of pages linking to a page by id, slug or former slug"""
+        targets = [
+            page_id,
+            *[a for a, target in self.aliases.items() if target == page_id],
+        ]
+        if page_id in self.page_slugs:
+            targets.append(self.page_slugs[page_id])
+
+        sources: Dict[str, None] = {}
+        for target in targets:
+            for source in self.reverse.get(target, []):
+                if source != page_id:
+                    sources[source] = None
+        return list(sources)
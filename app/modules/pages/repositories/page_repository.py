@@ -3,82 +3,331 @@ Page repository for Wiki Veloz
 CDD v2.0 - Page data management
 """
 
+import json
+import os
+import time
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from app.core.content_store import ContentStore, content_hash
 from app.core.database import DatabaseManager
+from app.core.indexes import (
+    SortedIndex,
+    TopKIndex,
+    decode_cursor,
+    encode_cursor,
+    get_collection_indexes,
+    trending_bump,
+    trending_value,
+)
+from app.modules.pages.repositories.link_graph import LinkGraph
+from app.modules.pages.services.page_meta import extract_page_meta
+from app.shared.exceptions import VersionConflictError
+from app.shared.listing import ListingQuery, build_sorted_index, paginate_index
 
 
 class PageRepository:
     """Repository for page operations"""
     
+    # Fields listings may be sorted by, with the key used for missing values
+    SORTABLE_FIELDS = {
+        'title': '',
+        'category': '',
+        'created_at': '',
+        'updated_at': '',
+        'views': 0
+    }
+    
+    # Sorts answered straight from a maintained index
+    INDEXED_SORTS = {'updated_at': 'recent', 'views': 'popular'}
+    
+    # Fields managed by the repository, never written by partial updates
+    READONLY_FIELDS = {
+        'id', 'version', 'versions', 'created_at', 'updated_at', 'author_id',
+        'views', 'trending_score', 'content_hash', 'content_length'
+    }
+    
     def __init__(self, db_manager: DatabaseManager):
         self.db_manager = db_manager
         self.filename = "pages.json"
+        self.links_filename = "page_links.json"
+        self.content_store = ContentStore(
+            os.path.join(db_manager.data_folder, "page_content")
+        )
+        self.meta_store = ContentStore(self.content_store.root, suffix=".meta.json.gz")
+        self.indexes = get_collection_indexes(db_manager, self.filename)
+        self.indexes.register('trending', self._build_trending_index)
+        self.indexes.register(
+            'recent', lambda: SortedIndex(lambda page: page.get('updated_at') or '')
+        )
+        self.indexes.register(
+            'popular', lambda: SortedIndex(lambda page: page.get('views') or 0)
+        )
+    
+    def _build_trending_index(self) -> TopKIndex:
+        """Top-K heap over the time-decayed view score"""
+        return TopKIndex(
+            self.db_manager.config.TRENDING_TOP_K,
+            lambda page: page.get('trending_score')
+        )
     
     def load_pages(self) -> List[dict]:
-        """Load all pages"""
+        """Load all pages (metadata only, see ``with_content``)"""
         return self.db_manager.load_data(self.filename)
     
     def save_pages(self, pages: List[dict]) -> bool:
-        """Save all pages"""
+        """Save all pages, moving any inline content to the content store"""
+        for page in pages:
+            self._externalize_content(page)
         return self.db_manager.save_data(self.filename, pages)
     
+    def _externalize_content(self, page: dict) -> None:
+        """Replace inline page and version bodies by hash/length metadata"""
+        page_id = page.get('id', '')
+        if 'content' in page:
+            self._store_body(page, page_id, page.pop('content'))
+        
+        for version in page.get('versions', []):
+            if 'content' in version:
+                self._store_body(
+                    version,
+                    self._version_key(page_id, version.get('version')),
+                    version.pop('content')
+                )
+    
+    def _store_body(self, record: dict, key: str, content: Optional[str]) -> None:
+        """Write a body to the content store unless it is already there"""
+        content = content or ''
+        digest = content_hash(content)
+        if digest != record.get('content_hash') or not self.content_store.exists(key):
+            self.content_store.put(key, content)
+        record['content_hash'] = digest
+        record['content_length'] = len(content)
+    
+    def _version_key(self, page_id: str, version) -> str:
+        """Content store key of a stored page version"""
+        return f"{page_id}.v{version}"
+    
+    def load_content(self, page: dict) -> str:
+        """Load a page body (inline bodies from unmigrated data win)"""
+        if 'content' in page:
+            return page['content']
+        return self.content_store.get(page.get('id', '')) or ''
+    
+    def load_version_content(self, page_id: str, version: dict) -> str:
+        """Load the body of a stored page version"""
+        if 'content' in version:
+            return version['content']
+        key = self._version_key(page_id, version.get('version'))
+        return self.content_store.get(key) or ''
+    
+    def with_content(self, page: dict) -> dict:
+        """Return a copy of a page with its body loaded"""
+        return {**page, 'content': self.load_content(page)}
+    
+    def get_page_meta(self, page_id: str) -> Optional[dict]:
+        """Get the precomputed outline/links record stored next to a page body"""
+        raw = self.meta_store.get(page_id)
+        return json.loads(raw) if raw is not None else None
+    
+    def save_page_meta(self, page_id: str, meta: dict) -> None:
+        """Store the precomputed outline/links record of a page"""
+        self.meta_store.put(page_id, json.dumps(meta, ensure_ascii=False))
+    
+    def get_page_metadata(self, page_id: str) -> Optional[dict]:
+        """Get page metadata by ID without loading its body"""
+        return self.db_manager.get_by_id(self.filename, page_id)
+    
     def get_page_by_id(self, page_id: str) -> Optional[dict]:
         """Get page by ID"""
-        return self.db_manager.get_by_id(self.filename, page_id)
+        page = self.get_page_metadata(page_id)
+        return self.with_content(page) if page else None
+    
+    def get_pages_by_ids(self, page_ids: List[str]) -> Dict[str, dict]:
+        """Get page metadata for several IDs with a single load of pages.json"""
+        return self.db_manager.get_by_ids(self.filename, page_ids)
     
     def get_page_by_slug(self, slug: str) -> Optional[dict]:
         """Get page by slug"""
         pages = self.load_pages()
-        return next((p for p in pages if p.get('slug') == slug), None)
+        page = next((p for p in pages if p.get('slug') == slug), None)
+        return self.with_content(page) if page else None
     
     def create_page(self, page_data: dict) -> bool:
         """Create new page"""
-        pages = self.load_pages()
-        
-        # Generate ID if not provided
-        if 'id' not in page_data:
-            page_data['id'] = f"page-{uuid.uuid4().hex[:8]}"
-        
-        # Generate slug if not provided
-        if 'slug' not in page_data and 'title' in page_data:
-            from slugify import slugify
-            page_data['slug'] = slugify(page_data['title'])
+        with self.db_manager.lock(self.filename):
+            before = self.indexes.signature()
+            pages = self.load_pages()
+            
+            # Generate ID if not provided
+            if 'id' not in page_data:
+                page_data['id'] = f"page-{uuid.uuid4().hex[:8]}"
+            
+            # Generate slug if not provided
+            if 'slug' not in page_data and 'title' in page_data:
+                from slugify import slugify
+                page_data['slug'] = slugify(page_data['title'])
+            
+            # Add timestamps
+            page_data['created_at'] = datetime.now().isoformat()
+            page_data['updated_at'] = datetime.now().isoformat()
+            page_data['version'] = 1
+            content = page_data.get('content', '')
+            
+            pages.append(page_data)
+            if self.save_pages(pages):
+                self.indexes.apply(before, upserts=[page_data])
+                self._update_links(page_data, content)
+                return True
+            return False
+    
+    def update_page(
+        self,
+        page_id: str,
+        updates: dict,
+        expected_version: Optional[int] = None,
+        snapshot: bool = False,
+        removals: Iterable[str] = ()
+    ) -> bool:
+        """Update page.
         
-        # Add timestamps
-        page_data['created_at'] = datetime.now().isoformat()
-        page_data['updated_at'] = datetime.now().isoformat()
-        page_data['version'] = 1
+        With ``expected_version`` the write is a compare-and-swap: it raises
+        VersionConflictError unless the stored version still matches. With
+        ``snapshot`` the current state is kept in ``versions`` first, in the
+        same write and under a single version bump. ``removals`` are fields
+        deleted from the record in the same write.
+        """
+        with self.db_manager.lock(self.filename):
+            before = self.indexes.signature()
+            pages = self.load_pages()
+            
+            for page in pages:
+                if page.get('id') == page_id:
+                    # Compare and swap on the version
+                    current_version = page.get('version', 1)
+                    if (
+                        expected_version is not None
+                        and expected_version != current_version
+                    ):
+                        raise VersionConflictError(current_version)
+                    
+                    if snapshot:
+                        page.setdefault('versions', []).append(self._snapshot(page))
+                    
+                    # Update version
+                    updates['version'] = current_version + 1
+                    updates['updated_at'] = datetime.now().isoformat()
+                    
+                    # Update slug if title changed
+                    if 'title' in updates and 'slug' not in updates:
+                        from slugify import slugify
+                        updates['slug'] = slugify(updates['title'])
+                    
+                    page.update(updates)
+                    for field in removals:
+                        page.pop(field, None)
+                    if self.save_pages(pages):
+                        self.indexes.apply(before, upserts=[page])
+                        self._update_links(page, updates.get('content'))
+                        return True
+                    return False
+            
+            return False
+    
+    def delete_page(self, page_id: str) -> bool:
+        """Delete page and its stored bodies"""
+        with self.db_manager.lock(self.filename):
+            before = self.indexes.signature()
+            page = self.get_page_metadata(page_id)
+            if self.db_manager.delete_item(self.filename, page_id):
+                self.indexes.apply(before, removals=[page_id])
+                with self.db_manager.lock(self.links_filename):
+                    graph = self.load_link_graph()
+                    graph.remove(page_id)
+                    self.save_link_graph(graph)
+                if page:
+                    self.content_store.delete(page_id)
+                    self.meta_store.delete(page_id)
+                    for version in page.get('versions', []):
+                        self.content_store.delete(
+                            self._version_key(page_id, version.get('version'))
+                        )
+                return True
+            return False
+    
+    def _link_targets(self, content: str) -> List[str]:
+        """Internal link targets (slugs or ids) written in a page body"""
+        return extract_page_meta(content)['links']['internal']
+    
+    def load_link_graph(self) -> LinkGraph:
+        """Load the link graph, building it from every page the first time"""
+        data = self.db_manager.load_data(self.links_filename)
+        if isinstance(data, dict):
+            return LinkGraph(data)
         
-        pages.append(page_data)
-        return self.save_pages(pages)
+        graph = LinkGraph.from_pages(
+            (page, self._link_targets(self.load_content(page)))
+            for page in self.load_pages()
+        )
+        self.save_link_graph(graph)
+        return graph
     
-    def update_page(self, page_id: str, updates: dict) -> bool:
-        """Update page"""
-        pages = self.load_pages()
+    def save_link_graph(self, graph: LinkGraph) -> bool:
+        """Persist the link graph"""
+        return self.db_manager.save_data(self.links_filename, graph.to_dict())
+    
+    def _update_links(self, page: dict, content: Optional[str]) -> None:
+        """Fold a page's slug and, if its body changed, its links into the graph"""
+        with self.db_manager.lock(self.links_filename):
+            graph = self.load_link_graph()
+            graph.set_slug(page['id'], page.get('slug'))
+            if content is not None:
+                graph.set_links(page['id'], self._link_targets(content))
+            self.save_link_graph(graph)
+    
+    def get_backlinks(self, page_id: str) -> List[dict]:
+        """Get pages linking to a page by id, slug or a former slug"""
+        source_ids = self.load_link_graph().backlinks(page_id)
+        pages = {page.get('id'): page for page in self.load_pages()}
+        return [
+            {
+                'id': source_id,
+                'title': pages[source_id].get('title', ''),
+                'slug': pages[source_id].get('slug', '')
+            }
+            for source_id in source_ids
+            if source_id in pages
+        ]
+    
+    def query_pages(
+        self,
+        query: ListingQuery,
+        **filters
+    ) -> Tuple[List[dict], Optional[str], int]:
+        """Filter, sort and paginate pages; returns (pages, next_cursor, total)"""
+        if query.sort is not None and query.sort not in self.SORTABLE_FIELDS:
+            raise ValueError(f"Campo de ordenação inválido: {query.sort}")
         
-        for page in pages:
-            if page.get('id') == page_id:
-                # Update version
-                current_version = page.get('version', 1)
-                updates['version'] = current_version + 1
-                updates['updated_at'] = datetime.now().isoformat()
-                
-                # Update slug if title changed
-                if 'title' in updates and 'slug' not in updates:
-                    from slugify import slugify
-                    updates['slug'] = slugify(updates['title'])
-                
-                page.update(updates)
-                return self.save_pages(pages)
+        filters = {k: v for k, v in filters.items() if v is not None}
+        if not filters and query.sort in self.INDEXED_SORTS:
+            return paginate_index(
+                self.indexes.get(self.INDEXED_SORTS[query.sort]), query
+            )
         
-        return False
+        pages = [
+            page for page in self.load_pages()
+            if all(page.get(field) == value for field, value in filters.items())
+        ]
+        if query.sort is None:
+            return pages, None, len(pages)
+        
+        index = build_sorted_index(pages, query.sort, self.SORTABLE_FIELDS[query.sort])
+        return paginate_index(index, query)
     
-    def delete_page(self, page_id: str) -> bool:
-        """Delete page"""
-        return self.db_manager.delete_item(self.filename, page_id)
+    def get_changes(self, since: int) -> Tuple[List[dict], List[str], int, bool]:
+        """Pages changed and ids deleted after a change sequence number"""
+        return self.db_manager.get_changes(self.filename, since)
     
     def get_pages_by_category(self, category: str) -> List[dict]:
         """Get pages by category"""
@@ -99,93 +348,171 @@ class PageRepository:
         for page in pages:
             # Search in title
             if query_lower in page.get('title', '').lower():
-                results.append(page)
+                results.append(self.with_content(page))
                 continue
             
-            # Search in content
-            if query_lower in page.get('content', '').lower():
-                results.append(page)
-                continue
-            
-            # Search in tags
+            # Search in tags (cheap, before loading the body)
             tags = page.get('tags', [])
             if any(query_lower in tag.lower() for tag in tags):
+                results.append(self.with_content(page))
+                continue
+            
+            # Search in content
+            page = self.with_content(page)
+            if query_lower in page['content'].lower():
                 results.append(page)
                 continue
         
         return results
     
+    def list_recent_pages(
+        self,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """List pages by last update, newest first, with cursor and date range"""
+        pages, next_entry = self.indexes.get('recent').page(
+            limit, decode_cursor(cursor, 'recent'), start=since, end=until
+        )
+        return pages, encode_cursor(next_entry, 'recent')
+    
     def get_recent_pages(self, limit: int = 10) -> List[dict]:
         """Get recent pages"""
-        pages = self.load_pages()
-        sorted_pages = sorted(
-            pages, 
-            key=lambda x: x.get('updated_at', ''), 
-            reverse=True
+        return self.list_recent_pages(limit)[0]
+    
+    def list_popular_pages(
+        self,
+        limit: int = 10,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """List pages by views, most popular first, with cursor"""
+        pages, next_entry = self.indexes.get('popular').page(
+            limit, decode_cursor(cursor, 'popular')
         )
-        return sorted_pages[:limit]
+        return pages, encode_cursor(next_entry, 'popular')
     
     def get_popular_pages(self, limit: int = 10) -> List[dict]:
         """Get popular pages by views"""
-        pages = self.load_pages()
-        sorted_pages = sorted(
-            pages, 
-            key=lambda x: x.get('views', 0), 
-            reverse=True
-        )
-        return sorted_pages[:limit]
+        return self.list_popular_pages(limit)[0]
+    
+    def get_trending_pages(self, limit: int = 10) -> List[dict]:
+        """Get trending pages by time-decayed views"""
+        half_life = self.db_manager.config.TRENDING_HALF_LIFE_HOURS
+        now = time.time()
+        return [
+            {
+                **page,
+                'trending': round(
+                    trending_value(page.get('trending_score'), half_life, now), 4
+                )
+            }
+            for page in self.indexes.get('trending').top(limit)
+        ]
     
     def increment_views(self, page_id: str) -> bool:
-        """Increment page views"""
-        pages = self.load_pages()
-        
-        for page in pages:
-            if page.get('id') == page_id:
-                current_views = page.get('views', 0)
-                page['views'] = current_views + 1
-                return self.save_pages(pages)
-        
-        return False
+        """Increment page views and its trending score"""
+        with self.db_manager.lock(self.filename):
+            before = self.indexes.signature()
+            pages = self.load_pages()
+            
+            for page in pages:
+                if page.get('id') == page_id:
+                    current_views = page.get('views', 0)
+                    page['views'] = current_views + 1
+                    page['trending_score'] = trending_bump(
+                        page.get('trending_score'),
+                        self.db_manager.config.TRENDING_HALF_LIFE_HOURS
+                    )
+                    if self.save_pages(pages):
+                        self.indexes.apply(before, upserts=[page])
+                        return True
+                    return False
+            
+            return False
     
     def create_page_version(self, page_id: str, version_data: dict) -> bool:
         """Create a new version of a page"""
-        pages = self.load_pages()
-        
-        for page in pages:
-            if page.get('id') == page_id:
-                # Store current version in versions array
-                if 'versions' not in page:
-                    page['versions'] = []
-                
-                current_version = {
-                    'version': page.get('version', 1),
-                    'content': page.get('content', ''),
-                    'title': page.get('title', ''),
-                    'created_at': page.get('updated_at', ''),
-                    'author_id': page.get('author_id', '')
-                }
-                
-                page['versions'].append(current_version)
-                
-                # Update with new version
-                page.update(version_data)
-                page['version'] = current_version['version'] + 1
-                page['updated_at'] = datetime.now().isoformat()
-                
-                return self.save_pages(pages)
-        
-        return False
+        with self.db_manager.lock(self.filename):
+            before = self.indexes.signature()
+            pages = self.load_pages()
+            
+            for page in pages:
+                if page.get('id') == page_id:
+                    # Store current version in versions array
+                    if 'versions' not in page:
+                        page['versions'] = []
+                    
+                    current_version = self._snapshot(page)
+                    
+                    page['versions'].append(current_version)
+                    
+                    # Update with new version
+                    page.update(version_data)
+                    page['version'] = current_version['version'] + 1
+                    page['updated_at'] = datetime.now().isoformat()
+                    
+                    if self.save_pages(pages):
+                        self.indexes.apply(before, upserts=[page])
+                        self._update_links(page, version_data.get('content'))
+                        return True
+                    return False
+            
+            return False
+    
+    def _snapshot(self, page: dict) -> dict:
+        """Version record holding the current state of a page"""
+        return {
+            'version': page.get('version', 1),
+            'content': self.load_content(page),
+            'title': page.get('title', ''),
+            'created_at': page.get('updated_at', ''),
+            'author_id': page.get('author_id', '')
+        }
     
     def get_page_versions(self, page_id: str) -> List[dict]:
-        """Get all versions of a page"""
-        page = self.get_page_by_id(page_id)
+        """Get metadata of all stored versions of a page"""
+        page = self.get_page_metadata(page_id)
         if page and 'versions' in page:
-            return page['versions']
+            return [
+                {key: value for key, value in version.items() if key != 'content'}
+                for version in page['versions']
+            ]
         return []
     
+    def get_page_version(self, page_id: str, version: int) -> Optional[dict]:
+        """Get metadata of one version of a page, the current one included"""
+        page = self.get_page_metadata(page_id)
+        if not page:
+            return None
+        
+        if page.get('version', 1) == version:
+            return {
+                'version': version,
+                'title': page.get('title', ''),
+                'created_at': page.get('updated_at', ''),
+                'author_id': page.get('author_id', ''),
+                'content_hash': page.get('content_hash'),
+                'content_length': page.get('content_length'),
+                'current': True,
+                **({'content': page['content']} if 'content' in page else {})
+            }
+        
+        return next(
+            (v for v in page.get('versions', []) if v.get('version') == version),
+            None
+        )
+    
+    def load_page_version_content(self, page_id: str, version: dict) -> str:
+        """Load the body of a record returned by ``get_page_version``"""
+        if version.get('current'):
+            return self.load_content({'id': page_id, **version})
+        return self.load_version_content(page_id, version)
+    
     def restore_page_version(self, page_id: str, version: int) -> bool:
         """Restore a specific version of a page"""
-        page = self.get_page_by_id(page_id)
+        page = self.get_page_metadata(page_id)
         if not page or 'versions' not in page:
             return False
         
@@ -194,7 +521,7 @@ class PageRepository:
             if version_data.get('version') == version:
                 # Create new version with restored content
                 return self.create_page_version(page_id, {
-                    'content': version_data.get('content', ''),
+                    'content': self.load_version_content(page_id, version_data),
                     'title': version_data.get('title', ''),
                     'author_id': page.get('author_id', '')
                 })
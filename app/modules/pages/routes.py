@@ -9,6 +9,10 @@ from flask_login import current_user, login_required
 from app.core.database import DatabaseManager
 from app.core.config import config
 from app.modules.pages.services.page_service import PageService
+from app.shared.decorators import conditional_get
+from app.shared.exceptions import VersionConflictError
+from app.shared.listing import ListingQuery, parse_id_list
+from app.shared.utils import parse_expected_version, parse_iso_bound
 
 # Initialize services
 db_manager = DatabaseManager(config['default']())
@@ -19,15 +23,24 @@ pages_bp = Blueprint("pages", __name__)
 
 @pages_bp.route("/", methods=["GET"])
 @login_required
+@conditional_get(db_manager, "pages.json")
 def get_pages():
-    """Get all pages"""
+    """Get all pages (supports fields, sort, limit and cursor)"""
     try:
-        pages = page_service.get_all_pages()
+        query = ListingQuery.from_args(request.args)
+        pages, next_cursor, total = page_service.list_pages(query)
         return jsonify({
             "success": True,
             "data": pages,
-            "count": len(pages)
+            "count": len(pages),
+            "total": total,
+            "next_cursor": next_cursor
         })
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Parâmetro inválido: {str(e)}"
+        }), 400
     except Exception as e:
         return jsonify({
             "success": False,
@@ -134,10 +147,14 @@ def update_page(page_id):
                 "message": "Dados de atualização são obrigatórios"
             }), 400
         
+        expected_version = parse_expected_version(
+            request.headers.get("If-Match"), updates
+        )
         success, message = page_service.update_page(
             page_id, 
             updates, 
-            current_user.id
+            current_user.id,
+            expected_version
         )
         
         if success:
@@ -151,6 +168,74 @@ def update_page(page_id):
                 "message": message
             }), 400 if "não encontrada" in message else 403
             
+    except VersionConflictError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e),
+            "current_version": e.current_version
+        }), 409
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Parâmetro inválido: {str(e)}"
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
+@pages_bp.route("/<page_id>", methods=["PATCH"])
+@login_required
+def patch_page(page_id):
+    """Partially update page (JSON Patch and/or content delta)"""
+    try:
+        patch = request.get_json(force=True, silent=True)
+        
+        if not patch:
+            return jsonify({
+                "success": False,
+                "message": "Dados de atualização são obrigatórios"
+            }), 400
+        
+        expected_version = parse_expected_version(
+            request.headers.get("If-Match"), patch
+        )
+        success, message = page_service.patch_page(
+            page_id,
+            patch,
+            current_user.id,
+            expected_version
+        )
+        
+        if success:
+            return jsonify({
+                "success": True,
+                "message": message
+            })
+        elif "não encontrada" in message:
+            status = 404
+        elif "Sem permissão" in message:
+            status = 403
+        else:
+            status = 400
+        return jsonify({
+            "success": False,
+            "message": message
+        }), status
+            
+    except VersionConflictError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e),
+            "current_version": e.current_version
+        }), 409
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Parâmetro inválido: {str(e)}"
+        }), 400
     except Exception as e:
         return jsonify({
             "success": False,
@@ -218,17 +303,25 @@ def search_pages():
 @pages_bp.route("/category/<category>", methods=["GET"])
 @login_required
 def get_pages_by_category(category):
-    """Get pages by category"""
+    """Get pages by category (supports fields, sort, limit and cursor)"""
     try:
-        pages = page_service.get_pages_by_category(category)
+        query = ListingQuery.from_args(request.args)
+        pages, next_cursor, total = page_service.list_pages(query, category=category)
         
         return jsonify({
             "success": True,
             "data": pages,
             "count": len(pages),
+            "total": total,
+            "next_cursor": next_cursor,
             "category": category
         })
         
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Parâmetro inválido: {str(e)}"
+        }), 400
     except Exception as e:
         return jsonify({
             "success": False,
@@ -239,17 +332,81 @@ def get_pages_by_category(category):
 @pages_bp.route("/author/<author_id>", methods=["GET"])
 @login_required
 def get_pages_by_author(author_id):
-    """Get pages by author"""
+    """Get pages by author (supports fields, sort, limit and cursor)"""
     try:
-        pages = page_service.get_pages_by_author(author_id)
+        query = ListingQuery.from_args(request.args)
+        pages, next_cursor, total = page_service.list_pages(query, author_id=author_id)
         
         return jsonify({
             "success": True,
             "data": pages,
             "count": len(pages),
+            "total": total,
+            "next_cursor": next_cursor,
             "author_id": author_id
         })
         
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Parâmetro inválido: {str(e)}"
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
+@pages_bp.route("/changes", methods=["GET"])
+@login_required
+@conditional_get(db_manager, "pages.json")
+def get_pages_changes():
+    """Pages created, updated or deleted since a change sequence (delta sync)"""
+    try:
+        since = int(request.args.get("since", 0))
+        fields = ListingQuery.from_args(request.args).fields
+        changes = page_service.get_changes(since, fields)
+        
+        return jsonify({
+            "success": True,
+            **changes,
+            "count": len(changes["data"])
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Parâmetro inválido: {str(e)}"
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
+@pages_bp.route("/batch", methods=["GET"])
+@login_required
+@conditional_get(db_manager, "pages.json")
+def get_pages_batch():
+    """Get several pages by id in one request"""
+    try:
+        ids = parse_id_list(request.args.get("ids"))
+        fields = ListingQuery.from_args(request.args).fields
+        result = page_service.get_pages_batch(ids, fields)
+        
+        return jsonify({
+            "success": True,
+            **result,
+            "count": len(result["data"])
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Parâmetro inválido: {str(e)}"
+        }), 400
     except Exception as e:
         return jsonify({
             "success": False,
@@ -263,14 +420,27 @@ def get_recent_pages():
     """Get recent pages"""
     try:
         limit = int(request.args.get("limit", 10))
-        pages = page_service.get_recent_pages(limit)
+        since = parse_iso_bound(request.args.get("since"))
+        until = parse_iso_bound(request.args.get("until"), end=True)
+        pages, next_cursor = page_service.list_recent_pages(
+            limit,
+            request.args.get("cursor"),
+            since,
+            until
+        )
         
         return jsonify({
             "success": True,
             "data": pages,
-            "count": len(pages)
+            "count": len(pages),
+            "next_cursor": next_cursor
         })
         
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Parâmetro inválido: {str(e)}"
+        }), 400
     except Exception as e:
         return jsonify({
             "success": False,
@@ -284,7 +454,37 @@ def get_popular_pages():
     """Get popular pages"""
     try:
         limit = int(request.args.get("limit", 10))
-        pages = page_service.get_popular_pages(limit)
+        pages, next_cursor = page_service.list_popular_pages(
+            limit,
+            request.args.get("cursor")
+        )
+        
+        return jsonify({
+            "success": True,
+            "data": pages,
+            "count": len(pages),
+            "next_cursor": next_cursor
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Parâmetro inválido: {str(e)}"
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
+@pages_bp.route("/trending", methods=["GET"])
+@login_required
+def get_trending_pages():
+    """Get trending pages"""
+    try:
+        limit = int(request.args.get("limit", 10))
+        pages = page_service.get_trending_pages(limit)
         
         return jsonify({
             "success": True,
@@ -299,6 +499,83 @@ def get_popular_pages():
         }), 500
 
 
+@pages_bp.route("/<page_id>/html", methods=["GET"])
+@login_required
+def get_page_html(page_id):
+    """Get page content rendered as sanitized HTML"""
+    try:
+        rendered = page_service.get_page_html(page_id)
+        
+        if rendered:
+            return jsonify({
+                "success": True,
+                "data": rendered
+            })
+        else:
+            return jsonify({
+                "success": False,
+                "message": "Página não encontrada"
+            }), 404
+            
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
+@pages_bp.route("/<page_id>/outline", methods=["GET"])
+@login_required
+def get_page_outline(page_id):
+    """Get page outline, word count, reading time and links"""
+    try:
+        outline = page_service.get_page_outline(page_id)
+        
+        if outline:
+            return jsonify({
+                "success": True,
+                "data": outline
+            })
+        else:
+            return jsonify({
+                "success": False,
+                "message": "Página não encontrada"
+            }), 404
+            
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
+@pages_bp.route("/<page_id>/backlinks", methods=["GET"])
+@login_required
+def get_page_backlinks(page_id):
+    """Get pages linking to a page"""
+    try:
+        backlinks = page_service.get_page_backlinks(page_id)
+        
+        if backlinks is None:
+            return jsonify({
+                "success": False,
+                "message": "Página não encontrada"
+            }), 404
+        
+        return jsonify({
+            "success": True,
+            "data": backlinks,
+            "count": len(backlinks),
+            "page_id": page_id
+        })
+        
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
 @pages_bp.route("/<page_id>/versions", methods=["GET"])
 @login_required
 def get_page_versions(page_id):
@@ -320,6 +597,31 @@ def get_page_versions(page_id):
         }), 500
 
 
+@pages_bp.route("/<page_id>/versions/<int:old>/diff/<int:new>", methods=["GET"])
+@login_required
+def diff_page_versions(page_id, old, new):
+    """Get line and word level diff hunks between two page versions"""
+    try:
+        diff = page_service.diff_page_versions(page_id, old, new)
+        
+        if diff:
+            return jsonify({
+                "success": True,
+                "data": diff
+            })
+        else:
+            return jsonify({
+                "success": False,
+                "message": "Versão não encontrada"
+            }), 404
+            
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Erro interno: {str(e)}"
+        }), 500
+
+
 @pages_bp.route("/<page_id>/versions/<int:version>/restore", methods=["POST"])
 @login_required
 def restore_page_version(page_id, version):
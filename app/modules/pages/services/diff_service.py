@@ -0,0 +1,170 @@
+"""
+Version diff service for Wiki Veloz
+CDD v2.0 - Line and word level diffs between page versions
+"""
+
+import difflib
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Sequence, Tuple
+
+DIFF_CONTEXT_LINES = 3
+DIFF_CACHE_SIZE = 128
+# SequenceMatcher is quadratic in the worst case: changed regions whose
+# old x new size exceeds this are shown as one block replaced by another
+DIFF_MAX_CELLS = 4_000_000
+
+_TOKEN = re.compile(r"\s+|\w+|[^\w\s]", re.UNICODE)
+
+Opcode = Tuple[str, int, int, int, int]
+
+
+def _opcodes(old: Sequence, new: Sequence, autojunk: bool = True) -> List[Opcode]:
+    """SequenceMatcher opcodes, bounded by DIFF_MAX_CELLS.
+
+    Common leading and trailing items are matched first in linear time;
+    only the region between them goes through SequenceMatcher, or becomes
+    a single replace when it is too large.
+    """
+    prefix = 0
+    limit = min(len(old), len(new))
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    old_end, new_end = len(old) - suffix, len(new) - suffix
+
+    codes: List[Opcode] = []
+    if prefix:
+        codes.append(("equal", 0, prefix, 0, prefix))
+    if (old_end - prefix) * (new_end - prefix) > DIFF_MAX_CELLS:
+        codes.append(("replace", prefix, old_end, prefix, new_end))
+    elif old_end > prefix or new_end > prefix:
+        matcher = difflib.SequenceMatcher(
+            None, old[prefix:old_end], new[prefix:new_end], autojunk=autojunk
+        )
+        codes.extend(
+            (tag, i1 + prefix, i2 + prefix, j1 + prefix, j2 + prefix)
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        )
+    if suffix:
+        codes.append(("equal", old_end, len(old), new_end, len(new)))
+    return codes
+
+
+def _grouped_opcodes(codes: List[Opcode], context: int) -> List[List[Opcode]]:
+    """Hunks of opcodes with ``context`` lines around each change, as difflib groups"""
+    if not codes:
+        codes = [("equal", 0, 1, 0, 1)]
+    codes = list(codes)
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)
+
+    groups = []
+    group: List[Opcode] = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == "equal" and i2 - i1 > context * 2:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            groups.append(group)
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        groups.append(group)
+    return groups
+
+
+def diff_words(old: str, new: str) -> List[dict]:
+    """Word level segments (equal/delete/insert) between two text blocks"""
+    old_tokens = _TOKEN.findall(old)
+    new_tokens = _TOKEN.findall(new)
+
+    segments: List[dict] = []
+    for tag, i1, i2, j1, j2 in _opcodes(old_tokens, new_tokens, autojunk=False):
+        if tag == "equal":
+            segments.append({"type": "equal", "text": "".join(old_tokens[i1:i2])})
+            continue
+        if i2 > i1:
+            segments.append({"type": "delete", "text": "".join(old_tokens[i1:i2])})
+        if j2 > j1:
+            segments.append({"type": "insert", "text": "".join(new_tokens[j1:j2])})
+    return segments
+
+
+def diff_texts(old: str, new: str, context: int = DIFF_CONTEXT_LINES) -> dict:
+    """Unified-style hunks between two texts, with word diffs for changed lines"""
+    old_lines = old.splitlines()
+    new_lines = new.splitlines()
+
+    hunks = []
+    additions = deletions = 0
+    for group in _grouped_opcodes(_opcodes(old_lines, new_lines), context):
+        lines = []
+        words = []
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                lines.extend(
+                    {"type": "context", "text": line} for line in old_lines[i1:i2]
+                )
+                continue
+            lines.extend({"type": "delete", "text": line} for line in old_lines[i1:i2])
+            lines.extend({"type": "insert", "text": line} for line in new_lines[j1:j2])
+            deletions += i2 - i1
+            additions += j2 - j1
+            if tag == "replace":
+                words.append(
+                    {
+                        "old_start": i1 + 1,
+                        "new_start": j1 + 1,
+                        "segments": diff_words(
+                            "\n".join(old_lines[i1:i2]), "\n".join(new_lines[j1:j2])
+                        ),
+                    }
+                )
+
+        first, last = group[0], group[-1]
+        hunks.append(
+            {
+                "old_start": first[1] + 1,
+                "old_lines": last[2] - first[1],
+                "new_start": first[3] + 1,
+                "new_lines": last[4] - first[3],
+                "lines": lines,
+                "words": words,
+            }
+        )
+
+    return {"hunks": hunks, "additions": additions, "deletions": deletions}
+
+
+class DiffService:
+    """Diffs between page versions, cached by version pair and content hashes"""
+
+    def __init__(self, cache_size: int = DIFF_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def diff(self, key: Tuple, load_texts: Callable[[], Tuple[str, str]]) -> dict:
+        """Return the cached diff for key; texts are only loaded on a miss"""
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        result = diff_texts(*load_texts())
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+
+diff_service = DiffService()
@@ -0,0 +1,96 @@
+"""
+Page metadata extraction for Wiki Veloz
+CDD v2.0 - Outline, word count and links computed once per saved body
+"""
+
+import math
+import re
+from typing import Dict, List
+
+from markdown.extensions.toc import slugify as toc_slugify
+from slugify import slugify
+
+WORDS_PER_MINUTE = 200
+
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_LINK = re.compile(r"(!?)\[([^\]]*)\]\(\s*<?([^)\s>]+)>?(?:\s+\"[^\"]*\")?\s*\)")
+_WIKI_LINK = re.compile(r"\[\[([^\]|]+)(?:\|([^\]]*))?\]\]")
+_SCHEME = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.\-]*:")
+_WORD = re.compile(r"\w+(?:['’-]\w+)*")
+_INLINE_MARKUP = re.compile(r"[*_`~]+")
+
+
+def heading_anchor(text: str, seen: Dict[str, int]) -> str:
+    """Anchor id for a heading, matching the ids of the rendered HTML"""
+    anchor = toc_slugify(text, "-")
+    if anchor in seen:
+        seen[anchor] += 1
+        anchor = f"{anchor}_{seen[anchor]}"
+    else:
+        seen[anchor] = 0
+    return anchor
+
+
+def link_target(url: str) -> str:
+    """Slug a relative wiki URL points at (its last path segment)"""
+    path = url.split("#", 1)[0].split("?", 1)[0].rstrip("/")
+    segment = path.rsplit("/", 1)[-1]
+    if segment.endswith(".md"):
+        segment = segment[:-3]
+    return segment
+
+
+def extract_page_meta(content: str) -> dict:
+    """Extract outline, word count, reading time and links from markdown"""
+    outline: List[dict] = []
+    internal: List[str] = []
+    external: List[str] = []
+    anchors: Dict[str, int] = {}
+    text_lines: List[str] = []
+    in_fence = False
+
+    for line in content.splitlines():
+        if _FENCE.match(line):
+            in_fence = not in_fence
+            continue
+        if in_fence:
+            text_lines.append(line)
+            continue
+
+        heading = _HEADING.match(line)
+        if heading:
+            text = _INLINE_MARKUP.sub("", heading.group(2)).strip()
+            outline.append(
+                {
+                    "level": len(heading.group(1)),
+                    "text": text,
+                    "anchor": heading_anchor(text, anchors),
+                }
+            )
+
+        for is_image, _, url in _LINK.findall(line):
+            if is_image or url.startswith("#"):
+                continue
+            if _SCHEME.match(url):
+                if url not in external:
+                    external.append(url)
+            else:
+                target = link_target(url)
+                if target and target not in internal:
+                    internal.append(target)
+
+        for target, _ in _WIKI_LINK.findall(line):
+            target = slugify(target)
+            if target and target not in internal:
+                internal.append(target)
+
+        text_lines.append(_WIKI_LINK.sub(r"\1", _LINK.sub(r"\2", line)))
+
+    word_count = len(_WORD.findall("\n".join(text_lines)))
+    return {
+        "outline": outline,
+        "word_count": word_count,
+        "reading_time": math.ceil(word_count / WORDS_PER_MINUTE),
+        "links": {"internal": internal, "external": external},
+    }
@@ -7,6 +7,13 @@ from typing import List, Optional, Tuple
 
 from app.core.database import ActivityLogger, DatabaseManager
 from app.modules.pages.repositories.page_repository import PageRepository
+from app.core.content_store import content_hash
+from app.modules.pages.services.diff_service import diff_service
+from app.modules.pages.services.page_meta import extract_page_meta
+from app.modules.pages.services.render_service import get_render_service
+from app.shared.exceptions import ValidationError, VersionConflictError
+from app.shared.listing import ListingQuery, project
+from app.shared.patching import build_patch_updates
 
 
 class PageService:
@@ -16,6 +23,7 @@ class PageService:
         self.db_manager = db_manager
         self.page_repository = PageRepository(db_manager)
         self.activity_logger = ActivityLogger(db_manager)
+        self.render_service = get_render_service(db_manager)
     
     def get_all_pages(self) -> List[dict]:
         """Get all pages"""
@@ -46,11 +54,14 @@ class PageService:
         
         # Add author information
         page_data['author_id'] = author_id
+        content = page_data.get('content', '')
         
         # Create page
         success = self.page_repository.create_page(page_data)
         
         if success:
+            self.refresh_page_meta(page_data['id'], content)
+            self.render_service.render_async(content)
             # Log activity
             self.activity_logger.log_activity(
                 author_id,
@@ -61,16 +72,21 @@ class PageService:
         else:
             return False, "Erro ao criar página"
     
-    def update_page(self, page_id: str, updates: dict, user_id: str) -> Tuple[bool, str]:
-        """Update page"""
+    def update_page(
+        self,
+        page_id: str,
+        updates: dict,
+        user_id: str,
+        expected_version: Optional[int] = None
+    ) -> Tuple[bool, str]:
+        """Update page (raises VersionConflictError if expected_version is stale)"""
         # Check if page exists
         page = self.page_repository.get_page_by_id(page_id)
         if not page:
             return False, "Página não encontrada"
         
         # Check permissions (only author or admin can edit)
-        if page.get('author_id') != user_id:
-            # TODO: Check if user is admin
+        if not self._can_modify(page, user_id):
             return False, "Sem permissão para editar esta página"
         
         # Validate updates
@@ -78,17 +94,15 @@ class PageService:
         if not is_valid:
             return False, message
         
-        # Create version before updating
-        self.page_repository.create_page_version(page_id, {
-            'content': page.get('content', ''),
-            'title': page.get('title', ''),
-            'author_id': user_id
-        })
-        
-        # Update page
-        success = self.page_repository.update_page(page_id, updates)
+        # Keep the current state as a version and update in one write
+        success = self.page_repository.update_page(
+            page_id, updates, expected_version=expected_version, snapshot=True
+        )
         
         if success:
+            if 'content' in updates:
+                self.refresh_page_meta(page_id, updates['content'])
+                self.render_service.render_async(updates['content'])
             # Log activity
             self.activity_logger.log_activity(
                 user_id,
@@ -99,6 +113,70 @@ class PageService:
         else:
             return False, "Erro ao atualizar página"
     
+    def patch_page(
+        self,
+        page_id: str,
+        patch: object,
+        user_id: str,
+        expected_version: Optional[int] = None
+    ) -> Tuple[bool, str]:
+        """Apply a JSON Patch and/or content delta, writing only changed fields"""
+        page = self.page_repository.get_page_by_id(page_id)
+        if not page:
+            return False, "Página não encontrada"
+        
+        # Check permissions (only author or admin can edit)
+        if not self._can_modify(page, user_id):
+            return False, "Sem permissão para editar esta página"
+        
+        if expected_version is None and isinstance(patch, dict):
+            expected_version = patch.get('base_version')
+        if expected_version is not None and expected_version != page.get('version', 1):
+            raise VersionConflictError(page.get('version', 1))
+        # The patch is applied to the version read above; without a client
+        # precondition, the write must still fail if another one landed since
+        if expected_version is None:
+            expected_version = page.get('version', 1)
+        
+        try:
+            updates, removals = build_patch_updates(
+                page, patch, self.page_repository.READONLY_FIELDS
+            )
+        except ValidationError as e:
+            return False, str(e)
+        
+        if not updates and not removals:
+            return True, "Nenhuma alteração"
+        
+        is_valid, message = self.validate_page_updates(
+            {**dict.fromkeys(removals), **updates}
+        )
+        if not is_valid:
+            return False, message
+        
+        # Only edits to the body or title are worth a version snapshot
+        success = self.page_repository.update_page(
+            page_id,
+            updates,
+            expected_version=expected_version,
+            snapshot='content' in updates or 'title' in updates,
+            removals=removals
+        )
+        
+        if success:
+            if 'content' in updates:
+                self.refresh_page_meta(page_id, updates['content'])
+                self.render_service.render_async(updates['content'])
+            self.activity_logger.log_activity(
+                user_id,
+                'page_updated',
+                f'Página atualizada: '
+                f'{updates.get("title", page.get("title", "Unknown"))}',
+            )
+            return True, "Página atualizada com sucesso"
+        else:
+            return False, "Erro ao atualizar página"
+    
     def delete_page(self, page_id: str, user_id: str) -> Tuple[bool, str]:
         """Delete page"""
         # Check if page exists
@@ -107,8 +185,7 @@ class PageService:
             return False, "Página não encontrada"
         
         # Check permissions (only author or admin can delete)
-        if page.get('author_id') != user_id:
-            # TODO: Check if user is admin
+        if not self._can_modify(page, user_id):
             return False, "Sem permissão para deletar esta página"
         
         # Delete page
@@ -125,10 +202,101 @@ class PageService:
         else:
             return False, "Erro ao deletar página"
     
+    def get_page_html(self, page_id: str) -> Optional[dict]:
+        """Get rendered HTML of a page (the body is only loaded on a cache miss)"""
+        page = self.page_repository.get_page_metadata(page_id)
+        if not page:
+            return None
+        
+        digest = page.get('content_hash')
+        html = self.render_service.get_cached(digest) if digest else None
+        if html is None:
+            html = self.render_service.render(self.page_repository.load_content(page))
+        
+        return {
+            'id': page['id'],
+            'version': page.get('version', 1),
+            'content_hash': digest,
+            'html': html
+        }
+    
+    def refresh_page_meta(self, page_id: str, content: str) -> dict:
+        """Extract and store outline, word count and links for a page body"""
+        meta = {'content_hash': content_hash(content), **extract_page_meta(content)}
+        self.page_repository.save_page_meta(page_id, meta)
+        return meta
+    
+    def get_page_outline(self, page_id: str) -> Optional[dict]:
+        """Get outline, reading time and links without loading the body"""
+        page = self.page_repository.get_page_metadata(page_id)
+        if not page:
+            return None
+        
+        current_hash = page.get('content_hash')
+        if 'content' in page:
+            # Not migrated to the content store yet
+            current_hash = content_hash(page['content'])
+        
+        meta = self.page_repository.get_page_meta(page_id)
+        if meta is None or meta.get('content_hash') != current_hash:
+            # Missing or written for another body (legacy data, restores)
+            meta = self.refresh_page_meta(
+                page_id, self.page_repository.load_content(page)
+            )
+        
+        return {'id': page_id, **meta}
+    
+    def get_page_backlinks(self, page_id: str) -> Optional[List[dict]]:
+        """Get pages linking to a page"""
+        if not self.page_repository.get_page_metadata(page_id):
+            return None
+        return self.page_repository.get_backlinks(page_id)
+    
     def search_pages(self, query: str) -> List[dict]:
         """Search pages"""
         return self.page_repository.search_pages(query)
     
+    def list_pages(
+        self,
+        query: ListingQuery,
+        **filters
+    ) -> Tuple[List[dict], Optional[str], int]:
+        """List pages with sparse fieldsets, sorting and cursor pagination"""
+        pages, next_cursor, total = self.page_repository.query_pages(query, **filters)
+        if query.wants('content'):
+            pages = [self.page_repository.with_content(page) for page in pages]
+        return [project(page, query.fields) for page in pages], next_cursor, total
+    
+    def get_changes(self, since: int, fields: Optional[List[str]] = None) -> dict:
+        """Pages created, updated or deleted after a change sequence number"""
+        pages, deleted, seq, reset = self.page_repository.get_changes(since)
+        if fields is None or 'content' in fields:
+            pages = [self.page_repository.with_content(page) for page in pages]
+        return {
+            'data': [project(page, fields) for page in pages],
+            'deleted': deleted,
+            'seq': seq,
+            'reset': reset
+        }
+    
+    def get_pages_batch(
+        self, page_ids: List[str], fields: Optional[List[str]] = None
+    ) -> dict:
+        """Resolve several pages at once; ids that do not exist are listed as missing"""
+        found = self.page_repository.get_pages_by_ids(page_ids)
+        load_content = fields is None or 'content' in fields
+        data = {}
+        for page_id in page_ids:
+            page = found.get(page_id)
+            if page is not None:
+                if load_content:
+                    page = self.page_repository.with_content(page)
+                data[page_id] = project(page, fields)
+        return {
+            'data': data,
+            'missing': [page_id for page_id in page_ids if page_id not in found]
+        }
+    
     def get_pages_by_category(self, category: str) -> List[dict]:
         """Get pages by category"""
         return self.page_repository.get_pages_by_category(category)
@@ -137,6 +305,24 @@ class PageService:
         """Get pages by author"""
         return self.page_repository.get_pages_by_author(author_id)
     
+    def list_recent_pages(
+        self,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """List recent pages with cursor pagination and date range"""
+        return self.page_repository.list_recent_pages(limit, cursor, since, until)
+    
+    def list_popular_pages(
+        self,
+        limit: int = 10,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """List popular pages with cursor pagination"""
+        return self.page_repository.list_popular_pages(limit, cursor)
+    
     def get_recent_pages(self, limit: int = 10) -> List[dict]:
         """Get recent pages"""
         return self.page_repository.get_recent_pages(limit)
@@ -145,10 +331,31 @@ class PageService:
         """Get popular pages"""
         return self.page_repository.get_popular_pages(limit)
     
+    def get_trending_pages(self, limit: int = 10) -> List[dict]:
+        """Get trending pages"""
+        return self.page_repository.get_trending_pages(limit)
+    
     def get_page_versions(self, page_id: str) -> List[dict]:
-        """Get page versions"""
+        """Get page versions (metadata only)"""
         return self.page_repository.get_page_versions(page_id)
     
+    def diff_page_versions(self, page_id: str, old: int, new: int) -> Optional[dict]:
+        """Diff two versions of a page; None if either version does not exist"""
+        old_version = self.page_repository.get_page_version(page_id, old)
+        new_version = self.page_repository.get_page_version(page_id, new)
+        if not old_version or not new_version:
+            return None
+        
+        key = (
+            page_id, old, new,
+            old_version.get('content_hash'), new_version.get('content_hash')
+        )
+        diff = diff_service.diff(key, lambda: (
+            self.page_repository.load_page_version_content(page_id, old_version),
+            self.page_repository.load_page_version_content(page_id, new_version)
+        ))
+        return {'page_id': page_id, 'from': old, 'to': new, **diff}
+    
     def restore_page_version(self, page_id: str, version: int, user_id: str) -> Tuple[bool, str]:
         """Restore page version"""
         # Check if page exists
@@ -156,9 +363,8 @@ class PageService:
         if not page:
             return False, "Página não encontrada"
         
-        # Check permissions
-        if page.get('author_id') != user_id:
-            # TODO: Check if user is admin
+        # Check permissions (only author or admin can restore)
+        if not self._can_modify(page, user_id):
             return False, "Sem permissão para restaurar esta página"
         
         # Restore version
@@ -218,12 +424,17 @@ class PageService:
         
         return True, 'Dados válidos'
     
+    def _can_modify(self, page: dict, user_id: str) -> bool:
+        """Author-or-admin check shared by every write path"""
+        from app.modules.auth.services.auth_service import AuthService
+        return AuthService(self.db_manager).can_modify(user_id, page.get('author_id'))
+    
     def validate_page_updates(self, updates: dict) -> Tuple[bool, str]:
         """Validate page updates"""
-        if 'title' in updates and len(updates['title']) < 3:
+        if 'title' in updates and len(updates['title'] or '') < 3:
             return False, 'Título deve ter pelo menos 3 caracteres'
         
-        if 'content' in updates and len(updates['content']) < 10:
+        if 'content' in updates and len(updates['content'] or '') < 10:
             return False, 'Conteúdo deve ter pelo menos 10 caracteres'
         
         return True, 'Dados válidos'
@@ -0,0 +1,111 @@
+"""
+Markdown render service for Wiki Veloz
+CDD v2.0 - Sanitized HTML cached by content hash and renderer version
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+
+import markdown
+
+from app.core.content_store import ContentStore, content_hash
+from app.core.database import DatabaseManager
+from app.shared.sanitizer import sanitize_html
+
+# Bump whenever the extensions or the sanitizer change what HTML comes out,
+# so cached renders from the previous pipeline are no longer used.
+RENDERER_VERSION = "2"
+MARKDOWN_EXTENSIONS = ["extra", "sane_lists", "toc"]
+
+
+def render_markdown(content: str) -> str:
+    """Render markdown to sanitized HTML (no caching)"""
+    return sanitize_html(markdown.markdown(content, extensions=MARKDOWN_EXTENSIONS))
+
+
+class RenderService:
+    """Render cache with an in-process LRU tier and an on-disk tier"""
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+        self.disk_cache = ContentStore(
+            os.path.join(db_manager.data_folder, "render_cache"), suffix=".html.gz"
+        )
+        self.memory_size = db_manager.config.RENDER_CACHE_SIZE
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=db_manager.config.RENDER_WORKERS,
+            thread_name_prefix="markdown-render",
+        )
+
+    def cache_key(self, digest: str) -> str:
+        """Cache key for a content hash under the current renderer"""
+        return f"{digest}.r{RENDERER_VERSION}"
+
+    def get_cached(self, digest: str) -> Optional[str]:
+        """Look up a render by content hash in memory, then on disk"""
+        key = self.cache_key(digest)
+        with self._lock:
+            html = self._memory.get(key)
+            if html is not None:
+                self._memory.move_to_end(key)
+                return html
+
+        html = self.disk_cache.get(key)
+        if html is not None:
+            self._remember(key, html)
+        return html
+
+    def render(self, content: str, digest: Optional[str] = None) -> str:
+        """Return sanitized HTML for content, rendering only on a cache miss"""
+        digest = digest or content_hash(content)
+        html = self.get_cached(digest)
+        if html is None:
+            html = render_markdown(content)
+            key = self.cache_key(digest)
+            self.disk_cache.put(key, html)
+            self._remember(key, html)
+        return html
+
+    def render_async(self, content: str) -> Future:
+        """Warm the cache in the background; concurrent calls share one render"""
+        digest = content_hash(content)
+        with self._lock:
+            future = self._pending.get(digest)
+            if future is not None:
+                return future
+            future = self._executor.submit(self.render, content, digest)
+            self._pending[digest] = future
+        future.add_done_callback(lambda _: self._forget_pending(digest))
+        return future
+
+    def _forget_pending(self, digest: str) -> None:
+        with self._lock:
+            self._pending.pop(digest, None)
+
+    def _remember(self, key: str, html: str) -> None:
+        with self._lock:
+            self._memory[key] = html
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+
+_services: Dict[str, RenderService] = {}
+_services_lock = threading.Lock()
+
+
+def get_render_service(db_manager: DatabaseManager) -> RenderService:
+    """Return the process-wide render service for a data folder"""
+    root = os.path.abspath(db_manager.data_folder)
+    with _services_lock:
+        service = _services.get(root)
+        if service is None:
+            service = RenderService(db_manager)
+            _services[root] = service
+        return service
@@ -5,6 +5,7 @@ Shared utilities and components for Wiki Veloz
 from .decorators import (
     admin_required,
     api_response,
+    conditional_get,
     handle_errors,
     log_activity,
     validate_json,
@@ -19,9 +20,15 @@ from .exceptions import (
     GoogleDriveError,
     NotificationError,
     PDFProcessingError,
+    UnsupportedPreviewError,
     ValidationError,
+    VersionConflictError,
     WikiVelozError,
 )
+from .file_serving import send_stored_file
+from .listing import ListingQuery, parse_id_list, project
+from .sanitizer import sanitize_html
+from .uploads import StoredUpload, stream_upload
 from .utils import (
     allowed_file,
     create_directory_if_not_exists,
@@ -31,6 +38,8 @@ from .utils import (
     generate_unique_filename,
     get_file_extension,
     is_valid_email,
+    parse_expected_version,
+    parse_iso_bound,
     sanitize_filename,
     save_uploaded_file,
 )
@@ -42,6 +51,7 @@ __all__ = [
     "validate_json",
     "log_activity",
     "handle_errors",
+    "conditional_get",
     # Exceptions
     "WikiVelozError",
     "AuthenticationError",
@@ -54,6 +64,19 @@ __all__ = [
     "PDFProcessingError",
     "GoogleDriveError",
     "AnalyticsError",
+    "UnsupportedPreviewError",
+    "VersionConflictError",
+    # File serving
+    "send_stored_file",
+    # Listing
+    "ListingQuery",
+    "project",
+    "parse_id_list",
+    # Sanitizer
+    "sanitize_html",
+    # Uploads
+    "StoredUpload",
+    "stream_upload",
     # Utils
     "allowed_file",
     "generate_unique_filename",
@@ -65,4 +88,6 @@ __all__ = [
     "sanitize_filename",
     "generate_id",
     "is_valid_email",
+    "parse_iso_bound",
+    "parse_expected_version",
 ]
@@ -2,9 +2,12 @@
 Custom decorators for Wiki Veloz
 """
 
+import hashlib
+import time
+from datetime import datetime, timezone
 from functools import wraps
 
-from flask import flash, jsonify, redirect, url_for
+from flask import current_app, flash, jsonify, make_response, redirect, request, url_for
 from flask_login import current_user, login_required
 
 
@@ -136,3 +139,59 @@ def handle_errors(f):
             return jsonify({"error": "Internal server error"}), 500
 
     return decorated_function
+
+
+def conditional_get(db_manager, *filenames, per_user=False, ttl=None):
+    """Decorator answering If-None-Match/If-Modified-Since with 304.
+
+    The validator comes from the (inode, mtime, size) signature of the
+    data files the view reads, so a matching poll costs one stat() per file
+    and the view never runs. ``per_user`` keys the ETag by the current user;
+    ``ttl`` (seconds) rotates it for views that also depend on the clock.
+    Responses are always ``private``: only the browser may store them.
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            signatures = [db_manager.file_signature(name) for name in filenames]
+            parts = [repr(signatures), request.full_path]
+            if per_user:
+                parts.append(str(getattr(current_user, "id", "")))
+            if ttl:
+                parts.append(str(int(time.time() // ttl)))
+            etag = hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+            mtimes = [signature[1] for signature in signatures if signature]
+            last_modified = None
+            if mtimes and not ttl:
+                last_modified = datetime.fromtimestamp(
+                    int(max(mtimes) // 1_000_000_000), tz=timezone.utc
+                )
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                not_modified = (
+                    last_modified is not None
+                    and request.if_modified_since is not None
+                    and last_modified <= request.if_modified_since
+                )
+
+            if not_modified:
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # The routes sit behind login, so shared caches must not keep them
+            response.headers["Cache-Control"] = "private, no-cache"
+            return response
+
+        return decorated_function
+
+    return decorator
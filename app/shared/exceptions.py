@@ -67,3 +67,19 @@ class AnalyticsError(WikiVelozError):
     """Analytics related errors"""
 
     pass
+
+
+class UnsupportedPreviewError(WikiVelozError):
+    """File type that cannot be previewed as rows"""
+
+    pass
+
+
+class VersionConflictError(WikiVelozError):
+    """Write rejected because the record changed since the client read it"""
+
+    def __init__(self, current_version: int, message: str = None):
+        self.current_version = current_version
+        super().__init__(
+            message or f"Conflito de versão: a versão atual é {current_version}"
+        )
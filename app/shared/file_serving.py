@@ -0,0 +1,319 @@
+"""
+File serving helpers for Wiki Veloz
+Range requests, validators and cache headers for stored files
+"""
+
+import mimetypes
+import os
+import uuid
+import zipfile
+from typing import Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from flask import Response, current_app, request, send_file
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from werkzeug.utils import send_file as werkzeug_send_file
+
+from app.core.blob_store import is_digest
+
+# Blobs never change, so a URL pinned to one (``?v=<sha256>``) can be cached for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+MAX_RANGES = 16
+RANGE_READ_SIZE = 64 * 1024
+
+# Formats that are compressed already: deflating them again only costs CPU
+COMPRESSED_EXTENSIONS = frozenset(
+    {
+        "pdf",
+        "docx",
+        "xlsx",
+        "pptx",
+        "odt",
+        "ods",
+        "odp",
+        "jpg",
+        "jpeg",
+        "png",
+        "gif",
+        "webp",
+        "mp3",
+        "mp4",
+        "zip",
+        "gz",
+        "7z",
+        "rar",
+    }
+)
+
+# Values of the FILE_DELIVERY setting
+X_ACCEL_REDIRECT = "x-accel-redirect"  # nginx
+X_SENDFILE = "x-sendfile"  # Apache mod_xsendfile, lighttpd
+
+
+def _satisfiable_ranges(length: int) -> List[Tuple[int, int]]:
+    """(start, stop) byte spans of the request's Range header within length"""
+    spans = []
+    for start, stop in request.range.ranges:
+        if start < 0:
+            start, stop = max(length + start, 0), length
+        else:
+            stop = min(stop if stop is not None else length, length)
+        if start < stop:
+            spans.append((start, stop))
+    return spans
+
+
+def _if_range_matches(etag: str, mtime: float) -> bool:
+    if_range = request.if_range
+    if if_range.etag:
+        return if_range.etag == etag
+    if if_range.date:
+        return int(mtime) <= if_range.date.timestamp()
+    return True
+
+
+def _proxy_location(path: str) -> Optional[Tuple[str, str]]:
+    """(header, value) handing path to the front proxy, or None to send it here"""
+    settings = current_app.config
+    mode = (settings.get("FILE_DELIVERY") or "").lower()
+    path = os.path.abspath(path)
+    if mode == X_SENDFILE:
+        return "X-Sendfile", path
+    if mode == X_ACCEL_REDIRECT:
+        root = os.path.abspath(settings.get("FILE_DELIVERY_ROOT") or ".")
+        if os.path.commonpath([root, path]) != root:
+            return None
+        relative = os.path.relpath(path, root).replace(os.sep, "/")
+        prefix = settings.get("FILE_DELIVERY_PREFIX", "/protected/").rstrip("/")
+        return "X-Accel-Redirect", f"{prefix}/{quote(relative)}"
+    return None
+
+
+def _offload(
+    header: str,
+    location: str,
+    path: str,
+    mimetype: str,
+    download_name: Optional[str],
+    as_attachment: bool,
+    etag: str,
+    mtime: float,
+) -> Response:
+    """Headers-only response; the proxy streams the body and answers ranges"""
+    response = werkzeug_send_file(
+        path,
+        request.environ,
+        mimetype=mimetype,
+        as_attachment=as_attachment,
+        download_name=download_name,
+        conditional=False,
+        etag=etag,
+        last_modified=mtime,
+        use_x_sendfile=True,
+        response_class=current_app.response_class,
+    )
+    del response.headers["X-Sendfile"]
+    del response.headers["Content-Length"]
+    response.headers[header] = location
+    # Validators are still checked here, so a 304 never reaches the disk
+    return response.make_conditional(request.environ)
+
+
+def _not_satisfiable(length: int) -> Response:
+    response = Response(status=416)
+    response.headers["Content-Range"] = f"bytes */{length}"
+    return response
+
+
+def _multipart_ranges(
+    path: str, mimetype: str, spans: List[Tuple[int, int]], length: int
+) -> Response:
+    """206 multipart/byteranges response streamed from disk"""
+    boundary = uuid.uuid4().hex
+    heads = [
+        (
+            f"\r\n--{boundary}\r\nContent-Type: {mimetype}\r\n"
+            f"Content-Range: bytes {start}-{stop - 1}/{length}\r\n\r\n"
+        ).encode("latin-1")
+        for start, stop in spans
+    ]
+    tail = f"\r\n--{boundary}--\r\n".encode("latin-1")
+
+    def generate() -> Iterator[bytes]:
+        with open(path, "rb") as f:
+            for head, (start, stop) in zip(heads, spans):
+                yield head
+                f.seek(start)
+                remaining = stop - start
+                while remaining:
+                    chunk = f.read(min(RANGE_READ_SIZE, remaining))
+                    if not chunk:
+                        return
+                    remaining -= len(chunk)
+                    yield chunk
+            yield tail
+
+    content_length = (
+        sum(len(h) for h in heads) + sum(b - a for a, b in spans) + len(tail)
+    )
+    response = Response(
+        generate(),
+        status=206,
+        mimetype=f"multipart/byteranges; boundary={boundary}",
+        direct_passthrough=True,
+    )
+    response.headers["Content-Length"] = str(content_length)
+    return response
+
+
+def send_stored_file(
+    path: str,
+    mimetype: Optional[str] = None,
+    download_name: Optional[str] = None,
+    as_attachment: bool = False,
+) -> Response:
+    """Send a stored file with Range, ETag and Last-Modified support.
+
+    Blobs (files named by their SHA-256) and files derived from them get
+    their name as a strong ETag; other files an mtime/size tag. Responses
+    always revalidate unless the URL carries ``v=<sha256>`` of the blob,
+    which makes them immutable.
+    Single ranges and 304s are handled by ``send_file``; several ranges in
+    one request get a ``multipart/byteranges`` reply.
+
+    With ``FILE_DELIVERY`` set in the config the body is left to the front
+    proxy (``X-Accel-Redirect`` or ``X-Sendfile``), so the worker is free as
+    soon as the caller's checks pass.
+    """
+    stat = os.stat(path)
+    name = os.path.basename(path)
+    # Blobs and their versioned derivatives ("<sha256>.w640.r1.webp") never change
+    stem = name.split(".", 1)[0]
+    digest = stem if is_digest(stem) else None
+    etag = name if digest else f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+    if mimetype is None:
+        mimetype = (
+            mimetypes.guess_type(download_name or name)[0] or "application/octet-stream"
+        )
+
+    ranges = request.range.ranges if request.range else []
+    proxied = _proxy_location(path)
+    if proxied:
+        response = _offload(
+            *proxied, path, mimetype, download_name, as_attachment, etag, stat.st_mtime
+        )
+    elif 1 < len(ranges) <= MAX_RANGES and _if_range_matches(etag, stat.st_mtime):
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+        spans = _satisfiable_ranges(stat.st_size)
+        if not spans:
+            return _not_satisfiable(stat.st_size)
+        response = _multipart_ranges(path, mimetype, spans, stat.st_size)
+        response.set_etag(etag)
+        response.last_modified = stat.st_mtime
+    else:
+        if len(ranges) > MAX_RANGES:
+            # Too many pieces to be worth it: answer with the whole file
+            request.environ.pop("HTTP_RANGE", None)
+        try:
+            response = send_file(
+                path,
+                mimetype=mimetype,
+                as_attachment=as_attachment,
+                download_name=download_name,
+                conditional=True,
+                etag=etag,
+                last_modified=stat.st_mtime,
+            )
+        except RequestedRangeNotSatisfiable:
+            # Returned rather than raised: callers wrap serving in a catch-all
+            return _not_satisfiable(stat.st_size)
+
+    response.headers["Accept-Ranges"] = "bytes"
+    # Files sit behind login: only the browser may keep a copy
+    response.cache_control.private = True
+    if digest and request.args.get("v") == digest:
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+
+class _ZipSink:
+    """Non-seekable target for ZipFile: written bytes wait here to be yielded"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._offset = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def bundle_names(filenames: Iterable[str]) -> List[str]:
+    """Flat, unique archive member names ("a.pdf", "a (2).pdf", ...)"""
+    names = []
+    taken = set()
+    for filename in filenames:
+        base = os.path.basename((filename or "arquivo").replace("\\", "/")) or "arquivo"
+        stem, extension = os.path.splitext(base)
+        name, counter = base, 1
+        while name.lower() in taken:
+            counter += 1
+            name = f"{stem} ({counter}){extension}"
+        taken.add(name.lower())
+        names.append(name)
+    return names
+
+
+def stream_zip(
+    entries: Iterable[Tuple[str, str]], chunk_size: int = RANGE_READ_SIZE
+) -> Iterator[bytes]:
+    """Yield a ZIP archive of (name, path) entries while it is being built.
+
+    Files are copied chunk by chunk and the archive is never buffered or
+    spooled to disk, so memory stays flat whatever the bundle size. Formats
+    in COMPRESSED_EXTENSIONS are STOREd, the rest deflated. Entries whose
+    file disappeared are skipped.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w") as archive:
+        for name, path in entries:
+            try:
+                info = zipfile.ZipInfo.from_file(path, name, strict_timestamps=False)
+                source = open(path, "rb")
+            except OSError:
+                continue
+            extension = os.path.splitext(name)[1].lstrip(".").lower()
+            if extension in COMPRESSED_EXTENSIONS:
+                info.compress_type = zipfile.ZIP_STORED
+            else:
+                info.compress_type = zipfile.ZIP_DEFLATED
+            with source, archive.open(info, "w") as target:
+                while True:
+                    chunk = source.read(chunk_size)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            yield sink.drain()
+    # Central directory, written when the archive closes
+    yield sink.drain()
@@ -0,0 +1,106 @@
+"""
+Listing helpers for Wiki Veloz
+Sparse fieldsets, sorting and cursor pagination for collection endpoints
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.indexes import SortedIndex, decode_cursor, encode_cursor
+
+MAX_LISTING_LIMIT = 200
+MAX_BATCH_IDS = MAX_LISTING_LIMIT
+
+
+@dataclass
+class ListingQuery:
+    """Parsed ``fields``/``sort``/``limit``/``cursor`` query parameters"""
+
+    fields: Optional[List[str]] = None
+    sort: Optional[str] = None
+    descending: bool = False
+    limit: Optional[int] = None
+    cursor: Optional[str] = None
+
+    @property
+    def paginated(self) -> bool:
+        """Whether the client asked for a page instead of the full list"""
+        return self.limit is not None or self.cursor is not None
+
+    def wants(self, field: str) -> bool:
+        """Whether ``field`` is part of the requested fieldset"""
+        return self.fields is None or field in self.fields
+
+    @classmethod
+    def from_args(cls, args, default_sort: str = "-updated_at") -> "ListingQuery":
+        """Build a query from request args; raises ValueError on bad input.
+
+        ``sort=-field`` sorts descending. When a page is requested without an
+        explicit sort, ``default_sort`` keeps the order stable across cursors.
+        """
+        fields = None
+        if args.get("fields"):
+            fields = [f.strip() for f in args.get("fields").split(",") if f.strip()]
+            if "id" not in fields:
+                fields.insert(0, "id")
+
+        limit = None
+        if args.get("limit"):
+            limit = int(args.get("limit"))
+            if limit < 1:
+                raise ValueError("limit deve ser maior que zero")
+            limit = min(limit, MAX_LISTING_LIMIT)
+
+        query = cls(fields=fields, limit=limit, cursor=args.get("cursor") or None)
+
+        sort = args.get("sort") or (default_sort if query.paginated else None)
+        if sort:
+            query.descending = sort.startswith("-")
+            query.sort = sort.lstrip("-")
+
+        if query.cursor and query.limit is None:
+            query.limit = MAX_LISTING_LIMIT
+        return query
+
+
+def project(record: Dict[str, Any], fields: Optional[Iterable[str]]) -> Dict[str, Any]:
+    """Return only the requested fields of a record (all when ``fields`` is None)"""
+    if fields is None:
+        return record
+    return {field: record[field] for field in fields if field in record}
+
+
+def parse_id_list(raw: Optional[str]) -> List[str]:
+    """Split a comma separated ``ids`` parameter; raises ValueError on bad input.
+
+    Duplicates are dropped keeping the first occurrence, so the response
+    order follows the request.
+    """
+    ids = list(dict.fromkeys(i.strip() for i in (raw or "").split(",") if i.strip()))
+    if not ids:
+        raise ValueError("ids é obrigatório")
+    if len(ids) > MAX_BATCH_IDS:
+        raise ValueError(f"no máximo {MAX_BATCH_IDS} ids por requisição")
+    return ids
+
+
+def build_sorted_index(
+    records: Iterable[dict], field: str, default: Any
+) -> SortedIndex:
+    """Order an ad-hoc set of records by ``field`` for a single listing"""
+    index = SortedIndex(lambda record: record.get(field) or default)
+    index.rebuild(records)
+    return index
+
+
+def paginate_index(
+    index: SortedIndex, query: ListingQuery
+) -> Tuple[List[dict], Optional[str], int]:
+    """Slice one page out of a sorted index; returns (records, next_cursor, total)"""
+    sort = f"-{query.sort}" if query.descending else query.sort
+    records, next_entry = index.page(
+        query.limit or len(index),
+        decode_cursor(query.cursor, sort),
+        descending=query.descending,
+    )
+    return records, encode_cursor(next_entry, sort), len(index)
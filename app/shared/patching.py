@@ -0,0 +1,195 @@
+"""
+Partial update helpers for Wiki Veloz
+RFC 6902 JSON Patch for metadata and compact text deltas for content
+"""
+
+import copy
+from typing import Any, Iterable, List, Optional, Tuple
+
+from .exceptions import ValidationError, VersionConflictError
+
+_MISSING = object()
+
+
+def _parse_pointer(pointer: str) -> List[str]:
+    """Split an RFC 6901 JSON Pointer into unescaped tokens"""
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise ValidationError(f"Caminho JSON Pointer inválido: {pointer}")
+    return [
+        token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")
+    ]
+
+
+def _resolve_parent(document: Any, tokens: List[str]) -> Tuple[Any, str]:
+    """Walk to the container holding the last token"""
+    if not tokens:
+        raise ValidationError("Operação sobre a raiz do documento não é permitida")
+    target = document
+    for token in tokens[:-1]:
+        target = _child(target, token)
+    return target, tokens[-1]
+
+
+def _index(container: list, token: str, allow_end: bool = False) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token.startswith("0")):
+        raise ValidationError(f"Índice de lista inválido: {token}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise ValidationError(f"Índice fora da lista: {token}")
+    return index
+
+
+def _child(container: Any, token: str) -> Any:
+    if isinstance(container, dict):
+        if token not in container:
+            raise ValidationError(f"Caminho inexistente: {token}")
+        return container[token]
+    if isinstance(container, list):
+        return container[_index(container, token)]
+    raise ValidationError(f"Caminho inexistente: {token}")
+
+
+def _get(document: Any, pointer: str) -> Any:
+    target = document
+    for token in _parse_pointer(pointer):
+        target = _child(target, token)
+    return target
+
+
+def _add(document: Any, pointer: str, value: Any) -> None:
+    parent, token = _resolve_parent(document, _parse_pointer(pointer))
+    if isinstance(parent, dict):
+        parent[token] = value
+    elif isinstance(parent, list):
+        parent.insert(_index(parent, token, allow_end=True), value)
+    else:
+        raise ValidationError(f"Caminho inexistente: {pointer}")
+
+
+def _remove(document: Any, pointer: str) -> Any:
+    parent, token = _resolve_parent(document, _parse_pointer(pointer))
+    if isinstance(parent, dict):
+        if token not in parent:
+            raise ValidationError(f"Caminho inexistente: {pointer}")
+        return parent.pop(token)
+    if isinstance(parent, list):
+        return parent.pop(_index(parent, token))
+    raise ValidationError(f"Caminho inexistente: {pointer}")
+
+
+def apply_json_patch(document: dict, operations: Iterable[dict]) -> dict:
+    """Apply RFC 6902 operations to a copy of document; raises ValidationError"""
+    result = copy.deepcopy(document)
+    for operation in operations:
+        if not isinstance(operation, dict):
+            raise ValidationError("Operação de patch inválida")
+        op = operation.get("op")
+        path = operation.get("path")
+        if not isinstance(path, str):
+            raise ValidationError("Operação de patch sem 'path'")
+
+        if op == "add":
+            _add(result, path, copy.deepcopy(operation.get("value")))
+        elif op == "remove":
+            _remove(result, path)
+        elif op == "replace":
+            _remove(result, path)
+            _add(result, path, copy.deepcopy(operation.get("value")))
+        elif op == "move":
+            from_path = operation.get("from", "")
+            if path.startswith(from_path + "/"):
+                raise ValidationError(
+                    "Não é possível mover um valor para dentro dele mesmo"
+                )
+            _add(result, path, _remove(result, from_path))
+        elif op == "copy":
+            _add(result, path, copy.deepcopy(_get(result, operation.get("from", ""))))
+        elif op == "test":
+            if _get(result, path) != operation.get("value"):
+                raise ValidationError(f"Teste de patch falhou em {path}")
+        else:
+            raise ValidationError(f"Operação de patch desconhecida: {op}")
+    return result
+
+
+def apply_text_delta(base: str, delta: Iterable[Any]) -> str:
+    """Apply a compact text delta to base; raises ValidationError.
+
+    A delta is a list walked over ``base`` from the start: a positive int
+    keeps that many characters, a negative int deletes that many, and a
+    string inserts itself. Whatever the delta does not reach is kept.
+    Counts are UTF-16 code units, the unit of ``String.length`` in the
+    browser, so emoji and other astral characters count as two.
+    """
+    units = base.encode("utf-16-le")
+    parts: List[bytes] = []
+    position = 0
+    for step in delta:
+        if isinstance(step, str):
+            parts.append(step.encode("utf-16-le", "surrogatepass"))
+        elif isinstance(step, int) and not isinstance(step, bool) and step != 0:
+            end = position + 2 * abs(step)
+            if end > len(units):
+                raise ValidationError("Delta de texto ultrapassa o conteúdo base")
+            if step > 0:
+                parts.append(units[position:end])
+            position = end
+        else:
+            raise ValidationError(f"Passo de delta inválido: {step!r}")
+    parts.append(units[position:])
+    try:
+        return b"".join(parts).decode("utf-16-le")
+    except UnicodeDecodeError:
+        raise ValidationError("Delta de texto divide um caractere ao meio") from None
+
+
+def build_patch_updates(
+    record: dict,
+    body: Any,
+    readonly_fields: Iterable[str],
+) -> Tuple[dict, List[str]]:
+    """Turn a PATCH body into (fields that change, fields that are removed).
+
+    ``body`` is either a JSON Patch list (metadata only) or an object with
+    ``patch``, and/or ``content_delta`` plus the ``base_version`` the delta
+    was computed against. Raises ValidationError on bad input and
+    VersionConflictError when the base version is not the current one.
+    """
+    if isinstance(body, list):
+        body = {"patch": body}
+    if not isinstance(body, dict):
+        raise ValidationError("Corpo do PATCH inválido")
+
+    readonly = set(readonly_fields) | {"content"}
+    updates = {}
+    removals = []
+
+    operations = body.get("patch") or []
+    if operations:
+        metadata = {k: v for k, v in record.items() if k not in readonly}
+        patched = apply_json_patch(metadata, operations)
+        for field in set(metadata) | set(patched):
+            if field in readonly:
+                raise ValidationError(f"Campo não pode ser alterado: {field}")
+            value = patched.get(field, _MISSING)
+            if value is _MISSING:
+                removals.append(field)
+            elif value != metadata.get(field, _MISSING):
+                updates[field] = value
+
+    delta: Optional[list] = body.get("content_delta")
+    if delta is not None:
+        base_version = body.get("base_version")
+        if base_version is None:
+            raise ValidationError("base_version é obrigatório para content_delta")
+        if base_version != record.get("version", 1):
+            raise VersionConflictError(record.get("version", 1))
+        content = apply_text_delta(record.get("content", ""), delta)
+        if content != record.get("content", ""):
+            updates["content"] = content
+
+    return updates, removals
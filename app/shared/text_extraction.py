@@ -0,0 +1,283 @@
+"""
+Text extraction for Wiki Veloz
+Plain text out of uploaded PDF, DOCX, XLSX and text files, within fixed limits
+"""
+
+import codecs
+import os
+import re
+import shutil
+import signal
+import subprocess
+import threading
+import zipfile
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+from xml.etree.ElementTree import iterparse
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # PDFs then need poppler's pdftotext
+    PdfReader = None
+
+# Bump when extractors change what text comes out, so old results are redone
+EXTRACTOR_VERSION = "1"
+
+# Decompressed bytes read from any one part of a DOCX/XLSX (zip bomb guard)
+MAX_XML_BYTES = 64 * 1024 * 1024
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_S = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+
+class ExtractionTimeout(Exception):
+    """Raised when extracting one file takes longer than allowed"""
+
+
+class _TextBuffer:
+    """Collects text pieces and stops once max_chars is reached"""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.parts: List[str] = []
+        self.size = 0
+
+    @property
+    def full(self) -> bool:
+        return self.size >= self.max_chars
+
+    def add(self, text: str) -> None:
+        if text and not self.full:
+            text = text[: self.max_chars - self.size]
+            self.parts.append(text)
+            self.size += len(text)
+
+    def getvalue(self) -> str:
+        return "".join(self.parts)
+
+
+class _CappedReader:
+    """File-like wrapper refusing to read more than limit bytes"""
+
+    def __init__(self, raw, limit: int):
+        self.raw = raw
+        self.remaining = limit
+
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            raise ValueError("Conteúdo descompactado grande demais")
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.raw.read(size)
+        self.remaining -= len(data)
+        return data
+
+
+def _iter_xml(archive: zipfile.ZipFile, member: str, events=("end",)) -> Iterator:
+    """Stream-parse one XML part of an OOXML package"""
+    with archive.open(member) as raw:
+        for _, element in iterparse(_CappedReader(raw, MAX_XML_BYTES), events=events):
+            yield element
+
+
+def _column_index(reference: str) -> int:
+    """0-based column of a cell reference such as C5"""
+    index = 0
+    for char in reference:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - ord("A") + 1
+    return index - 1
+
+
+def xlsx_sheets(archive: zipfile.ZipFile) -> List[str]:
+    """Worksheet parts in sheet order (sheet1.xml, sheet2.xml, ...)"""
+    names = [
+        n
+        for n in archive.namelist()
+        if n.startswith("xl/worksheets/") and n.endswith(".xml") and n.count("/") == 2
+    ]
+    return sorted(names, key=lambda n: int(re.sub(r"\D", "", os.path.basename(n)) or 0))
+
+
+def xlsx_shared_strings(archive: zipfile.ZipFile) -> List[str]:
+    """The workbook's shared string table"""
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return []
+    shared = []
+    for element in _iter_xml(archive, "xl/sharedStrings.xml"):
+        if element.tag == _S + "si":
+            shared.append("".join(t.text or "" for t in element.iter(_S + "t")))
+            element.clear()
+    return shared
+
+
+def xlsx_row_count(archive: zipfile.ZipFile, sheet: str) -> Optional[int]:
+    """Last row number from the sheet's <dimension>, without reading its rows"""
+    for element in _iter_xml(archive, sheet, events=("start",)):
+        if element.tag == _S + "dimension":
+            match = re.search(r"(\d+)$", element.get("ref", ""))
+            return int(match.group(1)) if match else None
+        if element.tag == _S + "sheetData":
+            return None
+    return None
+
+
+def iter_xlsx_rows(
+    archive: zipfile.ZipFile, sheet: str, shared: List[str]
+) -> Iterator[List[str]]:
+    """Yield a sheet's rows as lists of cell strings, one row at a time.
+
+    Cells keep their column position and rows left out of the XML (empty
+    ones) come back as [], so row n of the output is spreadsheet row n + 1.
+    """
+    row: List[str] = []
+    expected = 1
+    for element in _iter_xml(archive, sheet):
+        if element.tag == _S + "c":
+            if element.get("t") == "inlineStr":
+                value = "".join(t.text or "" for t in element.iter(_S + "t"))
+            else:
+                value = element.findtext(_S + "v") or ""
+                if (
+                    element.get("t") == "s"
+                    and value.isdigit()
+                    and int(value) < len(shared)
+                ):
+                    value = shared[int(value)]
+            column = _column_index(element.get("r") or "")
+            if column > len(row):
+                row.extend([""] * (column - len(row)))
+            row.append(value)
+        elif element.tag == _S + "row":
+            number = int(element.get("r") or expected)
+            for _ in range(expected, number):
+                yield []
+            yield row
+            expected = number + 1
+            row = []
+            element.clear()
+
+
+def extract_plain(path: str, max_chars: int) -> str:
+    """Text files: UTF-8, falling back to Latin-1 for older exports"""
+    with open(path, "rb") as f:
+        data = f.read(max_chars * 4)
+        at_end = not f.read(1)
+    try:
+        # Not final when the read stopped early: a character cut at the
+        # end of the sample is dropped instead of failing the whole file
+        text = codecs.getincrementaldecoder("utf-8")().decode(data, final=at_end)
+    except UnicodeDecodeError:
+        text = data.decode("latin-1")
+    return text[:max_chars]
+
+
+def extract_docx(path: str, max_chars: int) -> str:
+    """Paragraph text of word/document.xml"""
+    out = _TextBuffer(max_chars)
+    with zipfile.ZipFile(path) as archive:
+        for element in _iter_xml(archive, "word/document.xml"):
+            if element.tag == _W + "t":
+                out.add(element.text or "")
+            elif element.tag == _W + "tab":
+                out.add("\t")
+            elif element.tag == _W + "p":
+                out.add("\n")
+                element.clear()
+            if out.full:
+                break
+    return out.getvalue()
+
+
+def extract_xlsx(path: str, max_chars: int) -> str:
+    """Cell values of every worksheet, one row per line"""
+    out = _TextBuffer(max_chars)
+    with zipfile.ZipFile(path) as archive:
+        shared = xlsx_shared_strings(archive)
+        for sheet in xlsx_sheets(archive):
+            for row in iter_xlsx_rows(archive, sheet, shared):
+                values = [value for value in row if value]
+                if values:
+                    out.add("\t".join(values) + "\n")
+                if out.full:
+                    return out.getvalue()
+    return out.getvalue()
+
+
+def extract_pdf(path: str, max_chars: int) -> str:
+    """Text layer of a PDF via pdftotext, or pypdf when poppler is missing"""
+    if shutil.which("pdftotext"):
+        result = subprocess.run(
+            ["pdftotext", "-enc", "UTF-8", "-q", path, "-"],
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        return result.stdout.decode("utf-8", errors="replace")[:max_chars]
+
+    out = _TextBuffer(max_chars)
+    for page in PdfReader(path).pages:
+        out.add((page.extract_text() or "") + "\n")
+        if out.full:
+            break
+    return out.getvalue()
+
+
+EXTRACTORS: Dict[str, Callable[[str, int], str]] = {
+    "txt": extract_plain,
+    "csv": extract_plain,
+    "md": extract_plain,
+    "docx": extract_docx,
+    "xlsx": extract_xlsx,
+}
+if PdfReader is not None or shutil.which("pdftotext"):
+    EXTRACTORS["pdf"] = extract_pdf
+
+
+def can_extract(filename: str) -> bool:
+    """Whether text can be pulled out of this file type here"""
+    return os.path.splitext(filename or "")[1].lstrip(".").lower() in EXTRACTORS
+
+
+@contextmanager
+def _deadline(seconds: int):
+    """Raise ExtractionTimeout after seconds (POSIX main thread only)"""
+    if (
+        not seconds
+        or not hasattr(signal, "setitimer")
+        or threading.current_thread() is not threading.main_thread()
+    ):
+        yield
+        return
+
+    def expire(signum, frame):
+        raise ExtractionTimeout(f"Extração passou de {seconds}s")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def extract_text(
+    path: str, filename: str, max_chars: int, max_file_size: int, timeout: int
+) -> str:
+    """Plain text of one file, capped at max_chars.
+
+    Meant to run in a worker process: files over max_file_size are skipped
+    and the deadline interrupts extractors stuck on a pathological file.
+    Raises ExtractionTimeout, ValueError for unsupported or oversized files,
+    and whatever the parser raises for corrupt ones.
+    """
+    extension = os.path.splitext(filename or "")[1].lstrip(".").lower()
+    extractor = EXTRACTORS.get(extension)
+    if extractor is None:
+        raise ValueError(f"Tipo sem extração de texto: {extension}")
+    if os.path.getsize(path) > max_file_size:
+        raise ValueError("Arquivo grande demais para extração de texto")
+    with _deadline(timeout):
+        return extractor(path, max_chars)
@@ -0,0 +1,122 @@
+"""
+Streaming upload helpers for Wiki Veloz
+Copy uploads to disk in fixed-size chunks, validating and hashing on the way
+"""
+
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Iterable, Optional, Tuple
+
+from .exceptions import FileUploadError
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class StoredUpload:
+    """A file that was streamed to its final place on disk"""
+
+    filename: str
+    path: str
+    size: int
+    sha256: str
+
+
+def _format_limit(max_size: int) -> str:
+    return (
+        f"{max_size // (1024 * 1024)}MB" if max_size >= 1024 * 1024 else f"{max_size}B"
+    )
+
+
+def check_upload_extension(
+    filename: str, allowed_extensions: Optional[Iterable[str]]
+) -> str:
+    """Return the lower-case extension of filename; FileUploadError if not allowed"""
+    extension = filename.rsplit(".", 1)[1].lower() if "." in filename else ""
+    if allowed_extensions is not None and extension not in allowed_extensions:
+        raise FileUploadError(f"Extensão não permitida: {extension}")
+    return extension
+
+
+def stream_to_temp(
+    stream: BinaryIO,
+    folder: str,
+    max_size: Optional[int] = None,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+    hasher=None,
+) -> Tuple[str, int, Any]:
+    """Copy a stream into a temp file inside folder; returns (path, size, hasher).
+
+    The temporary file lives next to its destination so the final rename
+    is atomic. Raises FileUploadError (and removes the temporary file) as
+    soon as more than ``max_size`` bytes have been read.
+    """
+    os.makedirs(folder, exist_ok=True)
+    hasher = hasher or hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=folder, suffix=".upload")
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise FileUploadError(
+                        f"Arquivo muito grande (máximo {_format_limit(max_size)})"
+                    )
+                hasher.update(chunk)
+                out.write(chunk)
+    except Exception:
+        os.remove(temp_path)
+        raise
+    return temp_path, size, hasher
+
+
+def commit_temp(temp_path: str, target: str, overwrite: bool = True) -> None:
+    """Atomically move a finished temporary file to target.
+
+    Without ``overwrite`` an existing target is never replaced, even by a
+    concurrent upload: the file is hard-linked into place, which fails if
+    the name is taken.
+    """
+    try:
+        if overwrite:
+            os.replace(temp_path, target)
+            return
+        try:
+            os.link(temp_path, target)
+        except FileExistsError:
+            raise FileUploadError("Arquivo com este nome já existe")
+        os.remove(temp_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def stream_upload(
+    stream: BinaryIO,
+    folder: str,
+    filename: str,
+    allowed_extensions: Optional[Iterable[str]] = None,
+    max_size: Optional[int] = None,
+    overwrite: bool = True,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> StoredUpload:
+    """Stream an upload into folder/filename with constant memory.
+
+    The extension is checked before reading, the size while copying and the
+    SHA-256 is computed on the fly. Nothing appears under ``filename`` until
+    the whole stream passed validation. Raises FileUploadError.
+    """
+    check_upload_extension(filename, allowed_extensions)
+    temp_path, size, hasher = stream_to_temp(stream, folder, max_size, chunk_size)
+    target = os.path.join(folder, filename)
+    commit_temp(temp_path, target, overwrite)
+    return StoredUpload(
+        filename=filename, path=target, size=size, sha256=hasher.hexdigest()
+    )
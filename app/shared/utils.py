@@ -55,6 +55,37 @@ def format_file_size(size_bytes):
     return f"{size_bytes:.1f}{size_names[i]}"
 
 
+def parse_iso_bound(value, end=False):
+    """Parse an ISO date/datetime query bound into a comparable string.
+
+    Date-only upper bounds cover the whole day. Raises ValueError.
+    """
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if end and len(value) == 10:
+        parsed = parsed.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return parsed.isoformat()
+
+
+def parse_expected_version(if_match, payload=None):
+    """Version precondition from an If-Match header or ``expected_version`` field.
+
+    The field is removed from ``payload`` so it is not stored. Returns None
+    when there is no precondition; raises ValueError on a malformed value.
+    """
+    if isinstance(payload, dict) and "expected_version" in payload:
+        expected = payload.pop("expected_version")
+        if not if_match:
+            return int(expected)
+    if not if_match or if_match.strip() == "*":
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    return int(value.strip('"'))
+
+
 def create_directory_if_not_exists(directory):
     """Create directory if it doesn't exist"""
     os.makedirs(directory, exist_ok=True)
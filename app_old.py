@@ -10,7 +10,6 @@ from flask import (
     redirect,
     render_template,
     request,
-    send_from_directory,
     url_for,
 )
 from flask_cors import CORS
@@ -23,7 +22,7 @@ from flask_login import (
     logout_user,
 )
 from slugify import slugify
-from werkzeug.security import check_password_hash, generate_password_hash
+from werkzeug.security import check_password_hash, generate_password_hash, safe_join
 from werkzeug.utils import secure_filename
 
 # Sistema de Backup
@@ -43,6 +42,8 @@ app.config["PERMANENT_SESSION_LIFETIME"] = timedelta(hours=8)  # Sessão de 8 ho
 app.config["UPLOAD_FOLDER"] = "static/uploads"
 app.config["MAX_CONTENT_LENGTH"] = 50 * 1024 * 1024  # 50MB max
 ALLOWED_EXTENSIONS = {"pdf", "doc", "docx", "txt", "jpg", "jpeg", "png", "gif"}
+# Imagens do editor guardadas no blob store e servidas como derivadas
+EDITOR_IMAGE_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp"}
 
 # Criar pasta de uploads se não existir
 os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
@@ -370,20 +371,37 @@ def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def pdfs_db():
+    """Gerenciador do pdfs.json da aplicação nova (import tardio)"""
+    from app.core.config import config as app_config
+    from app.core.database import legacy_data_manager
+
+    return legacy_data_manager(app_config["default"]())
+
+
+def pdfs_lock():
+    """Lock do pdfs.json, o mesmo usado pela migração e verificação de uploads"""
+    return pdfs_db().lock("pdfs.json")
+
+
 def load_pdfs():
     """Carrega PDFs do arquivo JSON"""
-    try:
-        with open("data/pdfs.json", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return []
+    return pdfs_db().load_data("pdfs.json")
 
 
 def save_pdfs(pdfs):
-    """Salva PDFs no arquivo JSON"""
-    os.makedirs("data", exist_ok=True)
-    with open("data/pdfs.json", "w", encoding="utf-8") as f:
-        json.dump(pdfs, f, ensure_ascii=False, indent=2)
+    """Salva PDFs no arquivo JSON (use dentro de pdfs_lock ao alterar a lista)"""
+    return pdfs_db().save_data("pdfs.json", pdfs)
+
+
+def increment_pdf_downloads(pdf_id):
+    """Incrementa o contador de downloads de um PDF"""
+    with pdfs_lock():
+        pdfs = load_pdfs()
+        pdf = next((p for p in pdfs if p["id"] == pdf_id), None)
+        if pdf:
+            pdf["download_count"] = pdf.get("download_count", 0) + 1
+            save_pdfs(pdfs)
 
 
 # Funções para gerenciar setores/áreas da empresa
@@ -472,6 +490,85 @@ def create_default_sectors():
         print("✅ Setores padrão criados")
 
 
+def get_blob_store():
+    """Blob store compartilhado com a aplicação nova (import tardio)"""
+    from app.core.blob_store import get_blob_store as _get_blob_store
+    from app.core.config import config as app_config
+    from app.core.database import DatabaseManager
+
+    return _get_blob_store(DatabaseManager(app_config["default"]()))
+
+
+def get_image_service():
+    """Derivadas de imagens compartilhadas com a aplicação nova (import tardio)"""
+    from app.core.config import config as app_config
+    from app.core.database import DatabaseManager
+    from app.modules.documents.services.image_service import (
+        get_image_service as _get_image_service,
+    )
+
+    return _get_image_service(DatabaseManager(app_config["default"]()))
+
+
+def editor_image_digest(filename):
+    """Digest de uma imagem do editor guardada no blob store ("<sha256>.<ext>")"""
+    from app.core.blob_store import is_digest
+
+    stem = os.path.splitext(filename)[0]
+    return stem if is_digest(stem) else None
+
+
+def send_editor_image(digest, filename):
+    """Imagem do editor sem metadados, na largura pedida em ?w="""
+    from app.modules.documents.services.thumbnail_service import (
+        PENDING,
+        READY,
+        placeholder_svg,
+    )
+
+    image_service = get_image_service()
+    if not image_service.blob_store.exists(digest):
+        return jsonify({"error": "Arquivo não encontrado"}), 404
+
+    width = request.args.get("w", type=int)
+    accept_webp = "image/webp" in request.headers.get("Accept", "")
+    status, path, mimetype = image_service.get(digest, filename, width, accept_webp)
+    if status == READY:
+        response = send_stored_file(path, mimetype=mimetype)
+        response.vary.add("Accept")
+        return response
+
+    # Nunca o original: ele ainda tem os metadados EXIF/GPS
+    largest = max(image_service.widths)
+    extension = os.path.splitext(filename)[1].lstrip(".")
+    response = app.response_class(
+        placeholder_svg(extension, min(width or largest, largest)),
+        mimetype="image/svg+xml",
+    )
+    if status == PENDING:
+        response.status_code = 202
+        response.headers["Retry-After"] = "2"
+        response.cache_control.no_store = True
+    else:
+        response.cache_control.private = True
+        response.cache_control.max_age = 3600
+    return response
+
+
+def pdf_file_path(pdf):
+    """Caminho do arquivo de um PDF: blob compartilhado ou pasta antiga"""
+    from app.core.blob_store import resolve_upload_path
+
+    return resolve_upload_path(get_blob_store(), pdf, app.config["UPLOAD_FOLDER"])
+
+
+def send_stored_file(path, **kwargs):
+    """Envio com Range, ETag e cache da aplicação nova (import tardio)"""
+    from app.shared.file_serving import send_stored_file as _send_stored_file
+
+    return _send_stored_file(path, **kwargs)
+
+
 def create_pdf_entry(
     filename,
     original_filename,
@@ -480,8 +577,12 @@ def create_pdf_entry(
     description="",
     training_date=None,
     trainer="",
+    sha256=None,
+    file_size=None,
 ):
     """Cria uma entrada de PDF com informações de setor e treinamento"""
+    if file_size is None:
+        file_size = os.path.getsize(os.path.join(app.config["UPLOAD_FOLDER"], filename))
     return {
         "id": str(uuid.uuid4()),
         "filename": filename,
@@ -493,9 +594,8 @@ def create_pdf_entry(
         "trainer": trainer,
         "uploaded_by": current_user.id,
         "uploaded_at": datetime.now().isoformat(),
-        "file_size": os.path.getsize(
-            os.path.join(app.config["UPLOAD_FOLDER"], filename)
-        ),
+        "file_size": file_size,
+        "sha256": sha256,
         "download_count": 0,
     }
 
@@ -514,16 +614,21 @@ def get_pdfs_by_page(page_id):
 
 def delete_pdf_file(pdf_id):
     """Remove arquivo PDF do sistema"""
-    pdfs = load_pdfs()
-    pdf = next((p for p in pdfs if p["id"] == pdf_id), None)
-    if pdf:
-        file_path = os.path.join(app.config["UPLOAD_FOLDER"], pdf["filename"])
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        pdfs.remove(pdf)
-        save_pdfs(pdfs)
-        return True
-    return False
+    with pdfs_lock():
+        pdfs = load_pdfs()
+        pdf = next((p for p in pdfs if p["id"] == pdf_id), None)
+        if pdf:
+            if pdf.get("sha256"):
+                # Blob compartilhado: removido pela coleta de lixo sem referências
+                get_blob_store().release(pdf["sha256"], f"pdf:{pdf_id}")
+            else:
+                file_path = pdf_file_path(pdf)
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+            pdfs.remove(pdf)
+            save_pdfs(pdfs)
+            return True
+        return False
 
 
 # Rotas de autenticação
@@ -1831,10 +1936,6 @@ def upload_pdf():
     filename = secure_filename(file.filename)
     unique_filename = f"{uuid.uuid4().hex}_{filename}"
 
-    # Salvar arquivo
-    file_path = os.path.join(app.config["UPLOAD_FOLDER"], unique_filename)
-    file.save(file_path)
-
     # Obter dados do formulário
     sector_id = request.form.get("sector_id")
     page_id = request.form.get("page_id")
@@ -1849,6 +1950,10 @@ def upload_pdf():
         if not sector:
             return jsonify({"error": "Setor inválido"}), 400
 
+    # Salvar arquivo no blob store (PDFs idênticos ocupam uma cópia só)
+    blob_store = get_blob_store()
+    digest, file_size = blob_store.put_stream(file.stream)
+
     # Criar entrada no banco
     pdf_entry = create_pdf_entry(
         unique_filename,
@@ -1858,11 +1963,15 @@ def upload_pdf():
         description,
         training_date,
         trainer,
+        sha256=digest,
+        file_size=file_size,
     )
 
-    pdfs = load_pdfs()
-    pdfs.append(pdf_entry)
-    save_pdfs(pdfs)
+    with pdfs_lock():
+        pdfs = load_pdfs()
+        pdfs.append(pdf_entry)
+        save_pdfs(pdfs)
+    blob_store.add_ref(digest, f"pdf:{pdf_entry['id']}", file_size)
 
     # Registrar atividade
     sector_name = "Sem setor"
@@ -1906,20 +2015,31 @@ def delete_pdf(pdf_id):
 def download_file(filename):
     """Download de arquivo"""
     try:
-        # Verificar se o arquivo existe
-        file_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-        if not os.path.exists(file_path):
-            return jsonify({"error": "Arquivo não encontrado"}), 404
-
-        # Incrementar contador de downloads
         pdfs = load_pdfs()
         pdf = next((p for p in pdfs if p["filename"] == filename), None)
+
+        # Imagens do editor ficam no blob store, servidas como derivadas
+        digest = None if pdf else editor_image_digest(filename)
+        if digest:
+            return send_editor_image(digest, filename)
+
+        # Verificar se o arquivo existe
         if pdf:
-            pdf["download_count"] += 1
-            save_pdfs(pdfs)
+            file_path = pdf_file_path(pdf)
+        else:
+            file_path = safe_join(app.config["UPLOAD_FOLDER"], filename)
+        if file_path is None or not os.path.exists(file_path):
+            return jsonify({"error": "Arquivo não encontrado"}), 404
+
+        # Incrementar contador de downloads (não em retomadas nem revalidações)
+        revalidation = request.if_none_match or request.if_modified_since
+        if pdf and not (request.range or revalidation):
+            increment_pdf_downloads(pdf["id"])
 
-        return send_from_directory(
-            app.config["UPLOAD_FOLDER"], filename, as_attachment=True
+        return send_stored_file(
+            file_path,
+            as_attachment=True,
+            download_name=pdf["original_filename"] if pdf else filename,
         )
 
     except Exception as e:
@@ -1936,7 +2056,7 @@ def view_pdf(pdf_id):
     if not pdf:
         return jsonify({"error": "PDF não encontrado"}), 404
 
-    file_path = os.path.join(app.config["UPLOAD_FOLDER"], pdf["filename"])
+    file_path = pdf_file_path(pdf)
     if not os.path.exists(file_path):
         return jsonify({"error": "Arquivo não encontrado"}), 404
 
@@ -1947,26 +2067,33 @@ def view_pdf(pdf_id):
         f"Visualizou arquivo: {pdf['original_filename']}",
     )
 
-    return send_from_directory(
-        app.config["UPLOAD_FOLDER"], pdf["filename"], mimetype="application/pdf"
-    )
+    return send_stored_file(file_path, mimetype="application/pdf")
 
 
 @app.route("/api/files/<filename>/view")
 @login_required
 def view_file(filename):
     """Visualiza qualquer arquivo na tela"""
-    file_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
+    pdf = next((p for p in load_pdfs() if p["filename"] == filename), None)
 
-    if not os.path.exists(file_path):
+    # PDFs podem estar no armazenamento de blobs; os demais na pasta antiga
+    if pdf:
+        file_path = pdf_file_path(pdf)
+    else:
+        file_path = safe_join(app.config["UPLOAD_FOLDER"], filename)
+    if file_path is None or not os.path.exists(file_path):
         return jsonify({"error": "Arquivo não encontrado"}), 404
 
     # Log da visualização
     log_activity(current_user.id, "file_viewed", f"Visualizou arquivo: {filename}")
 
-    return send_from_directory(
-        app.config["UPLOAD_FOLDER"], filename, as_attachment=False
-    )
+    if pdf:
+        return send_stored_file(
+            file_path,
+            mimetype="application/pdf",
+            download_name=pdf["original_filename"],
+        )
+    return send_stored_file(file_path)
 
 
 @app.route("/api/editor/upload", methods=["POST"])
@@ -2029,26 +2156,40 @@ def upload_editor_file():
                 400,
             )
 
-        # Gerar nome único para o arquivo
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_filename = secure_filename(file.filename) if file.filename else "arquivo"
-        unique_filename = f"editor_{timestamp}_{safe_filename}"
+        if file_ext in EDITOR_IMAGE_EXTENSIONS:
+            # Imagens vão para o blob store; cópias redimensionadas e sem
+            # metadados são geradas em segundo plano
+            blob_store = get_blob_store()
+            digest, file_size = blob_store.put_stream(file.stream)
+            # As páginas que usam a imagem não são rastreadas: a referência fica
+            blob_store.add_ref(digest, f"editor:{digest}", file_size)
+            unique_filename = f"{digest}.{file_ext}"
+            image_service = get_image_service()
+            image_service.schedule(digest, unique_filename)
+            app.logger.info(f"Imagem salva no blob store: {unique_filename}")
+        else:
+            # Gerar nome único para o arquivo
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            safe_filename = (
+                secure_filename(file.filename) if file.filename else "arquivo"
+            )
+            unique_filename = f"editor_{timestamp}_{safe_filename}"
 
-        app.logger.info(f"Nome único gerado: {unique_filename}")
+            app.logger.info(f"Nome único gerado: {unique_filename}")
 
-        # Salvar arquivo
-        file_path = os.path.join(upload_folder, unique_filename)
+            # Salvar arquivo
+            file_path = os.path.join(upload_folder, unique_filename)
 
-        app.logger.info(f"Salvando arquivo em: {file_path}")
-        file.save(file_path)
+            app.logger.info(f"Salvando arquivo em: {file_path}")
+            file.save(file_path)
 
-        # Verificar se o arquivo foi salvo
-        if not os.path.exists(file_path):
-            app.logger.error(f"Arquivo não foi salvo corretamente: {file_path}")
-            return jsonify({"error": "Error ao salvar arquivo"}), 500
+            # Verificar se o arquivo foi salvo
+            if not os.path.exists(file_path):
+                app.logger.error(f"Arquivo não foi salvo corretamente: {file_path}")
+                return jsonify({"error": "Error ao salvar arquivo"}), 500
 
-        file_size = os.path.getsize(file_path)
-        app.logger.info(f"Arquivo salvo com sucesso. Tamanho: {file_size} bytes")
+            file_size = os.path.getsize(file_path)
+            app.logger.info(f"Arquivo salvo com sucesso. Tamanho: {file_size} bytes")
 
         # Retornar informações do arquivo
         file_info = {
@@ -2059,6 +2200,13 @@ def upload_editor_file():
             "type": file_ext,
             "uploaded_at": datetime.now().isoformat(),
         }
+        if file_ext in EDITOR_IMAGE_EXTENSIONS and image_service.can_render(
+            unique_filename
+        ):
+            file_info["srcset"] = ", ".join(
+                f"/uploads/{unique_filename}?w={width} {width}w"
+                for width in image_service.widths
+            )
 
         # Log da atividade (simplificado)
         try:
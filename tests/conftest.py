@@ -2,6 +2,7 @@
 Configuração do pytest para o Wiki Veloz Fibra
 """
 
+import os
 import shutil
 import tempfile
 
@@ -16,6 +17,23 @@ def temp_data_dir():
     shutil.rmtree(temp_dir)
 
 
+@pytest.fixture
+def db_manager(temp_data_dir):
+    """DatabaseManager apontando para o diretório temporário de dados"""
+    from app.core.config import Config
+    from app.core.database import DatabaseManager
+
+    test_config = type(
+        "TempConfig",
+        (Config,),
+        {
+            "DATA_FOLDER": temp_data_dir,
+            "BLOB_FOLDER": os.path.join(temp_data_dir, "blobs"),
+        },
+    )
+    return DatabaseManager(test_config)
+
+
 @pytest.fixture
 def sample_users():
     """Retorna dados de usuários de exemplo"""
@@ -0,0 +1,64 @@
+"""
+Testes para o grafo de links entre páginas (backlinks)
+"""
+from app.modules.pages.repositories.link_graph import LinkGraph
+from app.modules.pages.repositories.page_repository import PageRepository
+
+
+class TestLinkGraph:
+    """Testes para o grafo de links"""
+
+    def test_rename_keeps_backlinks(self):
+        """Testa que links para o slug antigo continuam apontando para a página"""
+        graph = LinkGraph()
+        graph.set_slug("page-a", "runbook-a")
+        graph.set_slug("page-b", "runbook-b")
+        graph.set_links("page-b", ["runbook-a"])
+
+        graph.set_slug("page-a", "runbook-a-v2")
+
+        assert graph.backlinks("page-a") == ["page-b"]
+
+    def test_dangling_link_resolves_when_page_appears(self):
+        """Testa que um link pendente passa a valer quando a página é criada"""
+        graph = LinkGraph()
+        graph.set_links("page-a", ["futura"])
+        graph.set_slug("page-b", "futura")
+
+        assert graph.backlinks("page-b") == ["page-a"]
+
+
+class TestPageBacklinks:
+    """Testes de integração do repositório com o grafo de links"""
+
+    def test_backlinks_follow_writes(self, db_manager):
+        """Testa que criar, editar e remover páginas atualiza os backlinks"""
+        repository = PageRepository(db_manager)
+        repository.create_page({"id": "page-a", "title": "Alvo", "slug": "alvo"})
+        repository.create_page(
+            {
+                "id": "page-b",
+                "title": "Origem",
+                "slug": "origem",
+                "content": "Ver [[Alvo]]",
+            }
+        )
+        repository.create_page(
+            {
+                "id": "page-c",
+                "title": "Outra",
+                "slug": "outra",
+                "content": "[x](/pages/page-a)",
+            }
+        )
+        assert {p["id"] for p in repository.get_backlinks("page-a")} == {
+            "page-b",
+            "page-c",
+        }
+
+        repository.update_page("page-a", {"title": "Alvo Novo"})
+        repository.update_page("page-c", {"content": "sem links"})
+        assert [p["id"] for p in repository.get_backlinks("page-a")] == ["page-b"]
+
+        repository.delete_page("page-b")
+        assert repository.get_backlinks("page-a") == []
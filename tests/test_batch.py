@@ -0,0 +1,65 @@
+"""
+Testes para a busca de vários registros por id (batch)
+"""
+import pytest
+
+from app.modules.auth.services.auth_service import AuthService
+from app.modules.documents.services.document_service import DocumentService
+from app.modules.pages.services.page_service import PageService
+from app.shared.listing import MAX_BATCH_IDS, parse_id_list
+
+
+class TestParseIdList:
+    """Testes para o parâmetro ids"""
+
+    def test_split_and_dedupe(self):
+        """Testa que ids repetidos e vazios são descartados mantendo a ordem"""
+        assert parse_id_list(" b, a,,b ") == ["b", "a"]
+
+    def test_rejects_empty_and_oversized(self):
+        """Testa que listas vazias ou grandes demais são recusadas"""
+        with pytest.raises(ValueError):
+            parse_id_list("")
+        with pytest.raises(ValueError):
+            parse_id_list(",".join(str(i) for i in range(MAX_BATCH_IDS + 1)))
+
+
+class TestBatchServices:
+    """Testes para os serviços de busca em lote"""
+
+    def test_pages_batch(self, db_manager):
+        """Testa o mapa de páginas e a lista de ausentes"""
+        service = PageService(db_manager)
+        service.page_repository.create_page(
+            {"id": "page-a", "title": "A", "slug": "a", "content": "texto"}
+        )
+        service.page_repository.create_page({"id": "page-b", "title": "B", "slug": "b"})
+
+        result = service.get_pages_batch(["page-b", "page-x", "page-a"])
+        assert list(result["data"]) == ["page-b", "page-a"]
+        assert result["data"]["page-a"]["content"] == "texto"
+        assert result["missing"] == ["page-x"]
+
+        slim = service.get_pages_batch(["page-a"], ["id", "title"])
+        assert slim["data"]["page-a"] == {"id": "page-a", "title": "A"}
+
+    def test_documents_batch(self, db_manager):
+        """Testa a busca de documentos em lote"""
+        db_manager.save_data("documents.json", [{"id": "doc-a", "title": "Doc A"}])
+        service = DocumentService(db_manager)
+
+        result = service.get_documents_batch(["doc-a", "doc-x"])
+        assert result["data"] == {"doc-a": {"id": "doc-a", "title": "Doc A"}}
+        assert result["missing"] == ["doc-x"]
+
+    def test_users_batch_hides_password(self, db_manager):
+        """Testa que o lote de usuários não expõe o hash de senha"""
+        db_manager.save_data(
+            "users.json",
+            [{"id": "user-a", "username": "ana", "password_hash": "segredo"}],
+        )
+        service = AuthService(db_manager)
+
+        result = service.get_users_batch(["user-a", "user-x"])
+        assert result["data"]["user-a"] == {"id": "user-a", "username": "ana"}
+        assert result["missing"] == ["user-x"]
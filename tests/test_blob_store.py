@@ -0,0 +1,169 @@
+"""
+Testes para o armazenamento de arquivos endereçado por conteúdo
+"""
+import hashlib
+import io
+import os
+import zipfile
+
+from werkzeug.datastructures import FileStorage
+
+from app.core.blob_store import get_blob_store, resolve_upload_path
+from app.core.upload_migration import UploadCollection, migrate_collection
+from app.modules.backup.services.backup_service import BackupService
+from app.modules.documents.services.document_service import DocumentService
+
+METADATA = {
+    "title": "Política de férias",
+    "description": "Regras de férias da empresa",
+    "category": "RH",
+}
+
+
+class TestBlobStore:
+    """Testes para o BlobStore"""
+
+    def test_identical_content_is_stored_once(self, db_manager):
+        """Testa que o mesmo conteúdo gera um único arquivo em pasta particionada"""
+        store = get_blob_store(db_manager)
+        first, size = store.put_stream(io.BytesIO(b"politica"))
+        second, _ = store.put_stream(io.BytesIO(b"politica"))
+
+        assert first == second == hashlib.sha256(b"politica").hexdigest()
+        assert size == len(b"politica")
+        assert store.path_for(first).endswith(
+            os.path.join(first[:2], first[2:4], first)
+        )
+        assert len(list(store.iter_blobs())) == 1
+
+    def test_garbage_collection_keeps_referenced_blobs(self, db_manager):
+        """Testa que a coleta remove apenas blobs sem referências"""
+        store = get_blob_store(db_manager)
+        kept, _ = store.put_stream(io.BytesIO(b"usado"))
+        dropped, _ = store.put_stream(io.BytesIO(b"orfao"))
+        store.add_ref(kept, "document:doc-a")
+        store.add_ref(kept, "pdf:pdf-a")
+        store.add_ref(dropped, "document:doc-b")
+        assert store.release(dropped, "document:doc-b") == 0
+
+        result = store.collect_garbage(grace_seconds=0)
+
+        assert result["removed"] == 1
+        assert store.exists(kept) and not store.exists(dropped)
+        assert store.refs(kept) == ["document:doc-a", "pdf:pdf-a"]
+
+
+class TestDocumentBlobs:
+    """Testes de integração dos documentos com o BlobStore"""
+
+    def test_documents_share_blob_until_last_delete(self, db_manager):
+        """Testa que documentos com o mesmo arquivo compartilham o blob"""
+        service = DocumentService(db_manager)
+        store = service.document_repository.blob_store
+        for name in ("ferias.pdf", "ferias-copia.pdf"):
+            success, _ = service.create_document(
+                dict(METADATA),
+                FileStorage(stream=io.BytesIO(b"%PDF conteudo"), filename=name),
+                "user-a",
+            )
+            assert success
+
+        first, second = db_manager.load_data("documents.json")
+        assert first["sha256"] == second["sha256"]
+        assert service.get_document_file_path(first["id"]) == store.path_for(
+            first["sha256"]
+        )
+        assert len(store.refs(first["sha256"])) == 2
+
+        service.document_repository.delete_document(first["id"])
+        store.collect_garbage(grace_seconds=0)
+        assert store.exists(second["sha256"])
+
+        service.document_repository.delete_document(second["id"])
+        store.collect_garbage(grace_seconds=0)
+        assert not store.exists(second["sha256"])
+
+
+class TestUploadMigration:
+    """Testes para a migração das pastas planas para o blob store"""
+
+    def test_migrates_in_batches_and_updates_metadata(self, db_manager, temp_data_dir):
+        """Testa que arquivos antigos são movidos e os registros apontam para o blob"""
+        legacy_folder = os.path.join(temp_data_dir, "legacy")
+        os.makedirs(legacy_folder)
+        records = []
+        for index in range(5):
+            name = f"arquivo{index}.txt"
+            with open(os.path.join(legacy_folder, name), "wb") as f:
+                f.write(
+                    b"mesmo conteudo" if index < 2 else f"conteudo {index}".encode()
+                )
+            records.append(
+                {
+                    "id": f"att-{index}",
+                    "filename": name,
+                    "file_path": os.path.join(legacy_folder, name),
+                }
+            )
+        records.append({"id": "att-sem-arquivo", "filename": "sumiu.txt"})
+        db_manager.save_data("attachments.json", records)
+
+        store = get_blob_store(db_manager)
+        collection = UploadCollection(
+            "attachment",
+            db_manager,
+            "attachments.json",
+            legacy_folder,
+            path_fields=("file_path",),
+        )
+        stats = migrate_collection(store, collection, batch_size=2)
+
+        assert stats["migrated"] == 5 and stats["missing"] == 1
+        assert os.listdir(legacy_folder) == []
+        assert len(list(store.iter_blobs())) == 4
+        for record in db_manager.load_data("attachments.json")[:5]:
+            path = resolve_upload_path(store, record, legacy_folder)
+            assert record["file_path"] == path and os.path.isfile(path)
+            assert store.refs(record["sha256"]).count(f"attachment:{record['id']}") == 1
+
+    def test_dry_run_changes_nothing(self, db_manager, temp_data_dir):
+        """Testa que o modo de simulação não move arquivos"""
+        with open(os.path.join(temp_data_dir, "a.txt"), "wb") as f:
+            f.write(b"a")
+        db_manager.save_data("documents.json", [{"id": "doc-a", "filename": "a.txt"}])
+        collection = UploadCollection(
+            "document", db_manager, "documents.json", temp_data_dir
+        )
+
+        stats = migrate_collection(get_blob_store(db_manager), collection, dry_run=True)
+
+        assert stats["migrated"] == 1
+        assert "sha256" not in db_manager.load_data("documents.json")[0]
+        assert os.path.exists(os.path.join(temp_data_dir, "a.txt"))
+
+
+class TestBlobBackup:
+    """Testes para os blobs no backup"""
+
+    def test_backup_keeps_blobs_and_skips_derivatives(
+        self, db_manager, temp_data_dir, monkeypatch
+    ):
+        """Testa que o backup leva o blob original e deixa as miniaturas de fora"""
+        monkeypatch.chdir(temp_data_dir)
+        store = get_blob_store(db_manager)
+        digest, _ = store.put_stream(io.BytesIO(b"planta baixa"))
+        with open(store.derivative_path(digest, "thumb.png"), "wb") as f:
+            f.write(b"png")
+
+        service = BackupService(db_manager.config)
+        info = service.create_backup()
+        archive = service.cipher.decrypt(
+            service.get_backup_file_path(info["id"]).read_bytes()
+        )
+        archive_path = os.path.join(temp_data_dir, "backup.zip")
+        with open(archive_path, "wb") as f:
+            f.write(archive)
+
+        with zipfile.ZipFile(archive_path) as zipf:
+            blobs = [name for name in zipf.namelist() if name.startswith("blobs/")]
+        assert blobs == [f"blobs/{digest[:2]}/{digest[2:4]}/{digest}"]
@@ -0,0 +1,74 @@
+"""
+Testes para a sincronização incremental (sequência de mudanças)
+"""
+from app.core.changelog import ChangeLog
+from app.modules.pages.services.page_service import PageService
+
+
+class TestChangeLog:
+    """Testes para o log de mudanças por coleção"""
+
+    def test_sequence_and_tombstones(self, temp_data_dir):
+        """Testa que cada gravação gera uma sequência com alterações e remoções"""
+        log = ChangeLog(temp_data_dir, "items.json")
+        first = log.record([{"id": "a", "v": 1}, {"id": "b", "v": 1}])
+        second = log.record([{"id": "a", "v": 2}, {"id": "b", "v": 1}])
+        third = log.record([{"id": "a", "v": 2}])
+
+        assert (first, second, third) == (1, 2, 3)
+        assert log.changes_since(1) == (["a"], ["b"], 3, False)
+        assert log.changes_since(3) == ([], [], 3, False)
+
+    def test_unchanged_save_keeps_sequence(self, temp_data_dir):
+        """Testa que gravar os mesmos dados não avança a sequência"""
+        log = ChangeLog(temp_data_dir, "items.json")
+        log.record([{"id": "a"}])
+        assert log.record([{"id": "a"}]) == 1
+
+    def test_pruned_tombstones_force_reset(self, temp_data_dir):
+        """Testa que clientes anteriores às lápides descartadas recarregam tudo"""
+        log = ChangeLog(temp_data_dir, "items.json", tombstone_limit=1)
+        log.record([{"id": "a"}, {"id": "b"}])
+        log.record([{"id": "b"}])
+        log.record([])
+
+        assert log.changes_since(1)[3] is True
+        assert log.changes_since(2) == ([], ["b"], 3, False)
+
+
+class TestPageChanges:
+    """Testes de integração com o repositório de páginas"""
+
+    def test_changes_since(self, db_manager):
+        """Testa o delta de páginas entre duas sincronizações"""
+        service = PageService(db_manager)
+        repository = service.page_repository
+        repository.create_page(
+            {"id": "page-a", "title": "A", "slug": "a", "content": "texto a"}
+        )
+        repository.create_page({"id": "page-b", "title": "B", "slug": "b"})
+
+        snapshot = service.get_changes(0)
+        assert snapshot["reset"] is True
+        assert {p["id"] for p in snapshot["data"]} == {"page-a", "page-b"}
+
+        repository.update_page("page-a", {"title": "A2"})
+        repository.delete_page("page-b")
+        delta = service.get_changes(snapshot["seq"], ["id", "title"])
+
+        assert delta["data"] == [{"id": "page-a", "title": "A2"}]
+        assert delta["deleted"] == ["page-b"]
+        assert delta["reset"] is False
+
+    def test_view_counter_is_not_a_change(self, db_manager):
+        """Testa que contar visualizações não reenvia a página no delta"""
+        service = PageService(db_manager)
+        repository = service.page_repository
+        repository.create_page({"id": "page-a", "title": "A", "slug": "a"})
+        seq = service.get_changes(0)["seq"]
+
+        repository.increment_views("page-a")
+        delta = service.get_changes(seq)
+
+        assert delta["data"] == []
+        assert delta["seq"] == seq
@@ -0,0 +1,128 @@
+"""
+Testes para o controle de concorrência otimista e o lock de arquivos
+"""
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app.modules.documents.repositories.document_repository import DocumentRepository
+from app.modules.pages.services.page_service import PageService
+from app.shared.exceptions import VersionConflictError
+from app.shared.utils import parse_expected_version
+
+
+class TestExpectedVersion:
+    """Testes para a leitura da pré-condição de versão"""
+
+    def test_if_match_and_field(self):
+        """Testa If-Match (com ou sem W/) e o campo expected_version"""
+        payload = {"title": "Novo", "expected_version": 4}
+
+        assert parse_expected_version('W/"3"') == 3
+        assert parse_expected_version(None, payload) == 4
+        assert "expected_version" not in payload
+        assert parse_expected_version("*") is None
+        with pytest.raises(ValueError):
+            parse_expected_version('"abc"')
+
+
+@pytest.fixture
+def pages_client(db_manager, monkeypatch):
+    """Cliente da aplicação com as rotas de páginas no banco temporário"""
+    from app import app
+    from app.modules.pages import routes
+
+    monkeypatch.setattr(routes, "page_service", PageService(db_manager))
+    monkeypatch.setattr(
+        routes, "current_user", SimpleNamespace(id="user-1", role="user")
+    )
+    monkeypatch.setitem(app.config, "LOGIN_DISABLED", True)
+    return app.test_client()
+
+
+class TestOptimisticConcurrency:
+    """Testes para o compare-and-swap de versões"""
+
+    def test_stale_page_update_conflicts(self, db_manager):
+        """Testa que a segunda edição baseada na mesma versão recebe conflito"""
+        service = PageService(db_manager)
+        service.page_repository.create_page(
+            {
+                "id": "page-a",
+                "title": "Runbook",
+                "slug": "runbook",
+                "author_id": "user-1",
+            }
+        )
+
+        success, _ = service.update_page(
+            "page-a", {"content": "Primeira edição"}, "user-1", 1
+        )
+        assert success
+        with pytest.raises(VersionConflictError) as error:
+            service.update_page("page-a", {"content": "Segunda edição"}, "user-1", 1)
+        assert error.value.current_version == 2
+
+        page = service.page_repository.get_page_by_id("page-a")
+        assert page["content"] == "Primeira edição"
+        assert [v["version"] for v in page["versions"]] == [1]
+
+    def test_stale_document_update_conflicts(self, db_manager):
+        """Testa o conflito de versão em documentos"""
+        repository = DocumentRepository(db_manager)
+        repository.create_document({"id": "doc-a", "title": "Documento"})
+
+        assert repository.update_document(
+            "doc-a", {"title": "Doc 2"}, expected_version=1
+        )
+        with pytest.raises(VersionConflictError):
+            repository.update_document("doc-a", {"title": "Doc 3"}, expected_version=1)
+
+    def test_concurrent_writers_do_not_lose_updates(self, db_manager):
+        """Testa que escritas concorrentes não se sobrescrevem"""
+        service = PageService(db_manager)
+        service.page_repository.create_page({"id": "page-a", "title": "A", "slug": "a"})
+
+        threads = [
+            threading.Thread(
+                target=service.page_repository.increment_views, args=("page-a",)
+            )
+            for _ in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert service.page_repository.get_page_metadata("page-a")["views"] == 20
+
+    def test_stale_patch_body_version_conflicts(self, pages_client):
+        """Testa que expected_version no corpo do PATCH é respeitado"""
+        from app.modules.pages import routes
+
+        routes.page_service.page_repository.create_page(
+            {
+                "id": "page-a",
+                "title": "Runbook",
+                "slug": "runbook",
+                "author_id": "user-1",
+            }
+        )
+        routes.page_service.update_page(
+            "page-a", {"content": "Primeira edição"}, "user-1", 1
+        )
+
+        response = pages_client.patch(
+            "/api/pages/page-a",
+            json={
+                "patch": [{"op": "replace", "path": "/title", "value": "Antigo"}],
+                "expected_version": 1,
+            },
+        )
+        assert response.status_code == 409
+        assert response.get_json()["current_version"] == 2
+        assert (
+            routes.page_service.page_repository.get_page_by_id("page-a")["title"]
+            == "Runbook"
+        )
@@ -0,0 +1,61 @@
+"""
+Testes para o GET condicional (ETag / Last-Modified)
+"""
+from flask import Flask, jsonify
+
+from app.shared.decorators import conditional_get
+
+
+def make_client(db_manager, calls):
+    """Cria uma aplicação mínima com uma rota condicional"""
+    app = Flask(__name__)
+
+    @app.route("/items")
+    @conditional_get(db_manager, "items.json")
+    def items():
+        calls.append(1)
+        return jsonify(db_manager.load_data("items.json"))
+
+    return app.test_client()
+
+
+class TestConditionalGet:
+    """Testes para o decorator conditional_get"""
+
+    def test_matching_etag_skips_view(self, db_manager):
+        """Testa que um ETag igual responde 304 sem executar a view"""
+        db_manager.save_data("items.json", [{"id": "a"}])
+        calls = []
+        client = make_client(db_manager, calls)
+
+        first = client.get("/items")
+        etag = first.headers["ETag"]
+        second = client.get("/items", headers={"If-None-Match": etag})
+
+        assert first.status_code == 200
+        assert second.status_code == 304
+        assert first.headers["Cache-Control"] == "private, no-cache"
+        assert second.headers["Cache-Control"] == "private, no-cache"
+        assert second.data == b""
+        assert len(calls) == 1
+
+    def test_write_changes_etag(self, db_manager):
+        """Testa que gravar a coleção invalida o ETag"""
+        db_manager.save_data("items.json", [{"id": "a"}])
+        client = make_client(db_manager, [])
+        etag = client.get("/items").headers["ETag"]
+
+        db_manager.save_data("items.json", [{"id": "a"}, {"id": "b"}])
+        response = client.get("/items", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert len(response.get_json()) == 2
+
+    def test_if_modified_since(self, db_manager):
+        """Testa a validação por Last-Modified"""
+        db_manager.save_data("items.json", [])
+        client = make_client(db_manager, [])
+        last_modified = client.get("/items").headers["Last-Modified"]
+
+        response = client.get("/items", headers={"If-Modified-Since": last_modified})
+        assert response.status_code == 304
@@ -0,0 +1,82 @@
+"""
+Testes para o armazenamento de conteúdo fora do JSON de páginas
+"""
+import json
+import os
+
+from app.core.content_store import ContentStore, content_hash
+from app.modules.pages.repositories.page_repository import PageRepository
+
+
+class TestContentStore:
+    """Testes para o ContentStore"""
+
+    def test_put_get_delete(self, temp_data_dir):
+        """Testa o ciclo de escrita, leitura e remoção"""
+        store = ContentStore(temp_data_dir)
+        digest = store.put("page-a", "# Título\n\nConteúdo")
+
+        assert digest == content_hash("# Título\n\nConteúdo")
+        assert store.get("page-a") == "# Título\n\nConteúdo"
+        assert store.delete("page-a") is True
+        assert store.get("page-a") is None
+
+    def test_unsafe_keys_are_hashed(self, temp_data_dir):
+        """Testa que chaves com caracteres inválidos não escapam da pasta"""
+        store = ContentStore(temp_data_dir)
+        path = store.path_for("../fora")
+
+        assert os.path.dirname(path) == temp_data_dir
+
+
+class TestPageContentStorage:
+    """Testes de integração do repositório de páginas com o ContentStore"""
+
+    def test_metadata_file_has_no_body(self, db_manager):
+        """Testa que pages.json guarda apenas hash e tamanho do conteúdo"""
+        repository = PageRepository(db_manager)
+        repository.create_page(
+            {"id": "page-a", "title": "Página A", "slug": "a", "content": "Olá mundo"}
+        )
+
+        with open(
+            os.path.join(db_manager.data_folder, "pages.json"), encoding="utf-8"
+        ) as f:
+            stored = json.load(f)[0]
+        assert "content" not in stored
+        assert stored["content_length"] == len("Olá mundo")
+        assert repository.get_page_by_id("page-a")["content"] == "Olá mundo"
+
+    def test_legacy_inline_content_is_migrated(self, db_manager):
+        """Testa que conteúdo inline antigo continua legível e é migrado na escrita"""
+        db_manager.save_data(
+            "pages.json",
+            [
+                {
+                    "id": "page-a",
+                    "title": "Antiga",
+                    "slug": "a",
+                    "content": "Texto antigo",
+                }
+            ],
+        )
+        repository = PageRepository(db_manager)
+        assert repository.get_page_by_id("page-a")["content"] == "Texto antigo"
+
+        repository.create_page_version("page-a", {"content": "Texto novo"})
+
+        assert "content" not in repository.load_pages()[0]
+        assert repository.get_page_by_id("page-a")["content"] == "Texto novo"
+        version = repository.get_page_version("page-a", 1)
+        assert repository.load_page_version_content("page-a", version) == "Texto antigo"
+
+    def test_delete_removes_bodies(self, db_manager):
+        """Testa que remover a página apaga o conteúdo e as versões"""
+        repository = PageRepository(db_manager)
+        repository.create_page(
+            {"id": "page-a", "title": "A", "slug": "a", "content": "v1"}
+        )
+        repository.create_page_version("page-a", {"content": "v2"})
+        repository.delete_page("page-a")
+
+        assert os.listdir(repository.content_store.root) == []
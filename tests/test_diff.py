@@ -0,0 +1,73 @@
+"""
+Testes para o diff entre versões de páginas
+"""
+from app.modules.pages.services import diff_service
+from app.modules.pages.services.diff_service import diff_texts
+from app.modules.pages.services.page_service import PageService
+
+
+class TestDiffTexts:
+    """Testes para o cálculo de hunks"""
+
+    def test_hunks_with_word_changes(self):
+        """Testa hunks de linhas com o detalhe das palavras alteradas"""
+        old = "\n".join(f"linha {i}" for i in range(1, 11))
+        new = old.replace("linha 5", "linha cinco") + "\nlinha 11"
+
+        diff = diff_texts(old, new, context=1)
+
+        assert (diff["additions"], diff["deletions"]) == (2, 1)
+        assert [(h["old_start"], h["new_start"]) for h in diff["hunks"]] == [
+            (4, 4),
+            (10, 10),
+        ]
+        segments = diff["hunks"][0]["words"][0]["segments"]
+        assert {"type": "delete", "text": "5"} in segments
+        assert {"type": "insert", "text": "cinco"} in segments
+
+    def test_large_change_is_one_replace(self, monkeypatch):
+        """Testa que uma região alterada grande vira uma única troca de bloco"""
+        monkeypatch.setattr(diff_service, "DIFF_MAX_CELLS", 100)
+        old_lines = [f"antiga {i}" for i in range(19)] + ["meio", "antiga 19"]
+        new_lines = [f"nova {i}" for i in range(19)] + ["meio", "nova 19"]
+        old = "\n".join(["início", *old_lines, "fim"])
+        new = "\n".join(["início", *new_lines, "fim"])
+
+        diff = diff_texts(old, new, context=1)
+
+        assert (diff["additions"], diff["deletions"]) == (21, 21)
+        [hunk] = diff["hunks"]
+        types = [line["type"] for line in hunk["lines"]]
+        assert types == ["context"] + ["delete"] * 21 + ["insert"] * 21 + ["context"]
+        segments = hunk["words"][0]["segments"]
+        assert [segment["type"] for segment in segments] == [
+            "delete",
+            "insert",
+            "equal",
+        ]
+        assert segments[2]["text"] == " 19"
+
+
+class TestPageVersionDiff:
+    """Testes de integração do diff com as versões salvas"""
+
+    def test_diff_against_current_version(self, db_manager):
+        """Testa o diff entre uma versão antiga e a atual"""
+        service = PageService(db_manager)
+        repository = service.page_repository
+        repository.create_page(
+            {"id": "page-a", "title": "A", "slug": "a", "content": "um\ndois"}
+        )
+        repository.create_page_version("page-a", {"content": "um\ntrês"})
+
+        versions = service.get_page_versions("page-a")
+        assert [v["version"] for v in versions] == [1]
+        assert "content" not in versions[0]
+
+        diff = service.diff_page_versions("page-a", 1, 2)
+        assert [line["type"] for line in diff["hunks"][0]["lines"]] == [
+            "context",
+            "delete",
+            "insert",
+        ]
+        assert service.diff_page_versions("page-a", 1, 9) is None
@@ -0,0 +1,195 @@
+"""
+Testes para o envio de arquivos com Range e cache condicional
+"""
+import hashlib
+import io
+import os
+import zipfile
+
+import pytest
+from flask import Flask
+from werkzeug.datastructures import FileStorage
+
+from app.modules.documents.services.document_service import DocumentService
+from app.shared.file_serving import bundle_names, send_stored_file, stream_zip
+
+CONTENT = b"0123456789" * 100
+DIGEST = hashlib.sha256(CONTENT).hexdigest()
+
+
+@pytest.fixture
+def client(temp_data_dir):
+    """Aplicação mínima servindo um blob e um arquivo comum"""
+    blob_path = os.path.join(temp_data_dir, DIGEST)
+    plain_path = os.path.join(temp_data_dir, "manual.pdf")
+    for path in (blob_path, plain_path):
+        with open(path, "wb") as f:
+            f.write(CONTENT)
+
+    app = Flask(__name__)
+    app.config.update(
+        FILE_DELIVERY_ROOT=temp_data_dir, FILE_DELIVERY_PREFIX="/protected/"
+    )
+
+    @app.route("/blob")
+    def blob():
+        return send_stored_file(blob_path, mimetype="application/pdf")
+
+    @app.route("/plain")
+    def plain():
+        return send_stored_file(
+            plain_path, as_attachment=True, download_name="manual.pdf"
+        )
+
+    return app.test_client()
+
+
+class TestFileServing:
+    """Testes para send_stored_file"""
+
+    def test_strong_etag_and_revalidation(self, client):
+        """Testa ETag forte do hash e resposta 304 na revalidação"""
+        response = client.get("/blob")
+        assert response.status_code == 200
+        assert response.headers["ETag"] == f'"{DIGEST}"'
+        assert response.headers["Accept-Ranges"] == "bytes"
+        assert "Last-Modified" in response.headers
+        assert response.cache_control.no_cache
+
+        response = client.get("/blob", headers={"If-None-Match": f'"{DIGEST}"'})
+        assert response.status_code == 304
+
+    def test_immutable_cache_for_pinned_blob(self, client):
+        """Testa cache longo apenas quando a URL fixa o hash"""
+        response = client.get(f"/blob?v={DIGEST}")
+        assert response.cache_control.max_age == 365 * 24 * 3600
+        assert response.cache_control.immutable
+        assert response.cache_control.private
+
+        assert not client.get("/plain?v=abc").cache_control.immutable
+
+    def test_single_range(self, client):
+        """Testa resposta parcial para um intervalo"""
+        response = client.get("/plain", headers={"Range": "bytes=10-19"})
+        assert response.status_code == 206
+        assert response.data == CONTENT[10:20]
+        assert response.headers["Content-Range"] == f"bytes 10-19/{len(CONTENT)}"
+
+    def test_multiple_ranges(self, client):
+        """Testa multipart/byteranges para vários intervalos"""
+        response = client.get("/blob", headers={"Range": "bytes=0-4,-5"})
+        assert response.status_code == 206
+        assert response.mimetype == "multipart/byteranges"
+        assert int(response.headers["Content-Length"]) == len(response.data)
+        assert f"Content-Range: bytes 0-4/{len(CONTENT)}".encode() in response.data
+        assert f"Content-Range: bytes 995-999/{len(CONTENT)}".encode() in response.data
+        assert b"\r\n\r\n01234\r\n" in response.data
+        assert b"\r\n\r\n56789\r\n" in response.data
+
+    def test_unsatisfiable_and_stale_if_range(self, client):
+        """Testa 416 fora do arquivo e arquivo inteiro quando If-Range não confere"""
+        for header in ("bytes=5000-", "bytes=5000-5001,6000-6001"):
+            response = client.get("/blob", headers={"Range": header})
+            assert response.status_code == 416
+            assert response.headers["Content-Range"] == f"bytes */{len(CONTENT)}"
+
+        response = client.get(
+            "/blob", headers={"Range": "bytes=0-1,4-5", "If-Range": '"outro"'}
+        )
+        assert response.status_code == 200
+        assert response.data == CONTENT
+
+
+class TestProxyDelivery:
+    """Testes para a entrega pelo proxy (X-Accel-Redirect / X-Sendfile)"""
+
+    def test_x_accel_redirect(self, client):
+        """Testa que o corpo fica para o proxy e os cabeçalhos continuam aqui"""
+        client.application.config["FILE_DELIVERY"] = "x-accel-redirect"
+
+        response = client.get("/plain", headers={"Range": "bytes=0-9"})
+        assert response.status_code == 200
+        assert response.data == b""
+        assert response.headers["X-Accel-Redirect"] == "/protected/manual.pdf"
+        assert "attachment" in response.headers["Content-Disposition"]
+
+        response = client.get("/blob", headers={"If-None-Match": f'"{DIGEST}"'})
+        assert response.status_code == 304
+
+    def test_x_sendfile_and_fallback(self, client, temp_data_dir):
+        """Testa X-Sendfile com caminho absoluto e envio local sem proxy"""
+        client.application.config["FILE_DELIVERY"] = "x-sendfile"
+        response = client.get("/blob")
+        assert response.headers["X-Sendfile"] == os.path.join(
+            os.path.abspath(temp_data_dir), DIGEST
+        )
+        assert response.data == b""
+
+        client.application.config["FILE_DELIVERY"] = ""
+        response = client.get("/blob")
+        assert "X-Sendfile" not in response.headers
+        assert response.data == CONTENT
+
+
+class TestZipBundles:
+    """Testes para os pacotes ZIP gerados em fluxo"""
+
+    def test_stream_zip_stores_compressed_formats(self, temp_data_dir):
+        """Testa o conteúdo do ZIP e STORE para formatos já comprimidos"""
+        text_path = os.path.join(temp_data_dir, "notas.txt")
+        with open(text_path, "wb") as f:
+            f.write(b"linha\n" * 50000)
+        pdf_path = os.path.join(temp_data_dir, DIGEST)
+        with open(pdf_path, "wb") as f:
+            f.write(CONTENT)
+
+        chunks = list(
+            stream_zip(
+                [
+                    ("notas.txt", text_path),
+                    ("manual.pdf", pdf_path),
+                    ("sumiu.txt", "/nao/existe"),
+                ],
+                chunk_size=4096,
+            )
+        )
+
+        assert max(len(chunk) for chunk in chunks) < 64 * 1024
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+            assert archive.namelist() == ["notas.txt", "manual.pdf"]
+            assert archive.read("notas.txt") == b"linha\n" * 50000
+            assert archive.read("manual.pdf") == CONTENT
+            assert archive.getinfo("notas.txt").compress_type == zipfile.ZIP_DEFLATED
+            assert archive.getinfo("manual.pdf").compress_type == zipfile.ZIP_STORED
+
+    def test_bundle_names_are_flat_and_unique(self):
+        """Testa nomes sem diretórios e sem colisões"""
+        assert bundle_names(
+            ["a.pdf", "A.pdf", "../x/a.pdf", "c:\\docs\\b.txt", None]
+        ) == ["a.pdf", "A (2).pdf", "a (3).pdf", "b.txt", "arquivo"]
+
+    def test_bundle_entries_for_documents(self, db_manager):
+        """Testa a seleção de arquivos por ids e por categoria"""
+        service = DocumentService(db_manager)
+        metadata = {
+            "title": "Contrato",
+            "description": "Contrato padrão de clientes",
+            "category": "Vendas",
+        }
+        for name in ("contrato.txt", "aditivo.pdf"):
+            success, _ = service.create_document(
+                dict(metadata),
+                FileStorage(stream=io.BytesIO(name.encode()), filename=name),
+                "user-a",
+            )
+            assert success
+        ids = [d["id"] for d in db_manager.load_data("documents.json")]
+
+        entries, missing = service.get_bundle_entries(
+            "user-a", document_ids=ids[::-1] + ["nao-existe"]
+        )
+        assert [name for name, _ in entries] == ["aditivo.pdf", "contrato.txt"]
+        assert missing == ["nao-existe"]
+
+        entries, missing = service.get_bundle_entries("user-a", category="Vendas")
+        assert len(entries) == 2 and missing == []
@@ -0,0 +1,114 @@
+"""
+Testes para as derivadas responsivas de imagens
+"""
+import io
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from app.core.blob_store import get_blob_store
+from app.modules.documents.services.document_service import DocumentService
+from app.modules.documents.services.image_service import ImageDerivativeService
+from app.modules.documents.services.thumbnail_service import PENDING, READY, UNAVAILABLE
+from app.shared.exceptions import UnsupportedPreviewError
+
+
+@pytest.fixture
+def images(db_manager):
+    """Serviço de derivadas usando o blob store temporário"""
+    service = ImageDerivativeService(db_manager, get_blob_store(db_manager))
+    yield service
+    service._executor.shutdown(wait=True)
+
+
+class TestImageDerivativeService:
+    """Testes para o ImageDerivativeService"""
+
+    def test_resizes_and_strips_metadata(self, images):
+        """Testa larguras geradas, escolha da melhor derivada e remoção do EXIF"""
+        Image = pytest.importorskip("PIL.Image")
+        exif = Image.Exif()
+        exif[0x010F] = "Camera de campo"
+        source = io.BytesIO()
+        Image.new("RGB", (800, 400), "red").save(source, "JPEG", exif=exif)
+        source.seek(0)
+        digest, _ = images.blob_store.put_stream(source)
+
+        assert images.best_fit(digest, 320, True) is None
+        assert images.get(digest, "poste.jpg", 320, True) == (PENDING, None, None)
+        future = images.schedule(digest, "poste.jpg")
+        if future is not None:
+            future.result()
+
+        manifest = images.get_manifest(digest)
+        assert manifest["widths"] == [320, 640, 800]
+        assert (manifest["width"], manifest["height"]) == (800, 400)
+
+        path, mimetype = images.best_fit(digest, 500, True)
+        assert path == images.path_for(digest, 640, "webp") and mimetype == "image/webp"
+        path, mimetype = images.best_fit(digest, 5000, False)
+        assert path == images.path_for(digest, 800, "jpeg") and mimetype == "image/jpeg"
+        with Image.open(path) as derivative:
+            assert derivative.size == (800, 400)
+            assert not derivative.getexif()
+        assert images.get(digest, "poste.jpg", 500, False) == (
+            READY,
+            images.path_for(digest, 640, "jpeg"),
+            "image/jpeg",
+        )
+
+    def test_skips_gifs_and_non_images(self, images):
+        """Testa que GIFs e outros tipos não geram derivadas"""
+        digest, _ = images.blob_store.put_stream(io.BytesIO(b"GIF89a"))
+
+        assert images.schedule(digest, "animacao.gif") is None
+        assert images.schedule(digest, "notas.txt") is None
+        assert images.get_manifest(digest) is None
+
+    def test_original_is_never_served(self, images):
+        """Testa que sem derivadas a imagem original não é entregue"""
+        digest, _ = images.blob_store.put_stream(io.BytesIO(b"nao-e-jpeg"))
+        images.available = False
+
+        assert images.get(digest, "poste.jpg", 320, True) == (UNAVAILABLE, None, None)
+        assert images.get("0" * 64, "poste.jpg", 320, True) == (UNAVAILABLE, None, None)
+
+
+class TestDocumentImages:
+    """Testes para a entrega de imagens pelo DocumentService"""
+
+    def test_gif_served_as_uploaded(self, db_manager):
+        """Testa a entrega do GIF original com o tipo certo e a recusa de não-imagens"""
+        service = DocumentService(db_manager)
+        success, _ = service.create_document(
+            {
+                "title": "Animação",
+                "description": "Passo a passo animado",
+                "category": "Técnico",
+            },
+            FileStorage(stream=io.BytesIO(b"GIF89a"), filename="passo.gif"),
+            "user-a",
+        )
+        assert success
+        success, _ = service.create_document(
+            {"title": "Notas", "description": "Notas de campo", "category": "Técnico"},
+            FileStorage(stream=io.BytesIO(b"texto"), filename="notas.txt"),
+            "user-a",
+        )
+        assert success
+        documents = {
+            d["filename"]: d for d in service.document_repository.load_documents()
+        }
+
+        gif = documents["passo.gif"]
+        assert service.get_document_image(gif["id"], 320, True) == (
+            READY,
+            service.document_repository.resolve_file_path(gif),
+            "image/gif",
+            "gif",
+        )
+        assert service.get_document_srcset(gif["id"])["widths"] == []
+
+        with pytest.raises(UnsupportedPreviewError):
+            service.get_document_image(documents["notas.txt"]["id"], 320, True)
+        assert service.get_document_image("inexistente", 320, True) is None
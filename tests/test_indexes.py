@@ -0,0 +1,182 @@
+"""
+Testes para os índices em memória (trending, top-K)
+"""
+import pytest
+
+from app.core.indexes import (
+    SortedIndex,
+    TokenIndex,
+    TopKIndex,
+    decode_cursor,
+    encode_cursor,
+    trending_bump,
+    trending_value,
+)
+from app.modules.documents.repositories.document_repository import DocumentRepository
+from app.modules.pages.repositories.page_repository import PageRepository
+
+
+class TestTrendingScore:
+    """Testes para o score com decaimento exponencial"""
+
+    def test_recent_events_outweigh_old_events(self):
+        """Testa que eventos recentes valem mais que eventos antigos"""
+        day = 24 * 3600
+        old = None
+        for _ in range(5):
+            old = trending_bump(old, 24, now=0)
+        recent = trending_bump(None, 24, now=3 * day)
+
+        assert recent > old
+        assert trending_value(old, 24, now=3 * day) == pytest.approx(5 / 8)
+        assert trending_value(recent, 24, now=3 * day) == pytest.approx(1.0)
+
+    def test_value_halves_after_half_life(self):
+        """Testa que o valor cai pela metade após uma meia-vida"""
+        score = trending_bump(None, 10, now=1000)
+        assert trending_value(score, 10, now=1000 + 10 * 3600) == pytest.approx(0.5)
+
+
+class TestTopKIndex:
+    """Testes para o heap limitado"""
+
+    def test_keeps_only_k_highest(self):
+        """Testa que apenas os K maiores scores são mantidos"""
+        index = TopKIndex(3, lambda r: r.get("score"))
+        index.rebuild({"id": str(i), "score": i} for i in range(10))
+
+        assert [r["id"] for r in index.top(10)] == ["9", "8", "7"]
+
+    def test_growing_score_enters_top(self):
+        """Testa que um registro que cresce entra no top-K"""
+        index = TopKIndex(2, lambda r: r.get("score"))
+        index.rebuild([{"id": "a", "score": 5}, {"id": "b", "score": 4}])
+        index.upsert({"id": "c", "score": 6})
+        index.upsert({"id": "b", "score": 7})
+
+        assert [r["id"] for r in index.top(2)] == ["b", "c"]
+
+
+class TestSortedIndex:
+    """Testes para o índice ordenado com cursor"""
+
+    @pytest.fixture
+    def index(self):
+        index = SortedIndex(lambda r: r["updated_at"])
+        index.rebuild(
+            {"id": f"p{i}", "updated_at": f"2025-07-{i:02d}T10:00:00"}
+            for i in range(1, 8)
+        )
+        return index
+
+    def test_descending_pages_with_cursor(self, index):
+        """Testa a paginação decrescente usando cursor"""
+        first, cursor = index.page(3)
+        second, cursor = index.page(3, cursor)
+        third, cursor = index.page(3, cursor)
+
+        assert [r["id"] for r in first] == ["p7", "p6", "p5"]
+        assert [r["id"] for r in second] == ["p4", "p3", "p2"]
+        assert [r["id"] for r in third] == ["p1"]
+        assert cursor is None
+
+    def test_date_range(self, index):
+        """Testa a consulta por intervalo de datas com bisect"""
+        records, _ = index.page(10, start="2025-07-03", end="2025-07-05T23:59:59")
+        assert [r["id"] for r in records] == ["p5", "p4", "p3"]
+
+    def test_upsert_moves_record(self, index):
+        """Testa que atualizar a chave reposiciona o registro"""
+        index.upsert({"id": "p1", "updated_at": "2025-07-09T00:00:00"})
+        index.discard("p7")
+
+        records, _ = index.page(2)
+        assert [r["id"] for r in records] == ["p1", "p6"]
+        assert len(index) == 6
+
+    def test_cursor_round_trip(self):
+        """Testa a codificação opaca do cursor"""
+        assert decode_cursor(encode_cursor((42, "page-a"))) == (42, "page-a")
+        assert decode_cursor(encode_cursor((42, "page-a"), "-views"), "-views") == (
+            42,
+            "page-a",
+        )
+        with pytest.raises(ValueError):
+            decode_cursor("não-é-cursor")
+        with pytest.raises(ValueError):
+            decode_cursor(encode_cursor((42, "page-a"), "-views"), "title")
+
+    def test_mismatched_cursor_key(self, index):
+        """Testa que uma chave de cursor incomparável vira ValueError"""
+        with pytest.raises(ValueError):
+            index.page(3, (42, "p1"))
+
+
+class TestTokenIndex:
+    """Testes para o índice de palavras da busca em texto"""
+
+    def test_candidates_cover_substring_matches(self):
+        """Testa que todo texto contendo a busca é candidato e os demais não"""
+        index = TokenIndex()
+        index.add("a", "Conector SC/APC verde")
+        index.add("b", "Fusão de fibra óptica")
+        index.add("c", "Cabo drop")
+
+        assert index.candidates("sc/apc") == {"a"}
+        assert index.candidates("nector sc") == {"a"}
+        assert index.candidates("FUSÃO de fib") == {"b"}
+        assert index.candidates("inexistente") == set()
+        assert index.candidates("//") == set()
+        assert "c" in index and "d" not in index
+
+
+class TestTrendingRepositories:
+    """Testes de integração dos repositórios com o índice de trending"""
+
+    def test_views_drive_trending_pages(self, db_manager):
+        """Testa que visualizações atualizam o ranking incrementalmente"""
+        repository = PageRepository(db_manager)
+        repository.create_page({"id": "page-a", "title": "Página A", "slug": "a"})
+        repository.create_page({"id": "page-b", "title": "Página B", "slug": "b"})
+
+        assert repository.get_trending_pages() == []
+
+        repository.increment_views("page-a")
+        repository.increment_views("page-b")
+        repository.increment_views("page-b")
+
+        trending = repository.get_trending_pages(5)
+        assert [p["id"] for p in trending] == ["page-b", "page-a"]
+        assert trending[0]["trending"] > trending[1]["trending"]
+
+    def test_deleted_page_leaves_trending(self, db_manager):
+        """Testa que páginas removidas saem do ranking"""
+        repository = PageRepository(db_manager)
+        repository.create_page({"id": "page-a", "title": "Página A", "slug": "a"})
+        repository.increment_views("page-a")
+        repository.delete_page("page-a")
+
+        assert repository.get_trending_pages() == []
+
+    def test_downloads_drive_trending_documents(self, db_manager):
+        """Testa o ranking de documentos por downloads recentes"""
+        repository = DocumentRepository(db_manager)
+        repository.create_document({"id": "doc-a", "title": "Documento A"})
+        repository.create_document({"id": "doc-b", "title": "Documento B"})
+        repository.increment_downloads("doc-b")
+
+        assert [d["id"] for d in repository.get_trending_documents()] == ["doc-b"]
+
+    def test_recent_and_popular_follow_writes(self, db_manager):
+        """Testa que os índices de recentes e populares acompanham as escritas"""
+        repository = PageRepository(db_manager)
+        repository.create_page({"id": "page-a", "title": "Página A", "slug": "a"})
+        repository.create_page({"id": "page-b", "title": "Página B", "slug": "b"})
+        repository.increment_views("page-a")
+        repository.update_page("page-a", {"category": "Geral"})
+
+        assert [p["id"] for p in repository.get_recent_pages()][0] == "page-a"
+        popular, cursor = repository.list_popular_pages(1)
+        assert [p["id"] for p in popular] == ["page-a"]
+        rest, _ = repository.list_popular_pages(1, cursor)
+        assert [p["id"] for p in rest] == ["page-b"]
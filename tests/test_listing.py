@@ -0,0 +1,110 @@
+"""
+Testes para os parâmetros de listagem (fields, sort, limit, cursor)
+"""
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from app.modules.pages.services.page_service import PageService
+from app.shared.listing import ListingQuery, project
+
+
+@pytest.fixture
+def page_service(db_manager):
+    """PageService com três páginas em um diretório temporário"""
+    service = PageService(db_manager)
+    for i, category in enumerate(["Geral", "Técnico", "Geral"]):
+        service.page_repository.create_page(
+            {
+                "id": f"page-{i}",
+                "title": f"Página {i}",
+                "slug": f"pagina-{i}",
+                "category": category,
+                "content": "# Conteúdo longo " * 50,
+            }
+        )
+    return service
+
+
+class TestListingQuery:
+    """Testes para o parser de parâmetros de listagem"""
+
+    def test_defaults_keep_full_listing(self):
+        """Testa que sem parâmetros a listagem continua completa"""
+        query = ListingQuery.from_args(MultiDict())
+        assert not query.paginated
+        assert query.sort is None and query.fields is None
+
+    def test_paginated_query_gets_default_sort(self):
+        """Testa a ordenação padrão ao paginar"""
+        query = ListingQuery.from_args(MultiDict({"limit": "5", "fields": "title"}))
+        assert query.sort == "updated_at" and query.descending
+        assert query.fields == ["id", "title"]
+
+    def test_invalid_limit(self):
+        """Testa que limites inválidos são rejeitados"""
+        with pytest.raises(ValueError):
+            ListingQuery.from_args(MultiDict({"limit": "0"}))
+
+    def test_project(self):
+        """Testa a projeção de campos"""
+        assert project({"id": "a", "title": "T", "content": "x"}, ["id", "title"]) == {
+            "id": "a",
+            "title": "T",
+        }
+
+
+class TestPageListing:
+    """Testes de listagem de páginas com projeção e cursor"""
+
+    def test_fields_and_cursor(self, page_service):
+        """Testa a paginação por título com projeção de campos"""
+        args = MultiDict({"fields": "title", "sort": "title", "limit": "2"})
+        pages, cursor, total = page_service.list_pages(ListingQuery.from_args(args))
+
+        assert total == 3
+        assert pages == [
+            {"id": "page-0", "title": "Página 0"},
+            {"id": "page-1", "title": "Página 1"},
+        ]
+
+        args["cursor"] = cursor
+        pages, cursor, _ = page_service.list_pages(ListingQuery.from_args(args))
+        assert [p["id"] for p in pages] == ["page-2"]
+        assert cursor is None
+
+    def test_filtered_listing(self, page_service):
+        """Testa a listagem por categoria com ordenação"""
+        query = ListingQuery.from_args(MultiDict({"sort": "-title"}))
+        pages, _, total = page_service.list_pages(query, category="Geral")
+        assert total == 2
+        assert [p["id"] for p in pages] == ["page-2", "page-0"]
+
+    def test_unknown_sort_field(self, page_service):
+        """Testa que campos de ordenação desconhecidos são rejeitados"""
+        with pytest.raises(ValueError):
+            page_service.list_pages(
+                ListingQuery.from_args(MultiDict({"sort": "content"}))
+            )
+
+    def test_cursor_from_another_sort(self, page_service):
+        """Testa que um cursor de outra ordenação é rejeitado com ValueError"""
+        args = MultiDict({"sort": "title", "limit": "1"})
+        _, cursor, _ = page_service.list_pages(ListingQuery.from_args(args))
+
+        for sort in ("-views", "-title", "created_at"):
+            query = ListingQuery.from_args(
+                MultiDict({"sort": sort, "limit": "1", "cursor": cursor})
+            )
+            with pytest.raises(ValueError):
+                page_service.list_pages(query)
+        with pytest.raises(ValueError):
+            page_service.list_recent_pages(1, cursor)
+
+    def test_listing_returns_copies(self, page_service):
+        """Testa que alterar um registro listado não altera o índice"""
+        query = ListingQuery.from_args(MultiDict({"sort": "-views", "limit": "3"}))
+        pages, _, _ = page_service.page_repository.query_pages(query)
+        pages[0]["title"] = "Alterado"
+
+        pages, _, _ = page_service.page_repository.query_pages(query)
+        assert "Alterado" not in [p["title"] for p in pages]
@@ -0,0 +1,216 @@
+"""
+Testes para atualizações parciais (JSON Patch e deltas de texto)
+"""
+import pytest
+
+from app.modules.pages.services.page_service import PageService
+from app.shared.exceptions import ValidationError, VersionConflictError
+from app.shared.patching import apply_json_patch, apply_text_delta, build_patch_updates
+
+
+class TestJsonPatch:
+    """Testes para as operações RFC 6902"""
+
+    def test_operations(self):
+        """Testa add, remove, replace, move, copy e test"""
+        document = {"title": "A", "tags": ["x"], "meta": {"a": 1}}
+        patched = apply_json_patch(
+            document,
+            [
+                {"op": "test", "path": "/title", "value": "A"},
+                {"op": "add", "path": "/tags/-", "value": "y"},
+                {"op": "replace", "path": "/title", "value": "B"},
+                {"op": "move", "from": "/meta/a", "path": "/meta/b"},
+                {"op": "copy", "from": "/tags/0", "path": "/category"},
+                {"op": "remove", "path": "/tags/0"},
+            ],
+        )
+
+        assert patched == {
+            "title": "B",
+            "tags": ["y"],
+            "meta": {"b": 1},
+            "category": "x",
+        }
+        assert document["tags"] == ["x"]
+
+    def test_failed_test_operation(self):
+        """Testa que uma operação test falha com ValidationError"""
+        with pytest.raises(ValidationError):
+            apply_json_patch(
+                {"title": "A"}, [{"op": "test", "path": "/title", "value": "B"}]
+            )
+
+
+class TestTextDelta:
+    """Testes para os deltas de texto"""
+
+    def test_apply_delta(self):
+        """Testa manter, apagar e inserir trechos"""
+        assert (
+            apply_text_delta("Olá mundo cruel", [4, -5, "Brasil"]) == "Olá Brasil cruel"
+        )
+
+    def test_counts_are_utf16_units(self):
+        """Testa que as contagens seguem String.length do JavaScript"""
+        assert apply_text_delta("ok 🚀 pronto", [3, -2, "✅"]) == "ok ✅ pronto"
+        with pytest.raises(ValidationError):
+            apply_text_delta("🚀", [-1])
+
+    def test_delta_past_end(self):
+        """Testa que deltas maiores que o texto base são rejeitados"""
+        with pytest.raises(ValidationError):
+            apply_text_delta("abc", [2, -5])
+
+    def test_stale_base_version(self):
+        """Testa que o delta exige a versão atual como base"""
+        with pytest.raises(VersionConflictError):
+            build_patch_updates(
+                {"version": 3, "content": "abc"},
+                {"base_version": 2, "content_delta": [3, "d"]},
+                {"version"},
+            )
+
+
+class TestPagePatch:
+    """Testes de integração do PATCH de páginas"""
+
+    def test_patch_writes_only_changed_fields(self, db_manager):
+        """Testa que apenas os campos alterados são gravados"""
+        service = PageService(db_manager)
+        service.page_repository.create_page(
+            {
+                "id": "page-a",
+                "title": "Runbook",
+                "slug": "runbook",
+                "content": "Passo um do runbook",
+                "author_id": "user-1",
+                "tags": ["ops"],
+            }
+        )
+
+        success, _ = service.patch_page(
+            "page-a", [{"op": "add", "path": "/tags/-", "value": "deploy"}], "user-1"
+        )
+        assert success
+        page = service.page_repository.get_page_by_id("page-a")
+        assert page["tags"] == ["ops", "deploy"]
+        assert "versions" not in page
+
+        success, _ = service.patch_page(
+            "page-a",
+            {"base_version": page["version"], "content_delta": [6, -2, "dois"]},
+            "user-1",
+        )
+        assert success
+        assert (
+            service.page_repository.get_page_by_id("page-a")["content"]
+            == "Passo dois do runbook"
+        )
+
+    def test_readonly_fields_are_rejected(self, db_manager):
+        """Testa que campos controlados pelo repositório não podem ser alterados"""
+        service = PageService(db_manager)
+        service.page_repository.create_page(
+            {
+                "id": "page-a",
+                "title": "Runbook",
+                "slug": "runbook",
+                "author_id": "user-1",
+            }
+        )
+
+        success, message = service.patch_page(
+            "page-a", [{"op": "add", "path": "/views", "value": 1000}], "user-1"
+        )
+        assert not success
+        assert "views" in message
+
+    def test_remove_deletes_the_field(self, db_manager):
+        """Testa que remove apaga o campo em vez de gravar null"""
+        service = PageService(db_manager)
+        service.page_repository.create_page(
+            {
+                "id": "page-a",
+                "title": "Runbook",
+                "slug": "runbook",
+                "author_id": "user-1",
+                "category": "Ops",
+            }
+        )
+
+        success, _ = service.patch_page(
+            "page-a", [{"op": "remove", "path": "/category"}], "user-1"
+        )
+        assert success
+        assert "category" not in service.page_repository.get_page_by_id("page-a")
+
+        success, _ = service.patch_page(
+            "page-a", [{"op": "remove", "path": "/title"}], "user-1"
+        )
+        assert not success
+
+    def test_patch_without_version_is_compare_and_swap(self, db_manager, monkeypatch):
+        """Testa que um PATCH sem versão não sobrescreve uma escrita concorrente"""
+        service = PageService(db_manager)
+        service.page_repository.create_page(
+            {
+                "id": "page-a",
+                "title": "Runbook",
+                "slug": "runbook",
+                "author_id": "user-1",
+                "tags": ["ops"],
+            }
+        )
+        stale = service.page_repository.get_page_by_id("page-a")
+        service.patch_page(
+            "page-a", [{"op": "add", "path": "/tags/-", "value": "rede"}], "user-1"
+        )
+
+        monkeypatch.setattr(
+            service.page_repository, "get_page_by_id", lambda page_id: stale
+        )
+        with pytest.raises(VersionConflictError):
+            service.patch_page(
+                "page-a",
+                [{"op": "add", "path": "/tags/-", "value": "deploy"}],
+                "user-1",
+            )
+        assert service.page_repository.get_page_metadata("page-a")["tags"] == [
+            "ops",
+            "rede",
+        ]
+
+    def test_admin_can_modify_others_pages(self, db_manager):
+        """Testa que PATCH, PUT, restauração e exclusão seguem a mesma permissão"""
+        db_manager.save_data(
+            "users.json",
+            [{"id": "admin-1", "role": "admin"}, {"id": "user-2", "role": "user"}],
+        )
+        service = PageService(db_manager)
+        service.page_repository.create_page(
+            {
+                "id": "page-a",
+                "title": "Runbook",
+                "slug": "runbook",
+                "author_id": "user-1",
+            }
+        )
+        patch = [{"op": "add", "path": "/category", "value": "Ops"}]
+
+        assert service.patch_page("page-a", patch, "user-2")[0] is False
+        assert service.patch_page("page-a", patch, "admin-1")[0] is True
+        assert (
+            service.update_page("page-a", {"content": "Novo procedimento"}, "user-2")[0]
+            is False
+        )
+        assert (
+            service.update_page("page-a", {"content": "Novo procedimento"}, "admin-1")[
+                0
+            ]
+            is True
+        )
+        assert service.restore_page_version("page-a", 2, "user-2")[0] is False
+        assert service.restore_page_version("page-a", 2, "admin-1")[0] is True
+        assert service.delete_page("page-a", "user-2")[0] is False
+        assert service.delete_page("page-a", "admin-1")[0] is True
@@ -0,0 +1,91 @@
+"""
+Testes para a renderização de markdown, o cache de HTML e os metadados de página
+"""
+from app.core.content_store import content_hash
+from app.modules.pages.services.page_meta import extract_page_meta
+from app.modules.pages.services.page_service import PageService
+from app.modules.pages.services.render_service import RenderService
+from app.shared.sanitizer import sanitize_html
+
+
+class TestSanitizer:
+    """Testes para o sanitizador de HTML"""
+
+    def test_removes_scripts_and_event_handlers(self):
+        """Testa que scripts e atributos de evento são removidos"""
+        html = sanitize_html('<p onclick="x()">Oi<script>alert(1)</script></p>')
+        assert "<script" not in html
+        assert "onclick" not in html
+        assert html.startswith("<p>Oi")
+
+    def test_blocks_javascript_urls(self):
+        """Testa que links javascript: perdem o href"""
+        html = sanitize_html(
+            '<a href="JaVa\tscript:alert(1)">a</a><a href="/p/b">b</a>'
+        )
+        assert html == '<a>a</a><a href="/p/b">b</a>'
+
+
+class TestRenderService:
+    """Testes para o cache de renderização"""
+
+    def test_render_is_cached_on_disk(self, db_manager):
+        """Testa que uma nova instância reaproveita o HTML salvo em disco"""
+        content = "# Título\n\n<script>x</script>texto"
+        html = RenderService(db_manager).render(content)
+
+        assert RenderService(db_manager).get_cached(content_hash(content)) == html
+        assert "<script>" not in html
+        assert '<h1 id="titulo">Título</h1>' in html
+
+    def test_background_render_warms_cache(self, db_manager):
+        """Testa que a renderização em segundo plano aquece o cache"""
+        service = RenderService(db_manager)
+        service.render_async("Texto com **negrito**").result()
+
+        assert service.get_cached(content_hash("Texto com **negrito**")) == (
+            "<p>Texto com <strong>negrito</strong></p>"
+        )
+
+    def test_page_html(self, db_manager):
+        """Testa o HTML servido para uma página"""
+        service = PageService(db_manager)
+        service.create_page({"title": "Página", "content": "Olá *mundo*"}, "user-1")
+        page_id = service.page_repository.load_pages()[0]["id"]
+
+        assert service.get_page_html(page_id)["html"] == "<p>Olá <em>mundo</em></p>"
+        assert service.get_page_html("inexistente") is None
+
+
+class TestPageMeta:
+    """Testes para os metadados de esboço e links"""
+
+    def test_extract_outline_and_links(self):
+        """Testa a extração de títulos, contagem de palavras e links"""
+        meta = extract_page_meta(
+            "# Guia\n\nVeja [a política](/pages/politicas) e [[Como Usar]].\n\n"
+            "## Passos\n\n```\n# não é título\n```\n\n## Passos\n\n"
+            "[site](https://exemplo.com)"
+        )
+
+        assert [(h["level"], h["anchor"]) for h in meta["outline"]] == [
+            (1, "guia"),
+            (2, "passos"),
+            (2, "passos_1"),
+        ]
+        assert meta["links"] == {
+            "internal": ["politicas", "como-usar"],
+            "external": ["https://exemplo.com"],
+        }
+        assert meta["word_count"] == 13
+        assert meta["reading_time"] == 1
+
+    def test_outline_is_stored_on_save(self, db_manager):
+        """Testa que o esboço é salvo junto da página e servido sem o corpo"""
+        service = PageService(db_manager)
+        service.create_page({"title": "Página", "content": "# Um\n\n## Dois"}, "user-1")
+        page_id = service.page_repository.load_pages()[0]["id"]
+        service.page_repository.content_store.delete(page_id)
+
+        outline = service.get_page_outline(page_id)
+        assert [h["text"] for h in outline["outline"]] == ["Um", "Dois"]
@@ -0,0 +1,112 @@
+"""
+Testes para a visualização paginada de linhas
+"""
+import io
+import os
+import zipfile
+
+import pytest
+
+from app.core.blob_store import get_blob_store
+from app.modules.documents.services import row_preview_service
+from app.modules.documents.services.row_preview_service import RowPreviewService
+from app.shared.exceptions import UnsupportedPreviewError
+
+S_NS = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+
+
+@pytest.fixture
+def previews(db_manager, monkeypatch):
+    """Serviço com índice a cada 10 registros para exercitar os saltos"""
+    monkeypatch.setattr(row_preview_service, "LINE_INDEX_STRIDE", 10)
+    return RowPreviewService(get_blob_store(db_manager))
+
+
+class TestTextRows:
+    """Testes para CSV e TXT"""
+
+    def test_csv_pages_with_quoted_newlines(self, previews):
+        """Testa páginas no meio do arquivo, campos multilinha e o índice em disco"""
+        lines = ["cliente;cidade"]
+        lines += [
+            f'cliente {i};"Rua {i}\nCentro"' if i == 24 else f"cliente {i};Chapecó"
+            for i in range(40)
+        ]
+        store = previews.blob_store
+        digest, _ = store.put_stream(
+            io.BytesIO(("\n".join(lines) + "\n").encode("utf-8"))
+        )
+
+        page = previews.get_rows(
+            store.path_for(digest), "clientes.csv", offset=24, limit=3
+        )
+
+        assert page["header"] == ["cliente", "cidade"]
+        assert page["rows"] == [
+            ["cliente 23", "Chapecó"],
+            ["cliente 24", "Rua 24\nCentro"],
+            ["cliente 25", "Chapecó"],
+        ]
+        assert page["total"] == 41 and page["next_offset"] == 27
+        assert os.path.exists(store.derivative_path(digest, "lines1.r1.json"))
+
+        last = previews.get_rows(
+            store.path_for(digest), "clientes.csv", offset=39, limit=5
+        )
+        assert last["rows"] == [["cliente 38", "Chapecó"], ["cliente 39", "Chapecó"]]
+        assert last["next_offset"] is None
+
+    def test_txt_latin1_and_stale_index(self, previews, temp_data_dir):
+        """Testa TXT em Latin-1 e reindexação quando o arquivo muda"""
+        path = os.path.join(temp_data_dir, "log.txt")
+        with open(path, "wb") as f:
+            f.write("linha 1\r\nconexão 2\r\n".encode("latin-1"))
+        assert previews.get_rows(path, "log.txt")["rows"] == [
+            ["linha 1"],
+            ["conexão 2"],
+        ]
+
+        with open(path, "ab") as f:
+            f.write(b"linha 3 mais longa\r\n")
+        assert previews.get_rows(path, "log.txt", offset=2)["rows"] == [
+            ["linha 3 mais longa"]
+        ]
+
+
+class TestSpreadsheetRows:
+    """Testes para XLSX e formatos sem suporte"""
+
+    def test_xlsx_rows_keep_positions(self, previews, temp_data_dir):
+        """Testa colunas e linhas vazias preservadas e o total pela dimensão"""
+        path = os.path.join(temp_data_dir, "planos.xlsx")
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr(
+                "xl/sharedStrings.xml", f"<sst {S_NS}><si><t>Plano</t></si></sst>"
+            )
+            archive.writestr(
+                "xl/worksheets/sheet1.xml",
+                (
+                    f'<worksheet {S_NS}><dimension ref="A1:C4"/><sheetData>'
+                    '<row r="1"><c r="A1" t="s"><v>0</v></c>'
+                    '<c r="C1" t="inlineStr"><is><t>Preço</t></is></c></row>'
+                    '<row r="4"><c r="B4"><v>300</v></c></row>'
+                    "</sheetData></worksheet>"
+                ),
+            )
+
+        page = previews.get_rows(path, "planos.xlsx", offset=1, limit=10)
+
+        assert page["header"] == ["Plano", "", "Preço"]
+        assert page["rows"] == [[], [], ["", "300"]]
+        assert page["total"] == 4 and page["sheet_count"] == 1
+        with pytest.raises(ValueError):
+            previews.get_rows(path, "planos.xlsx", sheet=3)
+
+    def test_unsupported_formats(self, previews, temp_data_dir):
+        """Testa que xls e outros formatos são recusados"""
+        path = os.path.join(temp_data_dir, "antiga.xls")
+        open(path, "wb").close()
+        with pytest.raises(UnsupportedPreviewError):
+            previews.get_rows(path, "antiga.xls")
+        with pytest.raises(UnsupportedPreviewError):
+            previews.get_rows(path, "manual.pdf")
@@ -0,0 +1,143 @@
+"""
+Testes para a extração de texto dos arquivos enviados
+"""
+import io
+import os
+import time
+import zipfile
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from app.modules.documents.services.document_service import DocumentService
+from app.shared.text_extraction import (
+    EXTRACTORS,
+    ExtractionTimeout,
+    extract_text,
+)
+
+W_NS = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+S_NS = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+
+
+def write_zip(path, members):
+    """Cria um pacote OOXML mínimo"""
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, xml in members.items():
+            archive.writestr(name, xml)
+    return path
+
+
+def extract(path, max_chars=1000):
+    """Extrai com limites folgados"""
+    return extract_text(path, os.path.basename(path), max_chars, 1024 * 1024, 10)
+
+
+class TestExtractors:
+    """Testes para os extratores por tipo de arquivo"""
+
+    def test_docx_paragraphs(self, temp_data_dir):
+        """Testa o texto dos parágrafos de um DOCX"""
+        path = write_zip(
+            os.path.join(temp_data_dir, "manual.docx"),
+            {
+                "word/document.xml": (
+                    f"<w:document {W_NS}><w:body>"
+                    "<w:p><w:r><w:t>Fusão de</w:t></w:r>"
+                    "<w:r><w:t> fibra</w:t></w:r></w:p>"
+                    "<w:p><w:r><w:t>OTDR</w:t><w:tab/><w:t>1550nm</w:t></w:r></w:p>"
+                    "</w:body></w:document>"
+                )
+            },
+        )
+        assert extract(path) == "Fusão de fibra\nOTDR\t1550nm\n"
+
+    def test_xlsx_shared_and_inline_strings(self, temp_data_dir):
+        """Testa células com strings compartilhadas, inline e números"""
+        path = write_zip(
+            os.path.join(temp_data_dir, "clientes.xlsx"),
+            {
+                "xl/sharedStrings.xml": (
+                    f"<sst {S_NS}><si><t>Cliente</t></si><si><t>Plano</t></si></sst>"
+                ),
+                "xl/worksheets/sheet1.xml": (
+                    f"<worksheet {S_NS}><sheetData>"
+                    '<row><c t="s"><v>0</v></c><c t="s"><v>1</v></c></row>'
+                    '<row><c t="inlineStr"><is><t>Ana</t></is></c>'
+                    "<c><v>500</v></c></row>"
+                    "</sheetData></worksheet>"
+                ),
+            },
+        )
+        assert extract(path) == "Cliente\tPlano\nAna\t500\n"
+
+    def test_plain_text_encoding_and_caps(self, temp_data_dir):
+        """Testa Latin-1, limite de caracteres e limite de tamanho do arquivo"""
+        path = os.path.join(temp_data_dir, "antigo.txt")
+        with open(path, "wb") as f:
+            f.write("instalação".encode("latin-1"))
+
+        assert extract(path) == "instalação"
+        assert extract(path, max_chars=4) == "inst"
+        with pytest.raises(ValueError):
+            extract_text(path, "antigo.txt", 100, 3, 10)
+        with pytest.raises(ValueError):
+            extract(os.path.join(temp_data_dir, "foto.jpg"))
+
+    def test_utf8_cut_inside_character(self, temp_data_dir):
+        """Testa que um UTF-8 cortado no meio de um caractere não vira Latin-1"""
+        path = os.path.join(temp_data_dir, "longo.txt")
+        with open(path, "wb") as f:
+            f.write(("abção" * 10).encode("utf-8"))
+
+        assert extract(path, max_chars=3) == "abç"
+
+    def test_timeout(self, temp_data_dir, monkeypatch):
+        """Testa que um extrator travado é interrompido"""
+        monkeypatch.setitem(EXTRACTORS, "lento", lambda path, max_chars: time.sleep(5))
+        path = os.path.join(temp_data_dir, "arquivo.lento")
+        open(path, "wb").close()
+
+        with pytest.raises(ExtractionTimeout):
+            extract_text(path, "arquivo.lento", 100, 100, 1)
+
+
+class TestTextExtractionService:
+    """Testes para a extração em processos e a busca"""
+
+    def test_backfill_feeds_search_and_is_incremental(self, db_manager):
+        """Testa que o texto extraído entra na busca e não é refeito"""
+        service = DocumentService(db_manager)
+        extraction = service.text_extraction_service
+        try:
+            success, _ = service.create_document(
+                {
+                    "title": "Procedimento",
+                    "description": "Passo a passo de campo",
+                    "category": "Técnico",
+                },
+                FileStorage(
+                    stream=io.BytesIO("Conector SC/APC verde".encode()),
+                    filename="campo.txt",
+                ),
+                "user-a",
+            )
+            assert success
+
+            extraction.extract_missing()
+            assert [d["title"] for d in service.search_documents("sc/apc")] == [
+                "Procedimento"
+            ]
+
+            stats = extraction.extract_missing()
+            assert stats["extracted"] == 0 and stats["skipped"] == 1
+
+            # Texts that cannot match are not read from disk
+            reads = []
+            text_store = service.document_repository.text_store
+            original_get = text_store.get
+            text_store.get = lambda key: reads.append(key) or original_get(key)
+            assert service.search_documents("bobina") == []
+            assert reads == []
+        finally:
+            extraction.shutdown()
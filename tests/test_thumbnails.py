@@ -0,0 +1,89 @@
+"""
+Testes para a geração de miniaturas em segundo plano
+"""
+import io
+import os
+
+import pytest
+
+from app.core.blob_store import get_blob_store
+from app.modules.documents.services.thumbnail_service import (
+    PENDING,
+    READY,
+    UNAVAILABLE,
+    ThumbnailService,
+)
+
+
+def write_marker(source, target, size, timeout):
+    """Renderizador de teste: grava o tamanho pedido"""
+    with open(target, "w") as f:
+        f.write(str(size))
+
+
+def fail(source, target, size, timeout):
+    """Renderizador de teste que sempre falha"""
+    raise RuntimeError("arquivo corrompido")
+
+
+@pytest.fixture
+def thumbnails(db_manager):
+    """Serviço de miniaturas usando o blob store temporário"""
+    service = ThumbnailService(db_manager, get_blob_store(db_manager))
+    yield service
+    service._executor.shutdown(wait=True)
+
+
+class TestThumbnailService:
+    """Testes para o ThumbnailService"""
+
+    def test_pending_until_rendered_in_background(self, thumbnails):
+        """Testa que a requisição só agenda e a miniatura aparece depois"""
+        thumbnails.renderers = {"txt": write_marker}
+        digest, _ = thumbnails.blob_store.put_stream(io.BytesIO(b"conteudo"))
+
+        assert thumbnails.get(digest, "notas.txt", "thumb") == (PENDING, None)
+        thumbnails._executor.shutdown(wait=True)
+
+        status, path = thumbnails.get(digest, "notas.txt", "preview")
+        assert status == READY
+        assert path == thumbnails.path_for(digest, "preview")
+        with open(thumbnails.path_for(digest, "thumb")) as f:
+            assert f.read() == str(thumbnails.sizes["thumb"])
+
+    def test_unsupported_and_failed_files(self, thumbnails):
+        """Testa que tipos sem renderizador e falhas viram placeholder sem repetição"""
+        thumbnails.renderers = {"pdf": fail}
+        digest, _ = thumbnails.blob_store.put_stream(io.BytesIO(b"%PDF quebrado"))
+
+        assert thumbnails.get(digest, "planilha.xlsx", "thumb") == (UNAVAILABLE, None)
+        thumbnails.schedule(digest, "manual.pdf").result()
+        assert thumbnails.get(digest, "manual.pdf", "thumb") == (UNAVAILABLE, None)
+        assert thumbnails.schedule(digest, "manual.pdf") is None
+        with pytest.raises(ValueError):
+            thumbnails.get(digest, "manual.pdf", "gigante")
+
+    def test_image_thumbnail_with_pillow(self, thumbnails):
+        """Testa a miniatura real de uma imagem quando o Pillow está instalado"""
+        Image = pytest.importorskip("PIL.Image")
+        buffer = io.BytesIO()
+        Image.new("RGB", (2000, 1000), "red").save(buffer, "JPEG")
+        buffer.seek(0)
+        digest, _ = thumbnails.blob_store.put_stream(buffer)
+
+        thumbnails.schedule(digest, "foto.jpg").result()
+
+        with Image.open(thumbnails.path_for(digest, "thumb")) as image:
+            assert max(image.size) == thumbnails.sizes["thumb"]
+
+    def test_garbage_collection_removes_derivatives(self, thumbnails):
+        """Testa que a coleta de lixo apaga as miniaturas junto com o blob"""
+        thumbnails.renderers = {"txt": write_marker}
+        store = thumbnails.blob_store
+        digest, _ = store.put_stream(io.BytesIO(b"temporario"))
+        thumbnails.schedule(digest, "a.txt").result()
+
+        store.collect_garbage(grace_seconds=0)
+
+        assert not os.path.exists(thumbnails.path_for(digest, "thumb"))
+        assert os.listdir(os.path.dirname(store.path_for(digest))) == []
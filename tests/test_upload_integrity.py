@@ -0,0 +1,139 @@
+"""
+Testes para a verificação de integridade dos uploads
+"""
+import io
+import os
+import time
+
+from werkzeug.datastructures import FileStorage
+
+from app.core.upload_integrity import scan_tree
+from app.core.config import Config
+from app.core.database import DatabaseManager
+from app.core.upload_migration import UploadCollection, upload_collections
+from app.modules.documents.services.document_service import DocumentService
+from app.modules.documents.services.integrity_service import UploadIntegrityService
+
+
+def age(path, seconds=2 * 3600):
+    """Envelhece um arquivo para além do período de carência"""
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+class TestScanTree:
+    """Testes para a listagem incremental de diretórios"""
+
+    def test_unchanged_directories_are_reused(self, temp_data_dir):
+        """Testa que só diretórios com mtime alterado são listados de novo"""
+        root = os.path.join(temp_data_dir, "raiz")
+        for name in ("aa", "bb"):
+            os.makedirs(os.path.join(root, name))
+            with open(os.path.join(root, name, "arquivo"), "wb") as f:
+                f.write(b"12345")
+
+        listings, stats = scan_tree({root: 1}, workers=2)
+        assert stats == {"scanned": 3, "reused": 0}
+        assert listings[os.path.join(root, "aa")]["files"]["arquivo"][0] == 5
+
+        with open(os.path.join(root, "bb", "novo"), "wb") as f:
+            f.write(b"1")
+        os.utime(os.path.join(root, "bb"), ns=(0, time.time_ns() + 10**9))
+        listings, stats = scan_tree({root: 1}, listings, workers=2)
+        assert stats == {"scanned": 1, "reused": 2}
+        assert "novo" in listings[os.path.join(root, "bb")]["files"]
+
+
+class TestUploadIntegrityService:
+    """Testes para a reconciliação de registros e arquivos"""
+
+    def test_missing_files_and_orphans(self, db_manager, temp_data_dir):
+        """Testa arquivos sumidos, órfãos e a correção das flags"""
+        service = DocumentService(db_manager)
+        legacy_folder = os.path.join(temp_data_dir, "legado")
+        os.makedirs(legacy_folder)
+        integrity = UploadIntegrityService(
+            db_manager,
+            [UploadCollection("document", db_manager, "documents.json", legacy_folder)],
+        )
+        try:
+            success, _ = service.create_document(
+                {
+                    "title": "Manual",
+                    "description": "Manual da OLT",
+                    "category": "Técnico",
+                },
+                FileStorage(
+                    stream=io.BytesIO(b"conteudo do manual"), filename="manual.txt"
+                ),
+                "user-a",
+            )
+            assert success
+            document = service.document_repository.load_documents()[0]
+            blob_path = service.document_repository.blob_store.path_for(
+                document["sha256"]
+            )
+
+            blob_store = service.document_repository.blob_store
+            orphan_digest, _ = blob_store.put_stream(io.BytesIO(b"sem dono"))
+            age(blob_store.path_for(orphan_digest))
+            # Owned by a PDF whose collection is not being checked
+            owned_digest, _ = blob_store.put_stream(io.BytesIO(b"pdf antigo"))
+            age(blob_store.path_for(owned_digest))
+            blob_store.add_ref(owned_digest, "pdf:pdf-1")
+            recent_digest, _ = service.document_repository.blob_store.put_stream(
+                io.BytesIO(b"chegando")
+            )
+            with open(os.path.join(legacy_folder, "antigo.pdf"), "wb") as f:
+                f.write(b"%PDF")
+            age(os.path.join(legacy_folder, "antigo.pdf"))
+
+            report = integrity.run()
+            assert report["missing_count"] == 0
+            assert report["collections"]["document"] == {
+                "records": 1,
+                "missing": 0,
+                "updated": 0,
+            }
+            orphans = {
+                os.path.basename(o["path"]): o["kind"] for o in report["orphans"]
+            }
+            assert orphans == {orphan_digest: "blob", "antigo.pdf": "file"}
+            assert recent_digest not in orphans
+
+            os.remove(blob_path)
+            report = integrity.run()
+            assert report["directories"]["reused"] >= 1
+            assert report["missing"][0]["id"] == document["id"]
+            assert report["collections"]["document"]["updated"] == 1
+            assert (
+                service.document_repository.get_document_by_id(document["id"])[
+                    "file_exists"
+                ]
+                is False
+            )
+            assert integrity.get_report()["missing_count"] == 1
+        finally:
+            integrity._executor.shutdown(wait=True)
+
+    def test_legacy_collections_follow_config(self, temp_data_dir, monkeypatch):
+        """Testa que anexos e PDFs antigos usam a pasta configurada, não a atual"""
+        legacy_data = os.path.join(temp_data_dir, "legado", "data")
+        legacy_uploads = os.path.join(temp_data_dir, "legado", "uploads")
+        os.makedirs(legacy_data)
+        config = type(
+            "LegacyTestConfig",
+            (Config,),
+            {
+                "DATA_FOLDER": temp_data_dir,
+                "LEGACY_DATA_FOLDER": legacy_data,
+                "LEGACY_UPLOAD_FOLDER": legacy_uploads,
+            },
+        )
+        monkeypatch.chdir(os.path.join(temp_data_dir, "legado"))
+
+        collections = upload_collections(DatabaseManager(config), "documentos")
+        folders = {c.ref_prefix: c.legacy_folder for c in collections}
+        assert folders["attachment"] == os.path.join(legacy_uploads, "attachments")
+        assert folders["pdf"] == legacy_uploads
+        assert collections[1].db_manager.data_folder == legacy_data
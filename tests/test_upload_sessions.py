@@ -0,0 +1,160 @@
+"""
+Testes para o upload retomável em partes
+"""
+import hashlib
+import io
+import json
+import os
+
+import pytest
+
+from app.modules.documents.services.document_service import DocumentService
+from app.modules.documents.services.upload_session_service import (
+    MIN_CHUNK_SIZE,
+    UploadSessionService,
+)
+from app.shared.exceptions import FileUploadError
+
+METADATA = {
+    "title": "Manual de campo",
+    "description": "Procedimentos de instalação",
+    "category": "Técnico",
+}
+
+
+@pytest.fixture
+def upload_service(db_manager, temp_data_dir):
+    """Serviço de sessões com a pasta de uploads no diretório temporário"""
+    document_service = DocumentService(db_manager)
+    document_service.document_repository.upload_folder = os.path.join(
+        temp_data_dir, "uploads"
+    )
+    return UploadSessionService(db_manager, document_service)
+
+
+class TestUploadSessions:
+    """Testes para o ciclo de vida de uma sessão de upload"""
+
+    def test_out_of_order_chunks_and_complete(self, upload_service, db_manager):
+        """Testa partes fora de ordem, reenvio e finalização em documento"""
+        payload = os.urandom(MIN_CHUNK_SIZE * 2 + 100)
+        session = upload_service.create_session(
+            "manual.pdf",
+            len(payload),
+            "user-a",
+            dict(METADATA),
+            sha256=hashlib.sha256(payload).hexdigest(),
+            chunk_size=MIN_CHUNK_SIZE,
+        )
+        assert session["total_chunks"] == 3
+
+        chunks = [
+            payload[i : i + MIN_CHUNK_SIZE]
+            for i in range(0, len(payload), MIN_CHUNK_SIZE)
+        ]
+        upload_service.write_chunk(session["id"], "user-a", 2, io.BytesIO(chunks[2]))
+        upload_service.write_chunk(session["id"], "user-a", 0, io.BytesIO(chunks[0]))
+        assert upload_service.complete(session["id"], "user-a") == (
+            False,
+            "Upload incompleto",
+        )
+
+        status = upload_service.write_chunk(
+            session["id"],
+            "user-a",
+            1,
+            io.BytesIO(chunks[1]),
+            offset=MIN_CHUNK_SIZE,
+            checksum=hashlib.sha256(chunks[1]).hexdigest(),
+        )
+        assert status["missing"] == []
+
+        success, _ = upload_service.complete(session["id"], "user-a")
+        assert success
+        document = db_manager.load_data("documents.json")[0]
+        assert document["file_size"] == len(payload)
+        assert document["sha256"] == hashlib.sha256(payload).hexdigest()
+        assert upload_service.get_session(session["id"], "user-a") is None
+
+    def test_bad_chunks_are_not_recorded(self, upload_service):
+        """Testa que offset, tamanho ou checksum errados não marcam a parte"""
+        session = upload_service.create_session(
+            "dados.txt",
+            MIN_CHUNK_SIZE,
+            "user-a",
+            dict(METADATA),
+            chunk_size=MIN_CHUNK_SIZE,
+        )
+        chunk = b"a" * MIN_CHUNK_SIZE
+
+        with pytest.raises(FileUploadError):
+            upload_service.write_chunk(
+                session["id"], "user-a", 0, io.BytesIO(chunk), offset=10
+            )
+        with pytest.raises(FileUploadError):
+            upload_service.write_chunk(
+                session["id"], "user-a", 0, io.BytesIO(chunk[:-1])
+            )
+        with pytest.raises(FileUploadError):
+            upload_service.write_chunk(
+                session["id"], "user-a", 0, io.BytesIO(chunk), checksum="00"
+            )
+
+        assert upload_service.get_session(session["id"], "user-a")["received"] == []
+        assert upload_service.get_session(session["id"], "user-b") is None
+
+    def test_bad_retry_keeps_received_chunk(self, upload_service, db_manager):
+        """Testa que um reenvio inválido não corrompe uma parte já recebida"""
+        payload = os.urandom(MIN_CHUNK_SIZE * 2)
+        session = upload_service.create_session(
+            "planta.pdf",
+            len(payload),
+            "user-a",
+            dict(METADATA),
+            chunk_size=MIN_CHUNK_SIZE,
+        )
+        chunks = [payload[:MIN_CHUNK_SIZE], payload[MIN_CHUNK_SIZE:]]
+        upload_service.write_chunk(session["id"], "user-a", 0, io.BytesIO(chunks[0]))
+        upload_service.write_chunk(session["id"], "user-a", 1, io.BytesIO(chunks[1]))
+
+        with pytest.raises(FileUploadError):
+            upload_service.write_chunk(
+                session["id"],
+                "user-a",
+                0,
+                io.BytesIO(b"x" * MIN_CHUNK_SIZE),
+                checksum="00",
+            )
+        with pytest.raises(FileUploadError):
+            upload_service.write_chunk(
+                session["id"], "user-a", 0, io.BytesIO(b"x" * 10)
+            )
+
+        success, _ = upload_service.complete(session["id"], "user-a")
+        assert success
+        document = db_manager.load_data("documents.json")[0]
+        assert document["sha256"] == hashlib.sha256(payload).hexdigest()
+
+    def test_invalid_session_rejected_upfront(self, upload_service):
+        """Testa que extensão, tamanho e metadados são validados ao iniciar"""
+        with pytest.raises(FileUploadError):
+            upload_service.create_session("virus.exe", 10, "user-a", dict(METADATA))
+        with pytest.raises(FileUploadError):
+            upload_service.create_session(
+                "a.pdf", 100 * 1024 * 1024, "user-a", dict(METADATA)
+            )
+        with pytest.raises(FileUploadError):
+            upload_service.create_session("a.pdf", 10, "user-a", {"title": "x"})
+
+    def test_cleanup_expired(self, upload_service):
+        """Testa que sessões expiradas são removidas do disco"""
+        session = upload_service.create_session("a.txt", 10, "user-a", dict(METADATA))
+        state_path = os.path.join(upload_service.root, session["id"], "session.json")
+        with open(state_path, encoding="utf-8") as f:
+            state = json.load(f)
+        state["expires_at"] = "2000-01-01T00:00:00"
+        with open(state_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+
+        assert upload_service.cleanup_expired() == 1
+        assert os.listdir(upload_service.root) == []
@@ -0,0 +1,58 @@
+"""
+Testes para o upload em streaming
+"""
+import hashlib
+import io
+import os
+
+import pytest
+
+from app.shared.exceptions import FileUploadError
+from app.shared.uploads import stream_upload
+
+
+class TestStreamUpload:
+    """Testes para o stream_upload"""
+
+    def test_stores_file_with_size_and_hash(self, temp_data_dir):
+        """Testa que o arquivo é gravado com tamanho e SHA-256 calculados no caminho"""
+        payload = b"x" * 200_000
+        upload = stream_upload(
+            io.BytesIO(payload), temp_data_dir, "dados.txt", chunk_size=4096
+        )
+
+        assert upload.size == len(payload)
+        assert upload.sha256 == hashlib.sha256(payload).hexdigest()
+        with open(upload.path, "rb") as f:
+            assert f.read() == payload
+
+    def test_rejects_extension_before_reading(self, temp_data_dir):
+        """Testa que extensões proibidas são recusadas sem ler o conteúdo"""
+        stream = io.BytesIO(b"conteudo")
+        with pytest.raises(FileUploadError):
+            stream_upload(
+                stream, temp_data_dir, "script.exe", allowed_extensions={"txt"}
+            )
+        assert stream.tell() == 0
+
+    def test_oversized_upload_leaves_nothing(self, temp_data_dir):
+        """Testa que um upload grande demais é abortado sem deixar arquivos"""
+        with pytest.raises(FileUploadError):
+            stream_upload(
+                io.BytesIO(b"x" * 100),
+                temp_data_dir,
+                "a.txt",
+                max_size=10,
+                chunk_size=8,
+            )
+        assert os.listdir(temp_data_dir) == []
+
+    def test_no_overwrite_keeps_existing_file(self, temp_data_dir):
+        """Testa que sem overwrite o arquivo existente é preservado"""
+        stream_upload(io.BytesIO(b"original"), temp_data_dir, "a.txt")
+        with pytest.raises(FileUploadError):
+            stream_upload(io.BytesIO(b"novo"), temp_data_dir, "a.txt", overwrite=False)
+
+        assert sorted(os.listdir(temp_data_dir)) == ["a.txt"]
+        with open(os.path.join(temp_data_dir, "a.txt"), "rb") as f:
+            assert f.read() == b"original"